@@ -0,0 +1,105 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from storage import TableWriter
+from model_registry import load_model
+
+DEFAULT_CHUNKSIZE = 100_000
+
+def file_format(source):
+    name = source if isinstance(source, str) else getattr(source, 'name', '')
+    return 'parquet' if str(name).endswith('.parquet') else 'csv'
+
+def iter_chunks(source, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Yield DataFrames of at most `chunksize` rows from a CSV or Parquet file.
+
+    `source` may be a path or a file-like object (e.g. a Streamlit upload).
+    """
+    if file_format(source) == 'parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunksize)
+
+def output_schema(preprocessor, output_format):
+    """
+    Declared dtypes of Parquet scored output (None for CSV, which has no types).
+    pandas infers each chunk's dtypes on its own (an all-integer CSV chunk reads
+    as int64, one with fractions as float64), and Parquet needs every chunk to
+    share the first one's types.
+    """
+    if output_format != 'parquet':
+        return None
+    schema = {'Churn_Probability': 'float64', 'Prediction': 'int64'}
+    for name, _, columns in preprocessor.transformers_:
+        if name == 'num':
+            schema.update({column: 'float64' for column in columns})
+    return schema
+
+def score_frame(df, model, preprocessor, threshold=0.5):
+    """
+    Score one chunk.
+
+    Returns:
+        tuple: (predictions, probabilities) NumPy arrays
+    """
+    probs = model.predict_proba(preprocessor.transform(df))[:, 1]
+    return (probs > threshold).astype(np.int64), probs
+
+def score_file(source, output_path, model, preprocessor, chunksize=DEFAULT_CHUNKSIZE,
+               output_format=None, progress=None):
+    """
+    Stream `source` through the preprocessor and model and append the scored
+    rows to `output_path`. Only one chunk is held in memory at a time.
+
+    Args:
+        source: Input CSV/Parquet path or file-like object
+        output_path (str): Output file (its extension selects csv/parquet)
+        model, preprocessor: Fitted estimator and ColumnTransformer
+        chunksize (int): Rows per chunk
+        output_format (str): 'csv' or 'parquet', overriding the extension
+        progress (callable): Called with the number of rows scored so far
+
+    Returns:
+        dict: rows, seconds, rows_per_sec and output_path
+    """
+    output_format = output_format or file_format(output_path)
+    start = time.perf_counter()
+    with TableWriter(output_path, fmt=output_format, schema=output_schema(preprocessor, output_format)) as writer:
+        for chunk in iter_chunks(source, chunksize):
+            predictions, probs = score_frame(chunk, model, preprocessor)
+            chunk['Churn_Probability'] = probs
+            chunk['Prediction'] = predictions
+            writer.write(chunk)
+            if progress:
+                progress(writer.rows_written)
+    seconds = time.perf_counter() - start
+    return {
+        'rows': writer.rows_written,
+        'seconds': seconds,
+        'rows_per_sec': writer.rows_written / seconds if seconds > 0 else float('inf'),
+        'output_path': writer.path
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a customer feature file in chunks")
+    parser.add_argument('input', help="Customer features (csv or parquet)")
+    parser.add_argument('output', help="Scored output (csv or parquet)")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--model', default='best_model', help="Registry name or alias of the model")
+    parser.add_argument('--preprocessor', default='preprocessor')
+    args = parser.parse_args()
+
+    model = load_model(args.model)
+    preprocessor = load_model(args.preprocessor)
+    stats = score_file(args.input, args.output, model, preprocessor, args.chunksize,
+                       progress=lambda rows: print(f"  {rows} rows scored", end='\r'))
+    print(f"\nScored {stats['rows']} rows in {stats['seconds']:.1f}s "
+          f"({stats['rows_per_sec']:.0f} rows/sec) -> {stats['output_path']}")
@@ -0,0 +1,176 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from scipy.special import expit
+from sklearn.preprocessing import StandardScaler, OneHotEncoder
+from sklearn.linear_model import LogisticRegression
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from model_registry import load_model
+from storage import load_table, CUSTOMER_FEATURES_SCHEMA
+
+class CompiledScorer:
+    """
+    Single-row fast path equivalent to model.predict_proba(preprocessor.transform(df)).
+
+    The fitted ColumnTransformer is flattened into NumPy arrays (scaler means and
+    scales, one-hot category -> column maps), so a dict or a raw 2-D array is
+    scored without building a DataFrame. Logistic regression is evaluated
+    directly from its coefficients; other models get the encoded array.
+
+    Raises NotImplementedError for preprocessors it cannot reproduce exactly;
+    callers then fall back to the sklearn path.
+    """
+
+    def __init__(self, preprocessor, model, threshold=0.5):
+        self.model = model
+        self.threshold = threshold
+        self.input_columns = list(preprocessor.feature_names_in_)
+        position = {col: i for i, col in enumerate(self.input_columns)}
+
+        numeric_columns, numeric_out, means, scales = [], [], [], []
+        self.categorical = []  # (input index, {category: output column})
+        offset = 0
+        for name, transformer, columns in preprocessor.transformers_:
+            if transformer == 'drop' or len(columns) == 0:
+                continue
+            columns = [self.input_columns[c] if isinstance(c, (int, np.integer)) else c for c in columns]
+            if isinstance(transformer, StandardScaler):
+                n = len(columns)
+                numeric_columns += columns
+                numeric_out += range(offset, offset + n)
+                means.append(transformer.mean_ if transformer.with_mean else np.zeros(n))
+                scales.append(transformer.scale_ if transformer.with_std else np.ones(n))
+                offset += n
+            elif transformer == 'passthrough':
+                n = len(columns)
+                numeric_columns += columns
+                numeric_out += range(offset, offset + n)
+                means.append(np.zeros(n))
+                scales.append(np.ones(n))
+                offset += n
+            elif isinstance(transformer, OneHotEncoder):
+                if transformer.drop is not None or transformer.handle_unknown != 'ignore':
+                    raise NotImplementedError("Only OneHotEncoder(drop=None, handle_unknown='ignore') is compiled")
+                for col, categories in zip(columns, transformer.categories_):
+                    mapping = {cat: offset + j for j, cat in enumerate(categories)}
+                    self.categorical.append((position[col], mapping))
+                    offset += len(categories)
+            else:
+                raise NotImplementedError(f"Cannot compile transformer '{name}' ({type(transformer).__name__})")
+
+        self.n_features = offset
+        self.numeric_index = np.array([position[c] for c in numeric_columns], dtype=np.int64)
+        self.numeric_out = np.array(numeric_out, dtype=np.int64)
+        self.numeric_columns = numeric_columns
+        self.mean = np.concatenate(means) if means else np.zeros(0)
+        self.scale = np.concatenate(scales) if scales else np.ones(0)
+
+        self._linear = None
+        if isinstance(model, LogisticRegression) and len(model.classes_) == 2:
+            self._linear = (model.coef_.ravel().astype(np.float64), float(model.intercept_[0]))
+
+    @classmethod
+    def from_registry(cls, model_name='best_model', preprocessor_name='preprocessor'):
+        return cls(load_model(preprocessor_name), load_model(model_name))
+
+    def transform(self, X):
+        """
+        Encode raw inputs like preprocessor.transform.
+
+        Args:
+            X: dict of features, list of dicts, or 2-D array whose columns follow
+               `input_columns`
+
+        Returns:
+            np.ndarray: (n_rows, n_features) float64 array
+        """
+        if isinstance(X, dict):
+            X = [X]
+        if isinstance(X, list) and X and isinstance(X[0], dict):
+            numeric = np.array([[row[c] for c in self.numeric_columns] for row in X], dtype=np.float64)
+            raw_categories = [[row[self.input_columns[i]] for row in X] for i, _ in self.categorical]
+        else:
+            X = np.asarray(X, dtype=object)
+            if X.ndim == 1:
+                X = X.reshape(1, -1)
+            numeric = X[:, self.numeric_index].astype(np.float64)
+            raw_categories = [X[:, i] for i, _ in self.categorical]
+
+        out = np.zeros((len(numeric), self.n_features), dtype=np.float64)
+        out[:, self.numeric_out] = (numeric - self.mean) / self.scale
+        for (_, mapping), values in zip(self.categorical, raw_categories):
+            for row, value in enumerate(values):
+                column = mapping.get(value)
+                if column is not None:
+                    out[row, column] = 1.0
+        return out
+
+    def predict_proba(self, X):
+        """Churn probability for each input row"""
+        encoded = self.transform(X)
+        if self._linear is not None:
+            coef, intercept = self._linear
+            return expit(encoded @ coef + intercept)
+        return self.model.predict_proba(encoded)[:, 1]
+
+    def score(self, record):
+        """Same response shape as predict.make_prediction"""
+        prob = float(self.predict_proba(record)[0])
+        prediction = int(prob > self.threshold)
+        return {
+            "prediction": prediction,
+            "probability": prob,
+            "status": "Churn" if prediction == 1 else "Active"
+        }
+
+def verify(scorer, preprocessor, model, df, atol=1e-9):
+    """
+    Compare the compiled path with the sklearn path on `df`.
+
+    Returns:
+        dict: max absolute differences of the encoded features and probabilities
+    """
+    reference_X = preprocessor.transform(df)
+    reference_p = model.predict_proba(reference_X)[:, 1]
+    raw = df[scorer.input_columns].to_numpy(dtype=object)
+    compiled_X = scorer.transform(raw)
+    compiled_p = scorer.predict_proba(raw)
+    result = {
+        'rows': len(df),
+        'max_feature_diff': float(np.abs(compiled_X - reference_X).max()),
+        'max_probability_diff': float(np.abs(compiled_p - reference_p).max()),
+        'bit_identical': bool(np.array_equal(compiled_X, reference_X) and np.array_equal(compiled_p, reference_p))
+    }
+    if result['max_feature_diff'] > atol or result['max_probability_diff'] > atol:
+        raise AssertionError(f"Compiled scorer differs from sklearn path: {result}")
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify and time the compiled single-row scorer")
+    parser.add_argument('features', nargs='?', default='data/processed/customer_features',
+                        help="Customer feature table (csv/parquet or stem) to verify against")
+    parser.add_argument('--rows', type=int, default=1000)
+    args = parser.parse_args()
+
+    df = load_table(args.features, schema=CUSTOMER_FEATURES_SCHEMA)
+    df = df.drop(columns=['CustomerID', 'Churn'], errors='ignore').head(args.rows)
+
+    model = load_model('best_model')
+    preprocessor = load_model('preprocessor')
+    scorer = CompiledScorer(preprocessor, model)
+    print(verify(scorer, preprocessor, model, df))
+
+    records = df.to_dict(orient='records')[:200]
+    start = time.perf_counter()
+    for record in records:
+        model.predict_proba(preprocessor.transform(pd.DataFrame([record])))
+    sklearn_us = (time.perf_counter() - start) / len(records) * 1e6
+    start = time.perf_counter()
+    for record in records:
+        scorer.predict_proba(record)
+    compiled_us = (time.perf_counter() - start) / len(records) * 1e6
+    print(f"Per-row latency: sklearn path {sklearn_us:.0f}us, compiled {compiled_us:.0f}us")
@@ -0,0 +1,186 @@
+import argparse
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pandas as pd
+from predict import load_model, predict_transactions
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class ModelService:
+    """Holds the model and preprocessor in memory and scores DataFrames"""
+
+    def __init__(self):
+        self.model, self.preprocessor = load_model()
+        if self.model is None:
+            raise FileNotFoundError("Model not found. Please train the model first.")
+
+    def score(self, df):
+        probs = self.model.predict_proba(self.preprocessor.transform(df))[:, 1]
+        return [
+            {
+                "prediction": int(prob > 0.5),
+                "probability": float(prob),
+                "status": "Churn" if prob > 0.5 else "Active"
+            }
+            for prob in probs
+        ]
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-record requests into one model call.
+
+    A background thread takes the first waiting record, then keeps collecting
+    until `max_batch_size` records are queued or `max_wait_ms` has passed.
+    """
+
+    def __init__(self, score_fn, max_batch_size=64, max_wait_ms=5):
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, record):
+        future = Future()
+        self._queue.put((record, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            records = [record for record, _ in batch]
+            try:
+                results = self.score_fn(pd.DataFrame(records))
+            except Exception:
+                # One bad record must not fail the others it was batched with
+                results = []
+                for record in records:
+                    try:
+                        results.append(self.score_fn(pd.DataFrame([record]))[0])
+                    except Exception as e:
+                        results.append(e)
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    """
+    GET  /health         -> service status
+    POST /predict        -> one feature record, micro-batched with concurrent calls
+    POST /predict/batch  -> list of feature records, scored in one call
+    POST /predict/transactions -> raw transaction rows, one score per customer
+    """
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'null')
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {"status": "ok", "model": type(self.server.service.model).__name__})
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        try:
+            payload = self._read_json()
+        except json.JSONDecodeError as e:
+            self._send_json(400, {"error": f"Invalid JSON: {e}"})
+            return
+
+        try:
+            if self.path == '/predict':
+                if not isinstance(payload, dict):
+                    self._send_json(400, {"error": "Expected a JSON object of features"})
+                    return
+                self._send_json(200, self.server.batcher.submit(payload).result())
+            elif self.path == '/predict/batch':
+                records = payload.get('records') if isinstance(payload, dict) else payload
+                if not isinstance(records, list):
+                    self._send_json(400, {"error": "Expected a JSON list of feature records"})
+                    return
+                self._send_json(200, self.server.service.score(pd.DataFrame(records)) if records else [])
+            elif self.path == '/predict/transactions':
+                rows = payload.get('transactions') if isinstance(payload, dict) else payload
+                if not isinstance(rows, list):
+                    self._send_json(400, {"error": "Expected a JSON list of transaction rows"})
+                    return
+                as_of = payload.get('as_of') if isinstance(payload, dict) else None
+                scored = predict_transactions(rows, as_of) if rows else None
+                if rows and scored is None:
+                    self._send_json(503, {"error": "Model or training metadata not found"})
+                    return
+                self._send_json(200, [] if scored is None else [
+                    {
+                        "customer_id": int(row.CustomerID),
+                        "prediction": int(row.Prediction),
+                        "probability": float(row.Churn_Probability),
+                        "status": "Churn" if row.Prediction == 1 else "Active"
+                    }
+                    for row in scored.itertuples()
+                ])
+            else:
+                self._send_json(404, {"error": "Not found"})
+        except (ValueError, KeyError) as e:
+            # Missing or malformed feature columns
+            self._send_json(400, {"error": str(e)})
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+
+    def log_message(self, format, *args):
+        logging.info("%s - %s", self.address_string(), format % args)
+
+def create_server(host='127.0.0.1', port=8000, max_batch_size=64, max_wait_ms=5):
+    server = ThreadingHTTPServer((host, port), ScoringHandler)
+    server.daemon_threads = True
+    server.service = ModelService()
+    server.batcher = MicroBatcher(server.service.score, max_batch_size, max_wait_ms)
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Long-running churn scoring service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-batch-size', type=int, default=64,
+                        help="Largest micro-batch of /predict requests scored together")
+    parser.add_argument('--max-wait-ms', type=float, default=5,
+                        help="Longest a /predict request waits for others to batch with")
+    args = parser.parse_args()
+
+    server = create_server(args.host, args.port, args.max_batch_size, args.max_wait_ms)
+    logging.info(f"Serving {type(server.service.model).__name__} on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
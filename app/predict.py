@@ -1,19 +1,50 @@
-import joblib
+import os
+import sys
+from functools import lru_cache
 import pandas as pd
 import numpy as np
 
-MODEL_PATH = 'models/best_model.pkl'
-PREPROCESSOR_PATH = 'models/preprocessor.pkl' # This acts as our scaler/encoder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import model_registry
+from fast_scorer import CompiledScorer
+from bulk_scoring import score_frame, score_file, DEFAULT_CHUNKSIZE
+from online_features import OnlineFeatureService, FEATURE_INFO_PATH, CLEANING_STATS_PATH
+
+MODEL_NAME = 'best_model'
+PREPROCESSOR_NAME = 'preprocessor' # This acts as our scaler/encoder
 
 def load_model():
-    """Load the trained model and preprocessor"""
+    """Load the trained model and preprocessor (memory-mapped, cached until the files change)"""
     try:
-        model = joblib.load(MODEL_PATH)
-        preprocessor = joblib.load(PREPROCESSOR_PATH)
-        return model, preprocessor
+        return model_registry.load_model(MODEL_NAME), model_registry.load_model(PREPROCESSOR_NAME)
     except FileNotFoundError:
         return None, None
 
+@lru_cache(maxsize=1)
+def _compile_scorer(model, preprocessor):
+    try:
+        return CompiledScorer(preprocessor, model)
+    except NotImplementedError:
+        return None
+
+def load_scorer():
+    """Compiled single-row scorer for the current model, or None if it cannot be compiled"""
+    model, preprocessor = load_model()
+    if model is None or preprocessor is None:
+        return None
+    return _compile_scorer(model, preprocessor)
+
+@lru_cache(maxsize=1)
+def _feature_service(feature_info_mtime, cleaning_stats_mtime):
+    return OnlineFeatureService()
+
+def load_feature_service():
+    """Online feature service of the current training run (reloaded when its metadata files change)"""
+    try:
+        return _feature_service(os.path.getmtime(FEATURE_INFO_PATH), os.path.getmtime(CLEANING_STATS_PATH))
+    except (FileNotFoundError, ValueError):
+        return None
+
 def preprocess_input(data: dict, preprocessor):
     """
     Preprocess input dictionary to match training format
@@ -40,6 +71,10 @@ def make_prediction(input_data: dict):
         return {"error": "Model not loaded"}
         
     try:
+        scorer = load_scorer()
+        if scorer is not None:
+            return scorer.score(input_data)
+        
         processed_data = preprocess_input(input_data, preprocessor)
         prediction = model.predict(processed_data)[0]
         probability = model.predict_proba(processed_data)[0][1]
@@ -52,13 +87,54 @@ def make_prediction(input_data: dict):
     except Exception as e:
         return {"error": str(e)}
 
-def batch_predict(df):
+def batch_predict(df, chunksize=DEFAULT_CHUNKSIZE):
+    """Score a DataFrame chunk by chunk so transform intermediates stay bounded"""
     model, preprocessor = load_model()
     if not model or not preprocessor:
         return None
-        
-    processed_data = preprocessor.transform(df)
-    predictions = model.predict(processed_data)
-    probs = model.predict_proba(processed_data)[:, 1]
+    
+    predictions = np.empty(len(df), dtype=np.int64)
+    probs = np.empty(len(df), dtype=np.float64)
+    for start in range(0, len(df), chunksize):
+        end = start + chunksize
+        predictions[start:end], probs[start:end] = score_frame(df.iloc[start:end], model, preprocessor)
     
     return predictions, probs
+
+def batch_predict_file(input_path, output_path, chunksize=DEFAULT_CHUNKSIZE):
+    """Score a CSV/Parquet file to disk without loading it whole; returns throughput stats"""
+    model, preprocessor = load_model()
+    if not model or not preprocessor:
+        return None
+    return score_file(input_path, output_path, model, preprocessor, chunksize)
+
+def predict_transactions(transactions, as_of=None, threshold=0.5):
+    """
+    Score customers from their raw transaction rows in one call.
+
+    Features are computed by the online feature service with the training
+    run's cleaning bound and RFM quartile edges, then scored with the compiled
+    scorer (or the sklearn path when it cannot be compiled).
+
+    Returns:
+        pd.DataFrame: one row per customer with a valid transaction, with its
+            features, Churn_Probability and Prediction; None if the model or
+            training metadata is missing
+    """
+    model, preprocessor = load_model()
+    service = load_feature_service()
+    if model is None or preprocessor is None or service is None:
+        return None
+    
+    features = service.compute(pd.DataFrame(transactions), as_of)
+    scorer = load_scorer()
+    if features.empty:
+        predictions, probs = np.empty(0, dtype=np.int64), np.empty(0)
+    elif scorer is not None:
+        probs = scorer.predict_proba(features[scorer.input_columns].to_numpy(dtype=object))
+        predictions = (probs > threshold).astype(np.int64)
+    else:
+        predictions, probs = score_frame(features, model, preprocessor, threshold)
+    features['Churn_Probability'] = probs
+    features['Prediction'] = predictions
+    return features
@@ -0,0 +1,98 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from storage import TableWriter
+from model_registry import load_model
+from bulk_scoring import iter_chunks, score_frame, file_format, output_schema
+
+_worker = {}
+
+def _init_worker(model_name, preprocessor_name):
+    # Each worker loads the artifacts once and reuses them for every shard
+    start = time.perf_counter()
+    _worker['model'] = load_model(model_name)
+    _worker['preprocessor'] = load_model(preprocessor_name)
+    _worker['load_seconds'] = time.perf_counter() - start
+
+def _score_shard(shard):
+    start = time.perf_counter()
+    predictions, probs = score_frame(shard, _worker['model'], _worker['preprocessor'])
+    return predictions, probs, {
+        'pid': os.getpid(),
+        'rows': len(shard),
+        'seconds': time.perf_counter() - start,
+        'load_seconds': _worker['load_seconds']
+    }
+
+def score_sharded(input_path, output_path, model_name='best_model',
+                  preprocessor_name='preprocessor', workers=None, shard_size=100_000):
+    """
+    Score a feature file in shards across a process pool.
+
+    The parent reads shards in order and keeps at most two per worker in
+    flight, so memory stays bounded. Results are written in input order as
+    each shard's turn comes.
+
+    Returns:
+        dict: rows, seconds, rows_per_sec, output_path and per-worker timing
+    """
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    per_worker = {}
+    pending = deque()
+
+    def write_next(writer):
+        shard, future = pending.popleft()
+        predictions, probs, timing = future.result()
+        shard['Churn_Probability'] = probs
+        shard['Prediction'] = predictions
+        writer.write(shard)
+        stats = per_worker.setdefault(timing['pid'], {'shards': 0, 'rows': 0, 'seconds': 0.0,
+                                                      'load_seconds': timing['load_seconds']})
+        stats['shards'] += 1
+        stats['rows'] += timing['rows']
+        stats['seconds'] += timing['seconds']
+
+    output_format = file_format(output_path)
+    schema = output_schema(load_model(preprocessor_name), output_format)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(model_name, preprocessor_name)) as pool, \
+            TableWriter(output_path, fmt=output_format, schema=schema) as writer:
+        for shard in iter_chunks(input_path, shard_size):
+            pending.append((shard, pool.submit(_score_shard, shard)))
+            if len(pending) >= 2 * workers:
+                write_next(writer)
+        while pending:
+            write_next(writer)
+
+    seconds = time.perf_counter() - start
+    return {
+        'rows': writer.rows_written,
+        'seconds': seconds,
+        'rows_per_sec': writer.rows_written / seconds if seconds > 0 else float('inf'),
+        'output_path': writer.path,
+        'workers': per_worker
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a customer population across worker processes")
+    parser.add_argument('input', help="Customer features (csv or parquet)")
+    parser.add_argument('output', help="Scored output (csv or parquet), rows in input order")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--shard-size', type=int, default=100_000, help="Rows per shard")
+    parser.add_argument('--model', default='best_model', help="Registry name or alias of the model")
+    parser.add_argument('--preprocessor', default='preprocessor')
+    args = parser.parse_args()
+
+    stats = score_sharded(args.input, args.output, args.model, args.preprocessor,
+                          args.workers, args.shard_size)
+    print(f"Scored {stats['rows']} rows in {stats['seconds']:.1f}s "
+          f"({stats['rows_per_sec']:.0f} rows/sec) -> {stats['output_path']}")
+    for pid, worker in sorted(stats['workers'].items()):
+        print(f"  worker {pid}: {worker['shards']} shards, {worker['rows']} rows, "
+              f"load {worker['load_seconds']:.2f}s, scoring {worker['seconds']:.2f}s")
@@ -0,0 +1,183 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from model_registry import load_model
+from bulk_scoring import score_file, file_format, DEFAULT_CHUNKSIZE
+
+JOBS_DIR = 'data/predictions/jobs'
+DEFAULT_MAX_JOBS = int(os.environ.get('SCORING_MAX_JOBS', 2))
+FINAL_STATES = ('done', 'failed')
+
+# Batch scoring jobs run in a process pool that outlives any one Streamlit
+# session. Each job lives in its own directory under JOBS_DIR: the uploaded
+# input, the scored output and status.json. The worker rewrites status.json as
+# it scores, and the UI only ever reads that file, so progress survives reruns
+# and several sessions can watch the same pool.
+
+
+def _write_status(job_dir, **status):
+    path = os.path.join(job_dir, 'status.json')
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(status, f)
+    # Readers never see a half-written file
+    os.replace(tmp_path, path)
+
+
+def count_rows(path):
+    """Rows in a CSV or Parquet file, without parsing the values"""
+    if file_format(path) == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    with open(path, 'rb') as f:
+        lines = sum(block.count(b'\n') for block in iter(lambda: f.read(1 << 20), b''))
+        f.seek(-1, os.SEEK_END)
+        # Header line, plus a last line without a trailing newline
+        return lines - 1 + (f.read(1) != b'\n')
+
+
+def _init_worker(model_name, preprocessor_name):
+    # Warm the per-process registry cache, so the first job does not pay for
+    # loading; later jobs reuse the loaded artifacts until their files change
+    load_model(model_name)
+    load_model(preprocessor_name)
+
+
+def _run_job(job_dir, input_path, output_path, model_name, preprocessor_name, chunksize):
+    status = read_status(job_dir)
+    status.update(state='running', rows=0, started=time.time())
+    try:
+        status['total_rows'] = count_rows(input_path)
+        _write_status(job_dir, **status)
+        model = load_model(model_name)
+        preprocessor = load_model(preprocessor_name)
+
+        def progress(rows):
+            status['rows'] = rows
+            _write_status(job_dir, **status)
+
+        stats = score_file(input_path, output_path, model, preprocessor, chunksize, progress=progress)
+        status.update(state='done', rows=stats['rows'], output_path=stats['output_path'],
+                      seconds=stats['seconds'], rows_per_sec=stats['rows_per_sec'])
+    except Exception as e:
+        status.update(state='failed', error=f"{type(e).__name__}: {e}", traceback=traceback.format_exc())
+    status['finished'] = time.time()
+    _write_status(job_dir, **status)
+    return status
+
+
+def read_status(job_dir):
+    try:
+        with open(os.path.join(job_dir, 'status.json')) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+class JobPool:
+    """
+    Background batch scoring with at most `max_jobs` jobs running at once.
+
+    Jobs beyond the limit wait in the pool's queue. Submitting returns at once
+    with a job id; poll `status(job_id)` for the state (queued, running, done
+    or failed) and rows scored so far.
+    """
+
+    def __init__(self, max_jobs=DEFAULT_MAX_JOBS, jobs_dir=JOBS_DIR, model_name='best_model',
+                 preprocessor_name='preprocessor', chunksize=DEFAULT_CHUNKSIZE):
+        self.max_jobs = max_jobs
+        self.jobs_dir = jobs_dir
+        self.model_name = model_name
+        self.preprocessor_name = preprocessor_name
+        self.chunksize = chunksize
+        self._pool = ProcessPoolExecutor(max_workers=max_jobs, initializer=_init_worker,
+                                         initargs=(model_name, preprocessor_name))
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def job_dir(self, job_id):
+        return os.path.join(self.jobs_dir, job_id)
+
+    def submit(self, source, name=None, output_format='csv'):
+        """
+        Queue a feature file for scoring.
+
+        Args:
+            source: Path or file-like object (e.g. a Streamlit upload). It is
+                copied into the job directory so the caller can let it go.
+            name (str): File name of `source`, which selects csv/parquet
+            output_format (str): 'csv' or 'parquet'
+
+        Returns:
+            str: Job id
+        """
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = self.job_dir(job_id)
+        os.makedirs(job_dir)
+        name = name or (source if isinstance(source, str) else getattr(source, 'name', 'input.csv'))
+        input_path = os.path.join(job_dir, f'input.{file_format(name)}')
+        if isinstance(source, str):
+            shutil.copyfile(source, input_path)
+        else:
+            with open(input_path, 'wb') as f:
+                shutil.copyfileobj(source, f)
+        output_path = os.path.join(job_dir, f'predictions.{output_format}')
+        _write_status(job_dir, state='queued', rows=0, submitted=time.time())
+
+        with self._lock:
+            self._futures[job_id] = self._pool.submit(
+                _run_job, job_dir, input_path, output_path,
+                self.model_name, self.preprocessor_name, self.chunksize)
+        return job_id
+
+    def status(self, job_id):
+        """Status dict of a job, read from its status.json"""
+        status = read_status(self.job_dir(job_id))
+        future = self._futures.get(job_id)
+        if future is not None and future.done() and status.get('state') not in FINAL_STATES:
+            # The worker died before it could record the outcome
+            error = future.exception()
+            status.update(state='failed', error=f"{type(error).__name__}: {error}")
+        return status
+
+    def wait(self, job_id, poll_seconds=0.5, progress=None):
+        """Block until a job finishes, calling `progress(status)` on every poll"""
+        while True:
+            status = self.status(job_id)
+            if progress:
+                progress(status)
+            if status.get('state') in FINAL_STATES:
+                return status
+            time.sleep(poll_seconds)
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score feature files as background jobs")
+    parser.add_argument('inputs', nargs='+', help="Customer feature files (csv or parquet)")
+    parser.add_argument('--max-jobs', type=int, default=DEFAULT_MAX_JOBS, help="Jobs running at once")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--jobs-dir', default=JOBS_DIR)
+    args = parser.parse_args()
+
+    pool = JobPool(args.max_jobs, args.jobs_dir, chunksize=args.chunksize)
+    job_ids = [pool.submit(path) for path in args.inputs]
+    for job_id, path in zip(job_ids, args.inputs):
+        status = pool.wait(job_id)
+        if status['state'] == 'done':
+            print(f"{job_id} {path}: scored {status['rows']} rows in {status['seconds']:.1f}s "
+                  f"({status['rows_per_sec']:.0f} rows/sec) -> {status['output_path']}")
+        else:
+            print(f"{job_id} {path}: {status['error']}")
+    pool.shutdown()
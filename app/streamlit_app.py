@@ -1,8 +1,16 @@
 import streamlit as st
 import pandas as pd
-import joblib
 import plotly.graph_objects as go
 import json
+import os
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from model_registry import load_model
+from fast_scorer import CompiledScorer
+from bulk_scoring import iter_chunks
+from scoring_jobs import JobPool
+from predict import load_feature_service, predict_transactions
 
 # Setup page config
 st.set_page_config(page_title="Churn Predictor", layout="wide")
@@ -11,8 +19,8 @@ st.set_page_config(page_title="Churn Predictor", layout="wide")
 @st.cache_resource
 def load_assets():
     try:
-        model = joblib.load('models/best_model.pkl')
-        preprocessor = joblib.load('models/preprocessor.pkl')
+        model = load_model('best_model')
+        preprocessor = load_model('preprocessor')
         feature_names = json.load(open('data/processed/feature_names.json'))
         return model, preprocessor, feature_names
     except:
@@ -20,6 +28,29 @@ def load_assets():
 
 model, preprocessor, feature_names = load_assets()
 
+@st.cache_resource
+def load_scorer():
+    # Single-row fast path that skips DataFrame construction and the ColumnTransformer
+    try:
+        return CompiledScorer(preprocessor, model)
+    except (NotImplementedError, AttributeError):
+        return None
+
+@st.cache_resource
+def load_job_pool():
+    # One pool per server, shared by every session; SCORING_MAX_JOBS caps concurrent jobs
+    return JobPool()
+
+def show_risk(prob):
+    st.metric("Churn Probability", f"{prob:.2%}")
+    
+    if prob > 0.7:
+        st.error("High Churn Risk! Action Recommended.")
+    elif prob > 0.4:
+        st.warning("Moderate Risk.")
+    else:
+        st.success("Low Risk. Loyal Customer.")
+
 # Sidebar
 st.sidebar.title("Navigation")
 page = st.sidebar.radio("Go to", ["Home", "Single Prediction", "Batch Prediction", "Dashboard"])
@@ -30,7 +61,7 @@ if page == "Home":
     Welcome to RetailCo Analytics Churn Predictor.
     
     ### How to use:
-    1. **Single Prediction**: Enter customer details to get a real-time churn risk score.
+    1. **Single Prediction**: Upload a customer's invoice lines, or enter their features, to get a real-time churn risk score.
     2. **Batch Prediction**: Upload a CSV of customers to score them all at once.
     3. **Dashboard**: View model performance metrics.
     """)
@@ -43,86 +74,125 @@ elif page == "Single Prediction":
     if not model:
         st.error("Model not found. Please train the model first.")
         st.stop()
-        
-    col1, col2 = st.columns(2)
     
-    with col1:
-        recency = st.number_input("Recency (Days since last buy)", min_value=0, value=30)
-        frequency = st.number_input("Frequency (Total transactions)", min_value=1, value=5)
-        total_spent = st.number_input("Total Spent (£)", min_value=0.0, value=500.0)
-        lifetime = st.number_input("Customer Lifetime (Days)", min_value=0, value=100)
-
-    with col2:
-        avg_days = st.number_input("Avg Days Between Purchases", min_value=0.0, value=20.0)
-        total_items = st.number_input("Total Items Purchased", min_value=1, value=50)
-        unique_products = st.number_input("Unique Products", min_value=1, value=10)
+    service = load_feature_service()
+    if service is None:
+        st.error("Training metadata not found. Please rerun data cleaning and feature engineering.")
+        st.stop()
+    
+    source = st.radio("Input", ["Raw transactions", "Feature values"], horizontal=True)
+    
+    if source == "Raw transactions":
+        # Features are computed like the training run: same cleaning filters, aggregates and RFM quartiles
+        uploaded_file = st.file_uploader("Upload the customers' invoice lines (CSV or Parquet)",
+                                         type=['csv', 'parquet'])
+        as_of = st.date_input("Score as of", value=service.training_cutoff.date())
         
-    # Derived inputs rough estimation for demo
-    input_data = {
-        'Recency': recency,
-        'Frequency': frequency,
-        'TotalSpent': total_spent,
-        'TotalItems': total_items,
-        'UniqueProducts': unique_products,
-        'AvgOrderValue': total_spent / frequency if frequency > 0 else 0,
-        'AvgDaysBetweenPurchases': avg_days,
-        'StdDaysBetweenPurchases': 0, # Default
-        'AvgBasketSize': total_items / frequency if frequency > 0 else 0,
-        'MaxBasketSize': total_items / frequency if frequency > 0 else 0, # Approx
-        'CustomerLifetimeDays': lifetime,
-        'R_Score': 4 if recency < 30 else (3 if recency < 60 else 1), # Approx
-        'F_Score': 4 if frequency > 10 else 2,
-        'M_Score': 4 if total_spent > 1000 else 2,
-        'RFM_Score': 8, # Dummy
-        # Add other cols if needed by preprocessor
-    }
+        if uploaded_file and st.button("Predict"):
+            try:
+                if uploaded_file.name.endswith('.parquet'):
+                    transactions = pd.read_parquet(uploaded_file)
+                else:
+                    transactions = pd.read_csv(uploaded_file, encoding='latin1')
+                scored = predict_transactions(transactions, as_of=pd.Timestamp(as_of))
+                if scored is None or scored.empty:
+                    st.warning("No customer has a valid transaction on or before that date.")
+                elif len(scored) == 1:
+                    show_risk(scored['Churn_Probability'].iloc[0])
+                    st.write("Features:", scored)
+                else:
+                    st.write(f"Scored {len(scored):,} customers:", scored)
+            except Exception as e:
+                st.error(f"Error in prediction: {e}")
     
-    # We need to match the feature set exactly. 
-    # This is tricky with OneHotEncoding if we don't present the category.
-    # The cleaned data had 'CustomerSegment' which was OHE.
-    # We should let user select segment or infer it.
-    segment = st.selectbox("Customer Segment", ["Champions", "Loyal", "Potential", "At Risk", "Lost"])
-    input_data['CustomerSegment'] = segment
+    else:
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            recency = st.number_input("Recency (Days since last buy)", min_value=0, value=30)
+            frequency = st.number_input("Frequency (Total transactions)", min_value=1, value=5)
+            total_spent = st.number_input("Total Spent (£)", min_value=0.0, value=500.0)
+            lifetime = st.number_input("Customer Lifetime (Days)", min_value=0, value=100)
+            unique_products = st.number_input("Unique Products", min_value=1, value=10)
     
-    if st.button("Predict"):
-        df_input = pd.DataFrame([input_data])
+        with col2:
+            avg_days = st.number_input("Avg Days Between Purchases", min_value=0.0, value=20.0)
+            std_days = st.number_input("Std Days Between Purchases", min_value=0.0, value=0.0)
+            total_items = st.number_input("Total Items Purchased", min_value=1, value=50)
+            max_basket = st.number_input("Largest Basket (items)", min_value=1, value=10)
+        
+        input_data = {
+            'Recency': recency,
+            'Frequency': frequency,
+            'TotalSpent': total_spent,
+            'TotalItems': total_items,
+            'UniqueProducts': unique_products,
+            'AvgOrderValue': total_spent / frequency,
+            'AvgDaysBetweenPurchases': avg_days,
+            'StdDaysBetweenPurchases': std_days,
+            'AvgBasketSize': total_items / frequency,
+            'MaxBasketSize': max_basket,
+            'CustomerLifetimeDays': lifetime
+        }
+        # R/F/M scores and segment from the training quartiles
+        input_data = service.segment(pd.DataFrame([input_data])).iloc[0].to_dict()
+        st.caption(f"RFM score {input_data['RFM_Score']} ({input_data['CustomerSegment']})")
         
-        try:
-            X_processed = preprocessor.transform(df_input)
-            prob = model.predict_proba(X_processed)[0][1]
-            pred = model.predict(X_processed)[0]
-            
-            st.metric("Churn Probability", f"{prob:.2%}")
-            
-            if prob > 0.7:
-                st.error("High Churn Risk! Action Recommended.")
-            elif prob > 0.4:
-                st.warning("Moderate Risk.")
-            else:
-                st.success("Low Risk. Loyal Customer.")
-                
-        except Exception as e:
-            st.error(f"Error in prediction: {e}")
+        if st.button("Predict"):
+            try:
+                scorer = load_scorer()
+                if scorer is not None:
+                    prob = scorer.predict_proba(input_data)[0]
+                else:
+                    X_processed = preprocessor.transform(pd.DataFrame([input_data]))
+                    prob = model.predict_proba(X_processed)[0][1]
+                show_risk(prob)
+            except Exception as e:
+                st.error(f"Error in prediction: {e}")
 
 elif page == "Batch Prediction":
     st.header("Batch Prediction")
-    uploaded_file = st.file_uploader("Upload CSV", type=['csv'])
+    pool = load_job_pool()
+    uploaded_file = st.file_uploader("Upload CSV or Parquet", type=['csv', 'parquet'])
     
     if uploaded_file:
-        df = pd.read_csv(uploaded_file)
-        st.write("Uploaded Data Preview:", df.head())
+        if uploaded_file.name.endswith('.parquet'):
+            preview = next(iter_chunks(uploaded_file, chunksize=5))
+        else:
+            preview = pd.read_csv(uploaded_file, nrows=5)
+        uploaded_file.seek(0)
+        st.write("Uploaded Data Preview:", preview)
         
         if st.button("Run Predictions"):
-            try:
-                X_processed = preprocessor.transform(df)
-                probs = model.predict_proba(X_processed)[:, 1]
-                df['Churn_Probability'] = probs
-                df['Prediction'] = (probs > 0.5).astype(int)
-                
-                st.write("Results:", df.head())
-                st.download_button("Download Results", df.to_csv(index=False), "predictions.csv")
-            except Exception as e:
-                st.error(f"Error: {e}")
+            # Scoring runs in the background pool; this session only polls the job's status file
+            job_id = pool.submit(uploaded_file, name=uploaded_file.name)
+            st.session_state.setdefault('scoring_jobs', []).append(job_id)
+    
+    running = False
+    for job_id in reversed(st.session_state.get('scoring_jobs', [])):
+        status = pool.status(job_id)
+        state = status.get('state', 'queued')
+        st.subheader(f"Job {job_id}")
+        if state == 'queued':
+            st.info(f"Queued (at most {pool.max_jobs} jobs run at once)")
+            running = True
+        elif state == 'running':
+            total = status.get('total_rows') or 0
+            done = min(status['rows'] / total, 1.0) if total else 0.0
+            st.progress(done, text=f"Scored {status['rows']:,} of {total:,} rows")
+            running = True
+        elif state == 'done':
+            st.success(f"Scored {status['rows']:,} rows in {status['seconds']:.1f}s "
+                       f"({status['rows_per_sec']:,.0f} rows/sec)")
+            st.write("Results:", pd.read_csv(status['output_path'], nrows=5))
+            with open(status['output_path'], 'rb') as f:
+                st.download_button("Download Results", f, "predictions.csv", key=f"download_{job_id}")
+        else:
+            st.error(f"Error: {status.get('error')}")
+    
+    if running:
+        time.sleep(1)
+        st.rerun()
 
 elif page == "Dashboard":
     st.header("Model Performance")
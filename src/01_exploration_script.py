@@ -2,15 +2,15 @@ import pandas as pd
 import numpy as np
 import json
 import os
+from storage import load_table, table_exists
 
 def run_exploration():
     print("Loading data for exploration...")
-    if not os.path.exists('data/raw/online_retail.csv'):
+    if not table_exists('data/raw/online_retail'):
         print("Data file not found!")
         return
 
-    # Load with low_memory=False to avoid dtypes warning
-    df = pd.read_csv('data/raw/online_retail.csv', low_memory=False)
+    df = load_table('data/raw/online_retail')
     
     # Rename columns to standard format
     df.rename(columns={
@@ -27,7 +27,7 @@ def run_exploration():
         'total_rows': len(df),
         'total_columns': len(df.columns),
         'missing_values': df.isnull().sum().to_dict(),
-        'duplicate_rows': int(df.duplicated().sum()),
+        'duplicate_rows': int(df.drop(columns='Sheet', errors='ignore').duplicated().sum()),
         'date_range': {
             'start': str(df['InvoiceDate'].min()),
             'end': str(df['InvoiceDate'].max())
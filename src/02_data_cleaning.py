@@ -3,7 +3,12 @@ import numpy as np
 from datetime import datetime
 import json
 import logging
+import math
 import os
+from dedup import row_fingerprints, duplicated, drop_duplicates, PartitionSpill
+from storage import (resolve_table, save_table, TableWriter, CLEANED_TRANSACTIONS_SCHEMA,
+                     compact_transactions, memory_report, unit_price)
+from profiling import traced
 
 # Setup logging
 os.makedirs('logs', exist_ok=True)
@@ -13,14 +18,82 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+RENAME_MAP = {
+    'Invoice': 'InvoiceNo',
+    'Price': 'UnitPrice',
+    'Customer ID': 'CustomerID'
+}
+
+# Text columns are read as strings in streaming mode so every chunk gets the
+# same dtype regardless of which values it happens to contain
+STREAMING_DTYPES = {
+    'Invoice': str, 'InvoiceNo': str,
+    'StockCode': str, 'Description': str, 'Country': str
+}
+
+# Provenance columns added by the workbook conversion. They are kept in the
+# output but ignored when looking for duplicates, so a transaction listed on
+# both yearly sheets is kept once.
+PROVENANCE_COLUMNS = ['Sheet']
+
+def dedup_columns(df):
+    """Columns that identify a transaction for duplicate removal"""
+    return [c for c in df.columns if c not in PROVENANCE_COLUMNS]
+
+def quantile_from_counts(values, counts, q):
+    """
+    Exact quantile (linear interpolation, as pandas) from a value -> count table.
+    Used by the streaming mode so IQR bounds need only the distinct values in memory.
+    """
+    order = np.argsort(values)
+    values = np.asarray(values)[order]
+    cum_counts = np.cumsum(np.asarray(counts)[order])
+    if len(cum_counts) == 0:
+        # NaN, like the quantile of an empty Series
+        return np.nan
+    pos = (cum_counts[-1] - 1) * q
+    lo = values[np.searchsorted(cum_counts, math.floor(pos), side='right')]
+    hi = values[np.searchsorted(cum_counts, math.ceil(pos), side='right')]
+    return lo + (pos - math.floor(pos)) * (hi - lo)
+
+def row_partitions(df, n_partitions):
+    """Partition number of each row from a fingerprint of all its values"""
+    df = df[dedup_columns(df)]
+    # InvoiceNo is compacted per chunk (int32, or categorical when a chunk has
+    # non-numeric invoices), so hash it as text to agree across chunks
+    if 'InvoiceNo' in df.columns:
+        df = df.astype({'InvoiceNo': str})
+    # Portable: numbers hash the same in every chunk even if a chunk's NaNs
+    # changed the column dtype
+    return (row_fingerprints(df, portable=True) % np.uint64(n_partitions)).astype(np.int64)
+
+def _frame_rows(cleaner):
+    return None if cleaner.df is None else len(cleaner.df)
+
+def _frame_mb(cleaner):
+    return None if cleaner.df is None else memory_report(cleaner.df)['total_mb']
+
 class DataCleaner:
     """
     Comprehensive data cleaning pipeline for Online Retail dataset
     """
     
-    def __init__(self, input_path='data/raw/online_retail.csv'):
-        """Initialize with raw data path"""
+    def __init__(self, input_path='data/raw/online_retail', storage_format=None, fused=False,
+                 chunksize=None, memory_limit_mb=512, iqr_multiplier=1.5):
+        """
+        Initialize with raw data path and output storage format (csv/parquet).
+        The raw path may be a CSV or Parquet file, or a stem resolved to either.
+        Quantity outliers are rows above Q3 + iqr_multiplier * IQR.
+        With fused=True steps 1-7 run as a single masked pass (see apply_fused_filters).
+        With chunksize set the raw file is streamed in chunks (see run_streaming) and
+        memory_limit_mb bounds the size of each spilled partition.
+        """
         self.input_path = input_path
+        self.storage_format = storage_format
+        self.fused = fused
+        self.chunksize = chunksize
+        self.memory_limit_mb = memory_limit_mb
+        self.iqr_multiplier = iqr_multiplier
         self.df = None
         self.cleaning_stats = {
             'original_rows': 0,
@@ -31,25 +104,21 @@ class DataCleaner:
             'steps_applied': []
         }
     
+    @traced(rows=_frame_rows, memory=_frame_mb)
     def load_data(self):
         """Load raw dataset"""
         logging.info("Loading raw dataset...")
         try:
-            self.df = pd.read_csv(
-                self.input_path,
-                encoding='latin1',  # Commonly needed for this dataset
-                parse_dates=['InvoiceDate']
-            )
-            # Normalize column names just in case
-            self.df.columns = [c.strip() for c in self.df.columns]
-            
-            # Rename columns to standard names
-            rename_map = {
-                'Invoice': 'InvoiceNo',
-                'Price': 'UnitPrice',
-                'Customer ID': 'CustomerID'
-            }
-            self.df.rename(columns=rename_map, inplace=True)
+            input_path, fmt = resolve_table(self.input_path)
+            if fmt == 'parquet':
+                self.df = pd.read_parquet(input_path, engine='pyarrow')
+            else:
+                self.df = pd.read_csv(
+                    input_path,
+                    encoding='latin1',  # Commonly needed for this dataset
+                    parse_dates=['InvoiceDate']
+                )
+            self.df = compact_transactions(self._normalize_columns(self.df))
 
             self.cleaning_stats['original_rows'] = len(self.df)
             self.cleaning_stats['missing_values_before'] = self.df.isnull().sum().to_dict()
@@ -60,6 +129,15 @@ class DataCleaner:
             logging.error(f"Error loading data: {e}")
             raise e
     
+    @staticmethod
+    def _normalize_columns(df):
+        # Normalize column names just in case
+        df.columns = [c.strip() for c in df.columns]
+        
+        # Rename columns to standard names
+        return df.rename(columns=RENAME_MAP)
+    
+    @traced(rows=_frame_rows, memory=_frame_mb)
     def remove_missing_customer_ids(self):
         """Step 1: Remove rows with missing CustomerID"""
         logging.info("Step 1: Removing missing CustomerIDs...")
@@ -75,14 +153,13 @@ class DataCleaner:
         })
         return self
     
+    @traced(rows=_frame_rows, memory=_frame_mb)
     def handle_cancelled_invoices(self):
         """Step 2: Remove cancelled invoices"""
         logging.info("Step 2: Handling cancelled invoices...")
         initial_rows = len(self.df)
         
-        # Ensure InvoiceNo is string
-        self.df['InvoiceNo'] = self.df['InvoiceNo'].astype(str)
-        self.df = self.df[~self.df['InvoiceNo'].str.contains('C', na=False)]
+        self.df = self.df[~self.df['IsCancelled']]
         
         rows_removed = initial_rows - len(self.df)
         logging.info(f"Removed {rows_removed} cancelled invoices")
@@ -92,6 +169,7 @@ class DataCleaner:
         })
         return self
     
+    @traced(rows=_frame_rows, memory=_frame_mb)
     def handle_negative_quantities(self):
         """Step 3: Remove negative quantities"""
         logging.info("Step 3: Handling negative quantities...")
@@ -107,6 +185,7 @@ class DataCleaner:
         })
         return self
     
+    @traced(rows=_frame_rows, memory=_frame_mb)
     def handle_zero_prices(self):
         """Step 4: Remove zero/negative prices"""
         logging.info("Step 4: Removing zero/negative prices...")
@@ -122,6 +201,7 @@ class DataCleaner:
         })
         return self
     
+    @traced(rows=_frame_rows, memory=_frame_mb)
     def handle_missing_descriptions(self):
         """Step 5: Handle missing product descriptions (Remove)"""
         logging.info("Step 5: Handling missing descriptions...")
@@ -137,6 +217,7 @@ class DataCleaner:
         })
         return self
     
+    @traced(rows=_frame_rows, memory=_frame_mb)
     def remove_outliers(self):
         """Step 6: Remove outliers using IQR"""
         logging.info("Step 6: Removing outliers using IQR method...")
@@ -146,7 +227,7 @@ class DataCleaner:
         Q1 = self.df['Quantity'].quantile(0.25)
         Q3 = self.df['Quantity'].quantile(0.75)
         IQR = Q3 - Q1
-        upper_bound = Q3 + 1.5 * IQR
+        upper_bound = Q3 + self.iqr_multiplier * IQR
         
         self.df = self.df[self.df['Quantity'] <= upper_bound]
         
@@ -166,34 +247,100 @@ class DataCleaner:
         self.cleaning_stats['steps_applied'].append({
             'step': 'remove_outliers',
             'rows_removed': rows_removed,
-            'method': 'IQR_Quantity'
+            'method': 'IQR_Quantity',
+            'iqr_multiplier': self.iqr_multiplier,
+            'upper_bound': float(upper_bound)
         })
         return self
     
+    @traced(rows=_frame_rows, memory=_frame_mb)
     def remove_duplicates(self):
         """Step 7: Remove duplicate transactions"""
         logging.info("Step 7: Removing duplicates...")
         initial_rows = len(self.df)
         
-        self.df = self.df.drop_duplicates()
+        # Fingerprint dedup, exact: rows sharing a fingerprint are compared on their values
+        stats = {}
+        self.df = drop_duplicates(self.df, dedup_columns(self.df), stats=stats)
         
         rows_removed = initial_rows - len(self.df)
-        logging.info(f"Removed {rows_removed} duplicate rows")
+        logging.info(f"Removed {rows_removed} duplicate rows "
+                     f"({stats['candidates']} fingerprint candidates, {stats['collisions']} collisions)")
         self.cleaning_stats['steps_applied'].append({
             'step': 'remove_duplicates',
             'rows_removed': rows_removed
         })
         return self
     
+    def row_filter_predicates(self, df):
+        """
+        Keep-masks of the row-level steps 1-5, in pipeline order.
+        Each mask is True for the rows that step would keep.
+        """
+        return [
+            ('remove_missing_customer_ids', df['CustomerID'].notna().to_numpy()),
+            ('handle_cancelled_invoices', ~df['IsCancelled'].to_numpy()),
+            ('handle_negative_quantities', (df['Quantity'] > 0).to_numpy()),
+            ('handle_zero_prices', (df['UnitPrice'] > 0).to_numpy()),
+            ('handle_missing_descriptions', df['Description'].notna().to_numpy())
+        ]
+    
+    @traced(rows=_frame_rows, memory=_frame_mb)
+    def apply_fused_filters(self):
+        """
+        Steps 1-7 fused: evaluate every predicate as one boolean mask and filter once.
+        
+        Each removed row is attributed to the first step that would have dropped it,
+        so steps_applied matches the chained pipeline. Duplicates are flagged on the
+        full frame: identical rows get identical predicate results, so a surviving
+        row has an earlier surviving twin exactly when it has an earlier twin at all.
+        """
+        logging.info("Steps 1-7: Applying fused row filters...")
+        df = self.df
+        
+        alive = np.ones(len(df), dtype=bool)
+        for step, keep in self.row_filter_predicates(df):
+            rows_removed = int(np.count_nonzero(alive & ~keep))
+            alive &= keep
+            logging.info(f"{step}: removed {rows_removed} rows")
+            self.cleaning_stats['steps_applied'].append({
+                'step': step,
+                'rows_removed': rows_removed
+            })
+        
+        # Quantity IQR bound over the rows that survived steps 1-5
+        Q1, Q3 = df['Quantity'][alive].quantile([0.25, 0.75])
+        upper_bound = Q3 + self.iqr_multiplier * (Q3 - Q1)
+        keep = (df['Quantity'] <= upper_bound).to_numpy()
+        rows_removed = int(np.count_nonzero(alive & ~keep))
+        alive &= keep
+        logging.info(f"remove_outliers: removed {rows_removed} rows")
+        self.cleaning_stats['steps_applied'].append({
+            'step': 'remove_outliers',
+            'rows_removed': rows_removed,
+            'method': 'IQR_Quantity',
+            'iqr_multiplier': self.iqr_multiplier,
+            'upper_bound': float(upper_bound)
+        })
+        
+        keep = ~duplicated(df, dedup_columns(df))
+        rows_removed = int(np.count_nonzero(alive & ~keep))
+        alive &= keep
+        logging.info(f"remove_duplicates: removed {rows_removed} rows")
+        self.cleaning_stats['steps_applied'].append({
+            'step': 'remove_duplicates',
+            'rows_removed': rows_removed
+        })
+        
+        self.df = df[alive]
+        return self
+    
+    @traced(rows=_frame_rows, memory=_frame_mb)
     def add_derived_columns(self):
         """Step 8: Add derived columns"""
         logging.info("Step 8: Creating derived columns...")
         
-        self.df['TotalPrice'] = self.df['Quantity'] * self.df['UnitPrice']
-        self.df['Year'] = self.df['InvoiceDate'].dt.year
-        self.df['Month'] = self.df['InvoiceDate'].dt.month
-        self.df['DayOfWeek'] = self.df['InvoiceDate'].dt.dayofweek
-        self.df['Hour'] = self.df['InvoiceDate'].dt.hour
+        self.df = self._derive_columns(self.df)
         
         logging.info("Created derived columns: TotalPrice, Year, Month, DayOfWeek, Hour")
         self.cleaning_stats['steps_applied'].append({
@@ -202,12 +349,12 @@ class DataCleaner:
         })
         return self
     
+    @traced(rows=_frame_rows, memory=_frame_mb)
     def convert_data_types(self):
         """Step 9: Convert data types"""
         logging.info("Step 9: Converting data types...")
         
-        self.df['CustomerID'] = self.df['CustomerID'].astype(int)
-        self.df['Country'] = self.df['Country'].astype('category')
+        self.df = self._convert_types(self.df)
         
         logging.info("Data type conversions completed")
         self.cleaning_stats['steps_applied'].append({
@@ -215,40 +362,184 @@ class DataCleaner:
         })
         return self
     
-    def save_cleaned_data(self, output_path='data/processed/cleaned_transactions.csv'):
-        """Save cleaned dataset"""
+    @staticmethod
+    def _derive_columns(df):
+        df['TotalPrice'] = df['Quantity'] * unit_price(df)
+        df['Year'] = df['InvoiceDate'].dt.year.astype('int16')
+        df['Month'] = df['InvoiceDate'].dt.month.astype('int8')
+        df['DayOfWeek'] = df['InvoiceDate'].dt.dayofweek.astype('int8')
+        df['Hour'] = df['InvoiceDate'].dt.hour.astype('int8')
+        return df
+    
+    @staticmethod
+    def _convert_types(df):
+        df['CustomerID'] = df['CustomerID'].astype('int32')
+        return compact_transactions(df)
+    
+    @traced(rows=_frame_rows, memory=_frame_mb)
+    def save_cleaned_data(self, output_path='data/processed/cleaned_transactions'):
+        """Save cleaned dataset with the configured storage backend"""
         logging.info("Saving cleaned data...")
         os.makedirs('data/processed', exist_ok=True)
         
-        self.df.to_csv(output_path, index=False)
+        output_path = save_table(self.df, output_path, fmt=self.storage_format,
+                                 schema=CLEANED_TRANSACTIONS_SCHEMA)
         logging.info(f"Cleaned data saved to: {output_path}")
         
         self.cleaning_stats['rows_after_cleaning'] = len(self.df)
+        self.cleaning_stats['missing_values_after'] = self.df.isnull().sum().to_dict()
+        return self._save_statistics()
+    
+    def _save_statistics(self):
         self.cleaning_stats['rows_removed'] = (
             self.cleaning_stats['original_rows'] - 
             self.cleaning_stats['rows_after_cleaning']
         )
-        self.cleaning_stats['missing_values_after'] = self.df.isnull().sum().to_dict()
         
         with open('data/processed/cleaning_statistics.json', 'w') as f:
             json.dump(self.cleaning_stats, f, indent=4, default=str)
         
         print(f"Original rows: {self.cleaning_stats['original_rows']}")
         print(f"Cleaned rows: {self.cleaning_stats['rows_after_cleaning']}")
-        print(f"Retention rate: {(self.cleaning_stats['rows_after_cleaning']/self.cleaning_stats['original_rows']*100):.2f}%")
+        if self.cleaning_stats['original_rows']:
+            print(f"Retention rate: {(self.cleaning_stats['rows_after_cleaning']/self.cleaning_stats['original_rows']*100):.2f}%")
         
         return self
     
+    @traced(rows=lambda cleaner: cleaner.cleaning_stats['rows_after_cleaning'] or None)
+    def run_streaming(self, output_path='data/processed/cleaned_transactions'):
+        """
+        Clean a raw file larger than memory in two bounded passes.
+        
+        Pass 1 reads `chunksize` rows at a time, applies the row-level steps 1-5,
+        counts surviving Quantity values for the IQR bound and spills survivors to
+        disk partitions by a fingerprint of the whole row (see dedup.PartitionSpill). Pass 2 loads one partition at a
+        time, applies the outlier bound and drops duplicates (identical rows always
+        share a partition), derives columns and appends to the output table.
+        Peak memory is one chunk or one partition, independent of the input size.
+        Output rows are grouped by partition instead of following the input order.
+        """
+        logging.info(f"Streaming raw dataset in chunks of {self.chunksize} rows...")
+        input_path, fmt = resolve_table(self.input_path)
+        file_bytes = os.path.getsize(input_path)
+        # In-memory frames of this data are roughly 3x the size of the CSV text,
+        # and the compressed Parquet file is roughly 4x smaller than the CSV
+        expansion = 12 if fmt == 'parquet' else 3
+        n_partitions = max(1, math.ceil(expansion * file_bytes / (self.memory_limit_mb * 1024 ** 2)))
+        step_counts = {}
+        columns = None
+        empty = None
+        quantity_counts = pd.Series(dtype='float64')
+        missing_before = pd.Series(dtype='int64')
+        with PartitionSpill(n_partitions, directory='data/processed') as spill:
+            # Pass 1: row filters, quantity histogram, hash-partitioned spill
+            for chunk in self._read_chunks(input_path, fmt):
+                chunk = compact_transactions(self._normalize_columns(chunk))
+                columns = columns if columns is not None else list(chunk.columns)
+                self.cleaning_stats['original_rows'] += len(chunk)
+                missing_before = missing_before.add(chunk.isnull().sum(), fill_value=0)
+                
+                alive = np.ones(len(chunk), dtype=bool)
+                for step, keep in self.row_filter_predicates(chunk):
+                    step_counts[step] = step_counts.get(step, 0) + int(np.count_nonzero(alive & ~keep))
+                    alive &= keep
+                chunk = chunk[alive].copy()
+                quantity_counts = quantity_counts.add(chunk['Quantity'].value_counts(), fill_value=0)
+                
+                # Chunks may compact UnitPrice differently; spill exact float64 prices
+                chunk['UnitPrice'] = unit_price(chunk)
+                empty = empty if empty is not None else chunk.iloc[:0]
+                spill.add(chunk, row_partitions(chunk, n_partitions))
+            
+            self.cleaning_stats['missing_values_before'] = missing_before.reindex(columns).astype(int).to_dict()
+            for step, rows_removed in step_counts.items():
+                logging.info(f"{step}: removed {rows_removed} rows")
+                self.cleaning_stats['steps_applied'].append({'step': step, 'rows_removed': rows_removed})
+            
+            Q1 = quantile_from_counts(quantity_counts.index, quantity_counts.to_numpy(), 0.25)
+            Q3 = quantile_from_counts(quantity_counts.index, quantity_counts.to_numpy(), 0.75)
+            upper_bound = Q3 + self.iqr_multiplier * (Q3 - Q1)
+            
+            # Pass 2: one partition in memory at a time
+            outliers_removed = 0
+            duplicates_removed = 0
+            missing_after = pd.Series(dtype='int64')
+            output_columns = None
+            with TableWriter(output_path, fmt=self.storage_format,
+                             schema=CLEANED_TRANSACTIONS_SCHEMA) as writer:
+                for part in spill.partitions():
+                    # Chunks have their own categories; concat falls back to object
+                    part = compact_transactions(part)
+                    
+                    rows = len(part)
+                    part = part[part['Quantity'] <= upper_bound]
+                    outliers_removed += rows - len(part)
+                    rows = len(part)
+                    part = drop_duplicates(part, dedup_columns(part))
+                    duplicates_removed += rows - len(part)
+                    
+                    part = self._convert_types(self._derive_columns(part.copy()))
+                    # Keep one UnitPrice dtype across the partitions of the output file
+                    part['UnitPrice'] = unit_price(part)
+                    missing_after = missing_after.add(part.isnull().sum(), fill_value=0)
+                    writer.write(part)
+                    output_columns = list(part.columns)
+                if output_columns is None:
+                    # Every row was filtered out: still write the table, with its columns.
+                    # A file without rows does not parse its dates
+                    part = empty.astype({'InvoiceDate': 'datetime64[ns]'})
+                    part = self._convert_types(self._derive_columns(part))
+                    writer.write(part)
+                    output_columns = list(part.columns)
+            output_path = writer.path
+        
+        self.cleaning_stats['steps_applied'] += [
+            {'step': 'remove_outliers', 'rows_removed': outliers_removed, 'method': 'IQR_Quantity',
+             'iqr_multiplier': self.iqr_multiplier, 'upper_bound': float(upper_bound)},
+            {'step': 'remove_duplicates', 'rows_removed': duplicates_removed},
+            {'step': 'add_derived_columns',
+             'columns_added': ['TotalPrice', 'Year', 'Month', 'DayOfWeek', 'Hour']},
+            {'step': 'convert_data_types'}
+        ]
+        logging.info(f"Removed {outliers_removed} outlier rows and {duplicates_removed} duplicate rows")
+        logging.info(f"Cleaned data saved to: {output_path}")
+        
+        self.cleaning_stats['rows_after_cleaning'] = writer.rows_written
+        self.cleaning_stats['missing_values_after'] = missing_after.reindex(output_columns, fill_value=0).astype(int).to_dict()
+        self._save_statistics()
+        return self
+    
+    def _read_chunks(self, input_path, fmt):
+        if fmt == 'parquet':
+            import pyarrow.parquet as pq
+            parquet_file = pq.ParquetFile(input_path)
+            if parquet_file.metadata.num_rows == 0:
+                # No batches to iterate; one empty chunk still carries the columns
+                yield parquet_file.schema_arrow.empty_table().to_pandas()
+                return
+            for batch in parquet_file.iter_batches(batch_size=self.chunksize):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(input_path, encoding='latin1', parse_dates=['InvoiceDate'],
+                                   dtype=STREAMING_DTYPES, chunksize=self.chunksize)
+    
     def run_pipeline(self):
         print("Starting cleaning pipeline...")
+        if self.chunksize:
+            self.run_streaming()
+            print("Pipeline finished.")
+            return None
         self.load_data()
-        self.remove_missing_customer_ids()
-        self.handle_cancelled_invoices()
-        self.handle_negative_quantities()
-        self.handle_zero_prices()
-        self.handle_missing_descriptions()
-        self.remove_outliers()
-        self.remove_duplicates()
+        if self.fused:
+            self.apply_fused_filters()
+        else:
+            self.remove_missing_customer_ids()
+            self.handle_cancelled_invoices()
+            self.handle_negative_quantities()
+            self.handle_zero_prices()
+            self.handle_missing_descriptions()
+            self.remove_outliers()
+            self.remove_duplicates()
         self.add_derived_columns()
         self.convert_data_types()
         self.save_cleaned_data()
@@ -256,5 +547,18 @@ class DataCleaner:
         return self.df
 
 if __name__ == "__main__":
-    cleaner = DataCleaner()
+    import argparse
+    parser = argparse.ArgumentParser(description="Clean raw Online Retail transactions")
+    parser.add_argument('--input', default='data/raw/online_retail',
+                        help="Raw transactions file (.csv or .parquet), or a stem resolved to either")
+    parser.add_argument('--iqr-multiplier', type=float, default=1.5,
+                        help="Quantity rows above Q3 + k * IQR are removed as outliers")
+    parser.add_argument('--fused', action='store_true', help="Apply steps 1-7 as a single masked pass")
+    parser.add_argument('--chunksize', type=int, help="Stream the raw file in chunks of this many rows")
+    parser.add_argument('--memory-limit-mb', type=int, default=512,
+                        help="Partition size budget for the streaming mode")
+    args = parser.parse_args()
+    
+    cleaner = DataCleaner(input_path=args.input, fused=args.fused, chunksize=args.chunksize,
+                          memory_limit_mb=args.memory_limit_mb, iqr_multiplier=args.iqr_multiplier)
     cleaner.run_pipeline()
@@ -1,9 +1,15 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+import io
 import json
 import logging
 import os
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from storage import (load_table, save_table, apply_schema, compact_transactions, memory_report,
+                     CLEANED_TRANSACTIONS_SCHEMA, CUSTOMER_FEATURES_SCHEMA)
+from profiling import traced
 
 # Setup logging
 logging.basicConfig(
@@ -12,33 +18,244 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+# Only these columns of the cleaned transactions are used for features
+TRANSACTION_COLUMNS = ['InvoiceNo', 'StockCode', 'Quantity', 'InvoiceDate', 'CustomerID', 'TotalPrice']
+
+DAY_NS = 24 * 60 * 60 * 10**9
+
+def last_position_at_or_before(dates, seg_start, seg_end, cutoff):
+    """
+    Per segment, index of the last element <= cutoff (seg_start - 1 if none).
+    `dates` must be sorted inside each [seg_start, seg_end) segment. This is a
+    vectorized binary search over all segments at once: O(segments * log(length)).
+    """
+    lo = seg_start.copy()
+    hi = seg_end.copy()
+    while True:
+        active = lo < hi
+        if not active.any():
+            return lo - 1
+        mid = (lo + hi) // 2
+        mid_safe = np.where(active, mid, 0)
+        go_right = active & (dates[mid_safe] <= cutoff)
+        lo = np.where(go_right, mid + 1, lo)
+        hi = np.where(active & ~go_right, mid, hi)
+
+INTERVAL_SEMANTICS = ['legacy', 'invoice']
+
+def purchase_intervals(customer_ids, invoices, dates, semantics='legacy'):
+    """
+    Mean and standard deviation of the day gaps between a customer's purchases.
+    
+    semantics='legacy' reproduces the original line-item definition: gaps between
+    consecutive line items in date order, so every extra line of a basket adds a
+    zero gap. semantics='invoice' takes gaps between consecutive invoices.
+    
+    Line items are never sorted. They are collapsed by hashing to unique
+    (customer, date) rows with line counts (legacy) or unique (customer, invoice)
+    rows (invoice). Only those rows are put in customer/date order. The gaps
+    then come from np.diff, and per-customer sums from np.add.reduceat over the
+    customer segments. The extra zero gaps of the legacy definition are added
+    back from the line counts.
+    
+    Returns:
+        pd.DataFrame: CustomerID, AvgDaysBetweenPurchases, StdDaysBetweenPurchases
+            (NaN with fewer than one or two gaps, like pandas mean/std)
+    """
+    if semantics not in INTERVAL_SEMANTICS:
+        raise ValueError(f"Unknown interval semantics '{semantics}', expected one of {INTERVAL_SEMANTICS}")
+    cust_codes, cust_ids = pd.factorize(customer_ids, sort=True)
+    dates = np.asarray(dates).astype('datetime64[ns]').view('int64')
+    if len(cust_codes) == 0:
+        return pd.DataFrame({'CustomerID': customer_ids[:0], 'AvgDaysBetweenPurchases': [],
+                             'StdDaysBetweenPurchases': []}, dtype='float64').astype({'CustomerID': 'int64'})
+    
+    if semantics == 'legacy':
+        # Sorted date codes make the combined key order (customer, date)
+        date_codes, date_values = pd.factorize(dates, sort=True)
+        inverse, rows = pd.factorize(cust_codes.astype(np.int64) * len(date_values) + date_codes)
+        lines = np.bincount(inverse)
+        order = np.argsort(rows)
+        rows, lines = rows[order], lines[order]
+        cust = rows // len(date_values)
+        row_dates = date_values[rows % len(date_values)]
+    else:
+        invoice_codes, invoice_values = pd.factorize(invoices)
+        inverse, rows = pd.factorize(cust_codes.astype(np.int64) * len(invoice_values) + invoice_codes)
+        row_dates = np.full(len(rows), np.iinfo(np.int64).max)
+        np.minimum.at(row_dates, inverse, dates)
+        cust = rows // len(invoice_values)
+        order = np.lexsort((row_dates, cust))
+        cust, row_dates = cust[order], row_dates[order]
+        lines = np.ones(len(rows), dtype=np.int64)
+    
+    seg_start = np.r_[0, np.flatnonzero(cust[1:] != cust[:-1]) + 1]
+    is_gap = np.r_[False, cust[1:] == cust[:-1]]
+    gaps = np.where(is_gap, np.diff(row_dates, prepend=row_dates[:1]) // DAY_NS, 0).astype('float64')
+    
+    # Zero gaps between lines sharing a timestamp (legacy only; 0 for invoices)
+    zeros = np.add.reduceat(lines - 1, seg_start).astype('float64')
+    n_gaps = np.add.reduceat(is_gap.astype(np.int64), seg_start) + zeros
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(n_gaps > 0, np.add.reduceat(gaps, seg_start) / n_gaps, np.nan)
+        # Two-pass variance: squared deviations of the real gaps plus those of the zeros
+        deviation = np.where(is_gap, gaps - np.repeat(mean, np.diff(np.r_[seg_start, len(cust)])), 0)
+        squares = np.add.reduceat(deviation ** 2, seg_start) + zeros * mean ** 2
+        std = np.where(n_gaps > 1, np.sqrt(squares / (n_gaps - 1)), np.nan)
+    
+    return pd.DataFrame({
+        'CustomerID': cust_ids[cust[seg_start]],
+        'AvgDaysBetweenPurchases': mean,
+        'StdDaysBetweenPurchases': std
+    })
+
+# Score column, the feature it is binned from, and the labels of its quartiles
+RFM_SCORES = [
+    ('R_Score', 'Recency', [4, 3, 2, 1]),
+    ('F_Score', 'Frequency', [1, 2, 3, 4]),
+    ('M_Score', 'TotalSpent', [1, 2, 3, 4])
+]
+
+def rank_bin_edges(values, scores):
+    """
+    Value edges of a rank-based qcut: the minimum, the largest value of each of
+    the lower three quartiles, and the maximum. Tied values split across
+    quartiles map to the lowest of them.
+    """
+    upper = values.groupby(scores.cat.codes.to_numpy()).max()
+    return [values.min(), *upper.iloc[:3], values.max()]
+
+def rank_ties(values, customer_ids, scores):
+    """
+    Scores of the customers whose value a rank-based qcut split across
+    quartiles, as {CustomerID: [value, score]}. The split follows row order,
+    so the value edges alone cannot reproduce it.
+    """
+    scores = scores.astype(int)
+    quartiles = scores.groupby(values.to_numpy()).nunique()
+    tied = values.isin(quartiles.index[quartiles > 1]).to_numpy()
+    return {str(int(customer)): [float(value), int(score)]
+            for customer, value, score in zip(customer_ids[tied], values[tied], scores[tied])}
+
+def segment_customers(df):
+    """RFM_Score and CustomerSegment from the R/F/M scores"""
+    df['RFM_Score'] = df['R_Score'] + df['F_Score'] + df['M_Score']
+
+    score = df['RFM_Score']
+    df['CustomerSegment'] = np.select(
+        [score >= 10, score >= 8, score >= 6, score >= 4],
+        ['Champions', 'Loyal', 'Potential', 'At Risk'],
+        default='Lost'
+    )
+    return df
+
+def apply_segment_edges(df, segment_edges, segment_ties=None):
+    """
+    R/F/M scores and segments from quartile edges stored at training time
+    (FeatureEngineer.segment_edges), instead of refitting qcut on `df`.
+
+    Bins are right-closed like pd.qcut; values outside the training range get
+    the lowest or highest quartile. Where training fell back to ranks, a tied
+    value maps to the lowest quartile it spans, except for the customers in
+    `segment_ties` (FeatureEngineer.segment_ties) that still have their
+    training value (up to float rounding): they keep their training score.
+
+    `df` may also be a dict of column arrays.
+    """
+    customers = np.asarray(df['CustomerID']) if 'CustomerID' in df else None
+    for score, column, labels in RFM_SCORES:
+        values = np.asarray(df[column], dtype='float64')
+        inner = np.asarray(segment_edges[column][1:-1], dtype='float64')
+        scores = np.asarray(labels)[np.searchsorted(inner, values, side='left')]
+        ties = (segment_ties or {}).get(column)
+        if ties and customers is not None:
+            for i, customer in enumerate(customers):
+                tie = ties.get(str(int(customer)))
+                if tie is not None and np.isclose(tie[0], values[i], rtol=1e-9, atol=0):
+                    scores[i] = tie[1]
+        df[score] = scores
+    return segment_customers(df)
+
+def _table_rows(engineer):
+    # Customer rows once the customer table exists, transaction rows before that
+    if engineer.customer_features is not None:
+        return len(engineer.customer_features)
+    return None if engineer.transactions is None else len(engineer.transactions)
+
+def _tables_mb(engineer):
+    # Transactions, the train/observation split and the customer table
+    tables = [engineer.transactions, getattr(engineer, 'train_df', None),
+              getattr(engineer, 'obs_df', None), engineer.customer_features]
+    return sum(memory_report(t)['total_mb'] for t in tables if t is not None)
+
+_partition = {}
+
+def _init_partition_worker(transactions, order, training_cutoff, interval_semantics):
+    # Under fork the table is inherited, not pickled
+    _partition.update(transactions=transactions, order=order, training_cutoff=training_cutoff,
+                      interval_semantics=interval_semantics)
+
+def _partition_features(start, end):
+    """Target, RFM, behavioral and temporal features of one customer partition; runs in a worker"""
+    engineer = FeatureEngineer(training_cutoff=_partition['training_cutoff'],
+                               interval_semantics=_partition['interval_semantics'])
+    engineer.transactions = _partition['transactions'].iloc[_partition['order'][start:end]]
+    # The churn rate of a single partition is not worth printing
+    with redirect_stdout(io.StringIO()):
+        (engineer.split_data()
+            .create_target()
+            .create_rfm_features()
+            .create_behavioral_features()
+            .create_temporal_features())
+    return engineer.customer_features
+
 class FeatureEngineer:
     """
     Transform transaction data into customer-level features
     """
     
     def __init__(self, 
-                 transactions_path='data/processed/cleaned_transactions.csv',
-                 training_cutoff='2011-09-09'):
+                 transactions_path='data/processed/cleaned_transactions',
+                 training_cutoff='2011-09-09',
+                 storage_format=None,
+                 workers=None,
+                 interval_semantics='legacy'):
         """
-        Initialize with cleaned transactions
+        Initialize with cleaned transactions.
+        With workers set, per-customer features are computed in that many
+        CustomerID partitions in parallel (see create_customer_features_partitioned).
+        interval_semantics selects line-item ('legacy') or invoice-level gaps
+        for the purchase interval features (see purchase_intervals).
         """
+        if interval_semantics not in INTERVAL_SEMANTICS:
+            raise ValueError(f"Unknown interval semantics '{interval_semantics}', expected one of {INTERVAL_SEMANTICS}")
         self.transactions_path = transactions_path
+        self.storage_format = storage_format
+        self.workers = workers
+        self.interval_semantics = interval_semantics
         self.training_cutoff = pd.to_datetime(training_cutoff)
         self.observation_end = None # Will be set on load
         self.transactions = None
         self.customer_features = None
+        self.segment_edges = None
+        self.segment_ties = None
         
+    @traced(rows=_table_rows, memory=_tables_mb)
     def load_data(self):
         logging.info("Loading transactions...")
-        self.transactions = pd.read_csv(self.transactions_path)
-        self.transactions['InvoiceDate'] = pd.to_datetime(self.transactions['InvoiceDate'])
+        self.transactions = compact_transactions(load_table(
+            self.transactions_path,
+            columns=TRANSACTION_COLUMNS,
+            schema=CLEANED_TRANSACTIONS_SCHEMA,
+            fmt=self.storage_format
+        ))
         self.observation_end = self.transactions['InvoiceDate'].max()
         
         logging.info(f"Training Cutoff: {self.training_cutoff}")
         logging.info(f"Observation End: {self.observation_end}")
         return self
 
+    @traced(rows=_table_rows, memory=_tables_mb)
     def split_data(self):
         """Split into training (features) and observation (labels) sets"""
         logging.info("Splitting data...")
@@ -53,6 +270,7 @@ class FeatureEngineer:
         logging.info(f"Observation Transactions: {len(self.obs_df)}")
         return self
 
+    @traced(rows=_table_rows, memory=_tables_mb)
     def create_target(self):
         """Define Churn Target"""
         logging.info("Creating target variable...")
@@ -61,15 +279,15 @@ class FeatureEngineer:
         train_cust = set(self.train_df['CustomerID'].unique())
         
         # Customers active in observation period
-        obs_cust = set(self.obs_df['CustomerID'].unique())
+        obs_cust = self.obs_df['CustomerID'].unique()
         
         # DataFrame Index
         self.customer_features = pd.DataFrame({'CustomerID': list(train_cust)})
         
         # Churn = 1 if NOT in observation period
-        self.customer_features['Churn'] = self.customer_features['CustomerID'].apply(
-            lambda x: 0 if x in obs_cust else 1
-        )
+        self.customer_features['Churn'] = (
+            ~self.customer_features['CustomerID'].isin(obs_cust)
+        ).astype(int)
         
         churn_rate = self.customer_features['Churn'].mean()
         logging.info(f"Churn Rate: {churn_rate:.2%}")
@@ -77,21 +295,22 @@ class FeatureEngineer:
         
         return self
 
+    @traced(rows=_table_rows, memory=_tables_mb)
     def create_rfm_features(self):
         """Create Recency, Frequency, Monetary features"""
         logging.info("Creating RFM features...")
         
         # Recency: Days since last purchase (relative to CUTOFF, not today)
         # We compute max date per customer, then subtract from cutoff
-        rfm = self.train_df.groupby('CustomerID').agg({
-            'InvoiceDate': lambda x: (self.training_cutoff - x.max()).days,
-            'InvoiceNo': 'nunique',
-            'TotalPrice': 'sum',
-            'Quantity': 'sum',
-            'StockCode': 'nunique'
-        }).reset_index()
+        rfm = self.train_df.groupby('CustomerID').agg(
+            LastPurchase=('InvoiceDate', 'max'),
+            Frequency=('InvoiceNo', 'nunique'),
+            TotalSpent=('TotalPrice', 'sum'),
+            TotalItems=('Quantity', 'sum'),
+            UniqueProducts=('StockCode', 'nunique')
+        ).reset_index()
         
-        rfm.columns = ['CustomerID', 'Recency', 'Frequency', 'TotalSpent', 'TotalItems', 'UniqueProducts']
+        rfm.insert(1, 'Recency', (self.training_cutoff - rfm.pop('LastPurchase')).dt.days)
         
         # Avg Order Value
         rfm['AvgOrderValue'] = rfm['TotalSpent'] / rfm['Frequency']
@@ -99,22 +318,14 @@ class FeatureEngineer:
         self.customer_features = pd.merge(self.customer_features, rfm, on='CustomerID', how='left')
         return self
 
+    @traced(rows=_table_rows, memory=_tables_mb)
     def create_behavioral_features(self):
         """Create behavioral features like purchase intervals"""
         logging.info("Creating behavioral features...")
         
-        # Avg Days Between Purchases
-        # Filter for customers with > 1 purchase to calculate std dev or diff
-        df_sorted = self.train_df.sort_values(['CustomerID', 'InvoiceDate'])
-        
-        # Calculate diff between dates for each customer
-        df_sorted['PrevDate'] = df_sorted.groupby('CustomerID')['InvoiceDate'].shift(1)
-        df_sorted['DaysBetween'] = (df_sorted['InvoiceDate'] - df_sorted['PrevDate']).dt.days
-        
-        behavior = df_sorted.groupby('CustomerID').agg({
-            'DaysBetween': ['mean', 'std']
-        }).reset_index()
-        behavior.columns = ['CustomerID', 'AvgDaysBetweenPurchases', 'StdDaysBetweenPurchases']
+        # Avg/Std Days Between Purchases (NaN for customers with too few purchases)
+        behavior = purchase_intervals(self.train_df['CustomerID'], self.train_df['InvoiceNo'],
+                                      self.train_df['InvoiceDate'], self.interval_semantics)
         
         # Max Basket Size
         basket = self.train_df.groupby(['CustomerID', 'InvoiceNo'])['Quantity'].sum().reset_index()
@@ -125,6 +336,7 @@ class FeatureEngineer:
         self.customer_features = pd.merge(self.customer_features, basket_stats, on='CustomerID', how='left')
         return self
 
+    @traced(rows=_table_rows, memory=_tables_mb)
     def create_temporal_features(self):
         """Create temporal features"""
         logging.info("Creating temporal features...")
@@ -137,6 +349,40 @@ class FeatureEngineer:
         
         return self
 
+    @traced(rows=_table_rows, memory=_tables_mb)
+    def create_customer_features_partitioned(self):
+        """
+        Steps split_data to create_temporal_features over CustomerID hash partitions.
+        
+        Every one of those features depends on a single customer's transactions,
+        so transactions are partitioned by a hash of CustomerID (keeping their
+        order inside a partition) and each partition runs the serial steps in a
+        process pool worker. The partial tables are concatenated and put back in
+        the serial row order, so the result, and the global quartiles of
+        create_segmentation after it, are identical to the serial path.
+        """
+        logging.info(f"Creating customer features in {self.workers} partitions...")
+        tx = self.transactions
+        customers = tx['CustomerID'].to_numpy()
+        parts = (pd.util.hash_array(customers) % np.uint64(self.workers)).astype(np.int64)
+        order = np.argsort(parts, kind='stable')
+        bounds = np.r_[0, np.cumsum(np.bincount(parts, minlength=self.workers))]
+        
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_partition_worker,
+                                 initargs=(tx, order, self.training_cutoff, self.interval_semantics)) as pool:
+            frames = list(pool.map(_partition_features, bounds[:-1], bounds[1:]))
+        features = pd.concat([f for f in frames if len(f)], ignore_index=True)
+        
+        # Row order of create_target
+        serial_order = list(set(customers[(tx['InvoiceDate'] <= self.training_cutoff).to_numpy()]))
+        self.customer_features = features.set_index('CustomerID').loc[serial_order].reset_index()
+        
+        churn_rate = self.customer_features['Churn'].mean()
+        logging.info(f"Churn Rate: {churn_rate:.2%}")
+        print(f"Churn Rate: {churn_rate:.2%}")
+        return self
+
+    @traced(rows=_table_rows, memory=_tables_mb)
     def create_segmentation(self):
         """Create RFM Segments"""
         logging.info("Creating segmentation...")
@@ -145,41 +391,40 @@ class FeatureEngineer:
         
         # Scoring (1-4, 4 is best)
         # Recency: Lower is better (so reverse labels)
-        df['R_Score'] = pd.qcut(df['Recency'], 4, labels=[4, 3, 2, 1])
+        df['R_Score'], r_bins = pd.qcut(df['Recency'], 4, labels=[4, 3, 2, 1], retbins=True)
         # Frequency: Higher is better
         # Use rank(method='first') to handle ties if needed, but qcut usually works okay unless many 1s.
         # Since Frequency has many low values (1, 2), qcut might fail with duplicate edges.
         # We'll use rank-based qcut or try-except
+        self.segment_ties = {}
         try:
-            df['F_Score'] = pd.qcut(df['Frequency'], 4, labels=[1, 2, 3, 4])
+            df['F_Score'], f_bins = pd.qcut(df['Frequency'], 4, labels=[1, 2, 3, 4], retbins=True)
         except ValueError:
             # Fallback for duplicates
             df['F_Score'] = pd.qcut(df['Frequency'].rank(method='first'), 4, labels=[1, 2, 3, 4])
+            f_bins = rank_bin_edges(df['Frequency'], df['F_Score'])
+            self.segment_ties['Frequency'] = rank_ties(df['Frequency'], df['CustomerID'], df['F_Score'])
             
         try:
-            df['M_Score'] = pd.qcut(df['TotalSpent'], 4, labels=[1, 2, 3, 4])
+            df['M_Score'], m_bins = pd.qcut(df['TotalSpent'], 4, labels=[1, 2, 3, 4], retbins=True)
         except ValueError:
             df['M_Score'] = pd.qcut(df['TotalSpent'].rank(method='first'), 4, labels=[1, 2, 3, 4])
+            m_bins = rank_bin_edges(df['TotalSpent'], df['M_Score'])
+            self.segment_ties['TotalSpent'] = rank_ties(df['TotalSpent'], df['CustomerID'], df['M_Score'])
 
         # Convert to int
         df['R_Score'] = df['R_Score'].astype(int)
         df['F_Score'] = df['F_Score'].astype(int)
         df['M_Score'] = df['M_Score'].astype(int)
         
-        df['RFM_Score'] = df['R_Score'] + df['F_Score'] + df['M_Score']
+        # Kept so customers scored later get the training quartiles (see apply_segment_edges)
+        self.segment_edges = {column: [float(edge) for edge in bins] for column, bins in
+                              [('Recency', r_bins), ('Frequency', f_bins), ('TotalSpent', m_bins)]}
         
-        def segment_customer(score):
-            if score >= 10: return 'Champions'
-            elif score >= 8: return 'Loyal'
-            elif score >= 6: return 'Potential'
-            elif score >= 4: return 'At Risk'
-            else: return 'Lost'
-            
-        df['CustomerSegment'] = df['RFM_Score'].apply(segment_customer)
-        
-        self.customer_features = df
+        self.customer_features = segment_customers(df)
         return self
 
+    @traced(rows=_table_rows, memory=_tables_mb)
     def handle_missing(self):
         """Handle NaN values generated by merges"""
         # StdDaysBetweenPurchases will be NaN for customers with 1 purchase
@@ -187,13 +432,14 @@ class FeatureEngineer:
         self.customer_features['AvgDaysBetweenPurchases'] = self.customer_features['AvgDaysBetweenPurchases'].fillna(0) # Logic: 0 days between if only 1 purchase? Or maybe lifetime? Let's use 0 or arbitrary large. Using 0 for now.
         
         # All other feature NaNs (if any)
-        self.customer_features = self.customer_features.fillna(0)
+        self.customer_features = apply_schema(self.customer_features.fillna(0), CUSTOMER_FEATURES_SCHEMA)
         return self
 
+    @traced(rows=_table_rows, memory=_tables_mb)
     def save_features(self):
         """Save features and metadata"""
-        output_path = 'data/processed/customer_features.csv'
-        self.customer_features.to_csv(output_path, index=False)
+        output_path = save_table(self.customer_features, 'data/processed/customer_features',
+                                 fmt=self.storage_format, schema=CUSTOMER_FEATURES_SCHEMA)
         logging.info(f"Features saved to {output_path}")
         print(f"Features saved. Shape: {self.customer_features.shape}")
         
@@ -202,22 +448,174 @@ class FeatureEngineer:
             'total_customers': len(self.customer_features),
             'total_features': len(self.customer_features.columns),
             'churn_rate': self.customer_features['Churn'].mean(),
-            'features': list(self.customer_features.columns)
+            'features': list(self.customer_features.columns),
+            # Read by online_features.OnlineFeatureService to compute features like this run
+            'training_cutoff': str(self.training_cutoff),
+            'interval_semantics': self.interval_semantics,
+            'segment_edges': self.segment_edges,
+            'segment_ties': self.segment_ties
         }
         with open('data/processed/feature_info.json', 'w') as f:
             json.dump(metadata, f, indent=4)
 
+    @traced(rows=_table_rows, memory=_tables_mb)
+    def create_rolling_snapshots(self, cutoffs, horizon_days=None):
+        """
+        Stacked (CustomerID, Cutoff) feature and churn rows for many cutoffs.
+        
+        Transactions are sorted once by customer and date, and every per-customer
+        aggregate is turned into a running (cumulative) column. The snapshot at a
+        cutoff is then read off at each customer's last transaction on or before it,
+        found by binary search, so each extra cutoff costs O(customers * log) rather
+        than another pass over the transactions.
+        
+        Churn = 1 if the customer has no transaction after the cutoff (within
+        `horizon_days` when given). Each cutoff matches a single-cutoff run with
+        training_cutoff=cutoff and the same interval semantics, assuming every
+        invoice carries a single timestamp.
+        """
+        cutoffs = sorted(pd.to_datetime(c) for c in cutoffs)
+        logging.info(f"Creating rolling snapshots for {len(cutoffs)} cutoffs...")
+        tx = self.transactions
+        
+        cust_codes, cust_ids = pd.factorize(tx['CustomerID'], sort=True)
+        dates = tx['InvoiceDate'].to_numpy().astype('datetime64[ns]').view('int64')
+        order = np.lexsort((dates, cust_codes))
+        cust = cust_codes[order]
+        dates = dates[order]
+        quantity = tx['Quantity'].to_numpy()[order]
+        invoice = pd.factorize(tx['InvoiceNo'])[0][order]
+        product = pd.factorize(tx['StockCode'])[0][order]
+        
+        n = len(cust)
+        seg_start = np.r_[0, np.flatnonzero(cust[1:] != cust[:-1]) + 1]
+        seg_end = np.r_[seg_start[1:], n]
+        by_customer = pd.Series(cust)
+        
+        def running_sum(values):
+            return pd.Series(values).groupby(by_customer).cumsum().to_numpy()
+        
+        spent = running_sum(tx['TotalPrice'].to_numpy()[order])
+        items = running_sum(quantity)
+        
+        pairs = pd.DataFrame({'c': cust, 'i': invoice})
+        invoice_start = ~pairs.duplicated().to_numpy()
+        invoices = running_sum(invoice_start.astype('int64'))
+        products = running_sum((~pd.DataFrame({'c': cust, 'p': product}).duplicated()).astype('int64'))
+        
+        # Basket totals become visible at the invoice's last line, then running max
+        basket_total = pd.Series(quantity).groupby([cust, invoice]).transform('sum').to_numpy()
+        basket = np.where(pairs.duplicated(keep='last').to_numpy(), 0, basket_total)
+        max_basket = pd.Series(basket).groupby(by_customer).cummax().to_numpy()
+        
+        # Day gaps as in purchase_intervals: between consecutive lines (legacy),
+        # or between invoices dated by their first line, each counted at that line
+        if self.interval_semantics == 'legacy':
+            same_customer = np.r_[False, cust[1:] == cust[:-1]]
+            gap = np.where(same_customer, np.diff(dates, prepend=dates[0]) // DAY_NS, 0)
+            gap_count = np.arange(n) - np.repeat(seg_start, seg_end - seg_start)
+        else:
+            starts = np.flatnonzero(invoice_start)
+            same_customer = np.r_[False, cust[starts][1:] == cust[starts][:-1]]
+            gap = np.zeros(n, dtype='int64')
+            gap[starts] = np.where(same_customer, np.diff(dates[starts], prepend=dates[0]) // DAY_NS, 0)
+            gap_count = invoices - 1
+        gap_sum = running_sum(gap)
+        gap_sq_sum = running_sum(gap ** 2)
+        
+        snapshots = []
+        for cutoff in cutoffs:
+            t = cutoff.value
+            last = last_position_at_or_before(dates, seg_start, seg_end, t)
+            valid = last >= seg_start
+            p = last[valid]
+            first = seg_start[valid]
+            end = seg_end[valid]
+            
+            frequency = invoices[p]
+            gaps = gap_count[p].astype('float64')
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean_gap = np.where(gaps > 0, gap_sum[p] / gaps, np.nan)
+                var_gap = np.where(gaps > 1, (gap_sq_sum[p] - gap_sum[p] * mean_gap) / (gaps - 1), np.nan)
+            
+            has_next = p + 1 < end
+            next_date = dates[np.where(has_next, p + 1, p)]
+            active = has_next
+            if horizon_days is not None:
+                active = active & (next_date <= t + horizon_days * DAY_NS)
+            
+            snapshot = pd.DataFrame({
+                'CustomerID': cust_ids[valid],
+                'Churn': (~active).astype(int),
+                'Recency': (t - dates[p]) // DAY_NS,
+                'Frequency': frequency,
+                'TotalSpent': spent[p],
+                'TotalItems': items[p],
+                'UniqueProducts': products[p],
+                'AvgOrderValue': spent[p] / frequency,
+                'AvgDaysBetweenPurchases': mean_gap,
+                'StdDaysBetweenPurchases': np.sqrt(np.clip(var_gap, 0, None)),
+                'AvgBasketSize': items[p] / frequency,
+                'MaxBasketSize': max_basket[p],
+                'CustomerLifetimeDays': (t - dates[first]) // DAY_NS
+            })
+            
+            # Quartile scores are relative to the customers at this cutoff
+            self.customer_features = snapshot
+            self.create_segmentation()
+            self.handle_missing()
+            self.customer_features.insert(1, 'Cutoff', cutoff)
+            snapshots.append(self.customer_features)
+            logging.info(f"Cutoff {cutoff.date()}: {len(snapshot)} customers, "
+                         f"churn rate {snapshot['Churn'].mean():.2%}")
+        
+        self.customer_features = pd.concat(snapshots, ignore_index=True)
+        return self
+
+    @traced(rows=_table_rows, memory=_tables_mb)
+    def save_rolling_features(self):
+        output_path = save_table(self.customer_features, 'data/processed/customer_features_rolling',
+                                 fmt=self.storage_format, schema=CUSTOMER_FEATURES_SCHEMA)
+        logging.info(f"Rolling features saved to {output_path}")
+        print(f"Rolling features saved. Shape: {self.customer_features.shape}")
+
+    def run_rolling(self, cutoffs, horizon_days=None):
+        self.load_data()
+        self.create_rolling_snapshots(cutoffs, horizon_days)
+        self.save_rolling_features()
+
     def run(self):
         self.load_data()
-        self.split_data()
-        self.create_target()
-        self.create_rfm_features()
-        self.create_behavioral_features()
-        self.create_temporal_features()
+        if self.workers:
+            self.create_customer_features_partitioned()
+        else:
+            self.split_data()
+            self.create_target()
+            self.create_rfm_features()
+            self.create_behavioral_features()
+            self.create_temporal_features()
         self.create_segmentation()
         self.handle_missing()
         self.save_features()
 
 if __name__ == "__main__":
-    engineer = FeatureEngineer()
-    engineer.run()
+    import argparse
+    parser = argparse.ArgumentParser(description="Build customer-level features")
+    parser.add_argument('--training-cutoff', default='2011-09-09',
+                        help="Features use transactions up to this date; churn is observed after it")
+    parser.add_argument('--cutoffs', nargs='+',
+                        help="Build stacked snapshots for these cutoffs in one pass")
+    parser.add_argument('--horizon-days', type=int,
+                        help="Churn window after each cutoff (default: until the end of the data)")
+    parser.add_argument('--workers', type=int,
+                        help="Compute per-customer features in this many CustomerID partitions in parallel")
+    parser.add_argument('--interval-semantics', choices=INTERVAL_SEMANTICS, default='legacy',
+                        help="Purchase gaps between line items (legacy) or between invoices")
+    args = parser.parse_args()
+    
+    engineer = FeatureEngineer(training_cutoff=args.training_cutoff, workers=args.workers,
+                               interval_semantics=args.interval_semantics)
+    if args.cutoffs:
+        engineer.run_rolling(args.cutoffs, args.horizon_days)
+    else:
+        engineer.run()
@@ -4,15 +4,24 @@ from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-import joblib
 import json
 import os
+from storage import load_table, CUSTOMER_FEATURES_SCHEMA
+from model_data import save_split, save_metadata, MODEL_READY_DIR
+from model_registry import save_model
+
+def feature_types(X):
+    """Numeric and categorical feature columns of the customer table"""
+    # Any numeric dtype: the ColumnTransformer drops columns in neither list
+    numeric_features = X.select_dtypes(include='number').columns.tolist()
+    categorical_features = X.select_dtypes(include=['object', 'category']).columns.tolist()
+    return numeric_features, categorical_features
 
 def prepare_data():
     print("Preparing data for modeling...")
     
     # Load features
-    df = pd.read_csv('data/processed/customer_features.csv')
+    df = load_table('data/processed/customer_features', schema=CUSTOMER_FEATURES_SCHEMA)
     
     # 1. Define Features (X) and Target (y)
     # Drop non-feature columns
@@ -21,8 +30,7 @@ def prepare_data():
     y = df['Churn']
     
     # 2. Identify Column Types
-    numeric_features = X.select_dtypes(include=['int64', 'float64']).columns.tolist()
-    categorical_features = X.select_dtypes(include=['object', 'category']).columns.tolist()
+    numeric_features, categorical_features = feature_types(X)
     
     print(f"Numeric features: {len(numeric_features)}")
     print(f"Categorical features: {len(categorical_features)}")
@@ -63,21 +71,21 @@ def prepare_data():
         feature_names = numeric_features + list(preprocessor.named_transformers_['cat'].get_feature_names_out(categorical_features))
         
     # 5. Save Processed Data & Artifacts
-    os.makedirs('data/processed/model_ready', exist_ok=True)
+    os.makedirs(MODEL_READY_DIR, exist_ok=True)
     os.makedirs('models', exist_ok=True)
     
-    # Save Arrays/DataFrames
-    # Converting back to DataFrame for convenience (optional but helpful for tracking)
-    pd.DataFrame(X_train_processed, columns=feature_names).to_csv('data/processed/model_ready/X_train.csv', index=False)
-    pd.DataFrame(X_val_processed, columns=feature_names).to_csv('data/processed/model_ready/X_val.csv', index=False)
-    pd.DataFrame(X_test_processed, columns=feature_names).to_csv('data/processed/model_ready/X_test.csv', index=False)
-    
-    y_train.to_csv('data/processed/model_ready/y_train.csv', index=False)
-    y_val.to_csv('data/processed/model_ready/y_val.csv', index=False)
-    y_test.to_csv('data/processed/model_ready/y_test.csv', index=False)
+    # Save Arrays as .npy so trainers can memory-map them
+    save_split('train', X_train_processed, y_train)
+    save_split('val', X_val_processed, y_val)
+    save_split('test', X_test_processed, y_test)
+    save_metadata(feature_names, {
+        'train': X_train_processed.shape,
+        'val': X_val_processed.shape,
+        'test': X_test_processed.shape
+    })
     
     # Save Scaler/Preprocessor
-    joblib.dump(preprocessor, 'models/preprocessor.pkl')
+    save_model(preprocessor, 'preprocessor')
     
     # Save Feature Names
     with open('data/processed/feature_names.json', 'w') as f:
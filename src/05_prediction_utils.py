@@ -1,3 +1,5 @@
+import os
+from functools import lru_cache
 import pandas as pd
 import joblib
 
@@ -6,16 +8,23 @@ MODEL_PATH = "models/gradient_boosting.pkl"
 SCALER_PATH = "models/scaler.pkl"
 
 
+@lru_cache(maxsize=1)
+def _load_artifacts(model_path, model_mtime, scaler_path, scaler_mtime):
+    return joblib.load(model_path), joblib.load(scaler_path)
+
+
 def load_model():
     """
     Load the trained churn prediction model and feature scaler.
 
+    Artifacts are cached after the first call and reloaded only when the
+    files on disk change.
+
     Returns:
         tuple: Trained model and fitted scaler
     """
-    model = joblib.load(MODEL_PATH)
-    scaler = joblib.load(SCALER_PATH)
-    return model, scaler
+    return _load_artifacts(MODEL_PATH, os.path.getmtime(MODEL_PATH),
+                           SCALER_PATH, os.path.getmtime(SCALER_PATH))
 
 
 def preprocess_input(input_df, scaler):
@@ -0,0 +1,99 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from dedup import duplicated, drop_duplicates_external
+from storage import compact_transactions
+from synthetic_data import write_transactions
+
+# Duplicate detection on the raw transaction table: pandas df.duplicated on
+# object and compact frames against the fingerprint engine in dedup.py, exact
+# and hash-only, in memory and through on-disk partitions.
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _chunks(df, chunksize):
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+
+def time_dedup(n_rows, n_partitions=8, seed=42):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_transactions(os.path.join(tmp, 'online_retail.csv'), n_rows, seed=seed)
+        raw = pd.read_csv(path, encoding='latin1', parse_dates=['InvoiceDate'],
+                          dtype={'InvoiceNo': object, 'StockCode': object, 'Description': object,
+                                 'Country': object})
+    compact = compact_transactions(raw.copy())
+
+    reference, object_seconds = _timed(raw.duplicated)
+    reference = reference.to_numpy()
+    compact_mask, compact_seconds = _timed(compact.duplicated)
+    stats = {}
+    exact, exact_seconds = _timed(duplicated, compact, stats=stats)
+    approximate, approximate_seconds = _timed(duplicated, compact, verify=False)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        external_stats = {}
+        start = time.perf_counter()
+        kept = sum(len(part) for part in drop_duplicates_external(
+            _chunks(compact, max(1, n_rows // 10)), n_partitions, directory=tmp, stats=external_stats))
+        external_seconds = time.perf_counter() - start
+
+    # Every engine must find exactly the rows pandas finds
+    assert np.array_equal(reference, compact_mask.to_numpy())
+    assert np.array_equal(reference, exact)
+    assert np.array_equal(reference, approximate)
+    assert kept == n_rows - int(reference.sum())
+    return {
+        'rows': n_rows,
+        'duplicates': int(reference.sum()),
+        'candidates': stats['candidates'],
+        'collisions': stats['collisions'],
+        'pandas_object_seconds': object_seconds,
+        'pandas_compact_seconds': compact_seconds,
+        'fingerprint_exact_seconds': exact_seconds,
+        'fingerprint_approximate_seconds': approximate_seconds,
+        'external_seconds': external_seconds,
+        'external_partitions': n_partitions,
+        'exact_rows_per_sec': n_rows / exact_seconds,
+        'exact_speedup': object_seconds / exact_seconds
+    }
+
+
+def run_benchmark(scales=(100_000, 1_000_000), n_partitions=8, output_path='logs/benchmarks/dedup.json'):
+    results = []
+    for n_rows in scales:
+        print(f"Benchmarking duplicate detection on {n_rows} raw rows...")
+        result = time_dedup(n_rows, n_partitions)
+        results.append(result)
+        print(f"  pandas (object)        {result['pandas_object_seconds']:8.3f}s")
+        print(f"  pandas (compact)       {result['pandas_compact_seconds']:8.3f}s")
+        print(f"  fingerprint (exact)    {result['fingerprint_exact_seconds']:8.3f}s  "
+              f"({result['exact_speedup']:.1f}x, {result['exact_rows_per_sec']:,.0f} rows/s)")
+        print(f"  fingerprint (hash)     {result['fingerprint_approximate_seconds']:8.3f}s")
+        print(f"  external, {n_partitions} partitions {result['external_seconds']:7.3f}s")
+        print(f"  {result['duplicates']} duplicates, {result['candidates']} candidate rows verified, "
+              f"{result['collisions']} collisions")
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"Results saved to {output_path}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fingerprint deduplication benchmark")
+    parser.add_argument('--rows', type=lambda s: int(float(s)), nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--partitions', type=int, default=8)
+    parser.add_argument('--output', default='logs/benchmarks/dedup.json')
+    args = parser.parse_args()
+    run_benchmark(args.rows, args.partitions, args.output)
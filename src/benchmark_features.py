@@ -0,0 +1,78 @@
+import argparse
+import importlib
+import json
+import os
+import time
+from storage import compact_transactions
+from synthetic_data import generate_transactions
+
+FeatureEngineer = importlib.import_module('03_feature_engineering').FeatureEngineer
+
+# Per-stage timings of FeatureEngineer on synthetic customers. The stages run
+# in pipeline order on an in-memory transaction table, so load time is excluded.
+STAGES = [
+    'split_data',
+    'create_target',
+    'create_rfm_features',
+    'create_behavioral_features',
+    'create_temporal_features',
+    'create_segmentation',
+    'handle_missing'
+]
+# With --workers the per-customer stages run as one partitioned stage
+PARTITIONED_STAGES = ['create_customer_features_partitioned', 'create_segmentation', 'handle_missing']
+
+
+def time_stages(n_customers, lines_per_customer=10, seed=42, workers=None):
+    transactions = generate_transactions(
+        n_customers * lines_per_customer, n_customers=n_customers,
+        lines_per_invoice=5, seed=seed
+    )
+    transactions['TotalPrice'] = transactions['Quantity'] * transactions['UnitPrice']
+    # The representation FeatureEngineer.load_data hands to the stages
+    transactions = compact_transactions(transactions)
+
+    engineer = FeatureEngineer(workers=workers)
+    engineer.transactions = transactions
+    engineer.observation_end = transactions['InvoiceDate'].max()
+
+    timings = {}
+    for stage in PARTITIONED_STAGES if workers else STAGES:
+        start = time.perf_counter()
+        getattr(engineer, stage)()
+        timings[stage] = time.perf_counter() - start
+    return {
+        'customers': n_customers,
+        'workers': workers,
+        'transactions': len(transactions),
+        'stage_seconds': timings,
+        'total_seconds': sum(timings.values())
+    }
+
+
+def run_benchmark(scales=(10_000, 100_000, 1_000_000), lines_per_customer=10,
+                  output_path='logs/benchmarks/features.json', workers=None):
+    results = []
+    for n_customers in scales:
+        print(f"Benchmarking feature stages with {n_customers} customers...")
+        result = time_stages(n_customers, lines_per_customer, workers=workers)
+        results.append(result)
+        for stage, seconds in result['stage_seconds'].items():
+            print(f"  {stage:28s} {seconds:8.3f}s")
+        print(f"  {'total':28s} {result['total_seconds']:8.3f}s")
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"Results saved to {output_path}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FeatureEngineer per-stage micro-benchmark")
+    parser.add_argument('--customers', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--lines-per-customer', type=int, default=10)
+    parser.add_argument('--output', default='logs/benchmarks/features.json')
+    parser.add_argument('--workers', type=int, help="Time the CustomerID-partitioned path with this many workers")
+    args = parser.parse_args()
+    run_benchmark(args.customers, args.lines_per_customer, args.output, args.workers)
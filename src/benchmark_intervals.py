@@ -0,0 +1,81 @@
+import argparse
+import importlib
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from synthetic_data import generate_transactions
+
+purchase_intervals = importlib.import_module('03_feature_engineering').purchase_intervals
+
+# Purchase-interval features: the original full sort + per-customer shift over
+# line items against purchase_intervals with both semantics.
+
+
+def sort_shift_intervals(transactions):
+    """The original create_behavioral_features computation"""
+    df_sorted = transactions.sort_values(['CustomerID', 'InvoiceDate'])
+    df_sorted['PrevDate'] = df_sorted.groupby('CustomerID')['InvoiceDate'].shift(1)
+    df_sorted['DaysBetween'] = (df_sorted['InvoiceDate'] - df_sorted['PrevDate']).dt.days
+    behavior = df_sorted.groupby('CustomerID').agg({'DaysBetween': ['mean', 'std']}).reset_index()
+    behavior.columns = ['CustomerID', 'AvgDaysBetweenPurchases', 'StdDaysBetweenPurchases']
+    return behavior
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def time_intervals(n_rows, lines_per_customer=20, seed=42):
+    transactions = generate_transactions(n_rows, n_customers=max(1, n_rows // lines_per_customer),
+                                         seed=seed, skew=0.7)
+    args = (transactions['CustomerID'], transactions['InvoiceNo'], transactions['InvoiceDate'])
+
+    reference, sort_seconds = _timed(sort_shift_intervals, transactions)
+    legacy, legacy_seconds = _timed(purchase_intervals, *args, semantics='legacy')
+    invoice, invoice_seconds = _timed(purchase_intervals, *args, semantics='invoice')
+
+    # The legacy engine must reproduce the original features
+    pd.testing.assert_frame_equal(reference, legacy, check_exact=False, rtol=1e-9)
+    return {
+        'rows': n_rows,
+        'customers': len(reference),
+        'sort_shift_seconds': sort_seconds,
+        'legacy_seconds': legacy_seconds,
+        'invoice_seconds': invoice_seconds,
+        'legacy_speedup': sort_seconds / legacy_seconds,
+        'legacy_mean_days': float(np.nanmean(legacy['AvgDaysBetweenPurchases'])),
+        'invoice_mean_days': float(np.nanmean(invoice['AvgDaysBetweenPurchases']))
+    }
+
+
+def run_benchmark(scales=(1_000_000, 10_000_000), lines_per_customer=20,
+                  output_path='logs/benchmarks/intervals.json'):
+    results = []
+    for n_rows in scales:
+        print(f"Benchmarking purchase intervals on {n_rows} line items...")
+        result = time_intervals(n_rows, lines_per_customer)
+        results.append(result)
+        print(f"  sort + shift      {result['sort_shift_seconds']:8.3f}s")
+        print(f"  engine (legacy)   {result['legacy_seconds']:8.3f}s  ({result['legacy_speedup']:.1f}x)")
+        print(f"  engine (invoice)  {result['invoice_seconds']:8.3f}s")
+        print(f"  mean gap: {result['legacy_mean_days']:.1f} days per line item, "
+              f"{result['invoice_mean_days']:.1f} days per invoice")
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"Results saved to {output_path}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Purchase-interval engine benchmark")
+    parser.add_argument('--rows', type=lambda s: int(float(s)), nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--lines-per-customer', type=int, default=20)
+    parser.add_argument('--output', default='logs/benchmarks/intervals.json')
+    args = parser.parse_args()
+    run_benchmark(args.rows, args.lines_per_customer, args.output)
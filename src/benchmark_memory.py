@@ -0,0 +1,60 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import pandas as pd
+from storage import compact_transactions, memory_report
+from synthetic_data import write_transactions
+
+# In-memory size of the raw transaction table as read by pd.read_csv (object
+# strings, float64 CustomerID, int64 everywhere) against compact_transactions.
+
+
+def measure(n_rows, seed=42):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_transactions(os.path.join(tmp, 'online_retail.csv'), n_rows, seed=seed)
+        df = pd.read_csv(path, encoding='latin1', parse_dates=['InvoiceDate'],
+                         dtype={'InvoiceNo': object, 'StockCode': object, 'Description': object,
+                                'Country': object})
+    before = memory_report(df)
+    start = time.perf_counter()
+    df = compact_transactions(df)
+    seconds = time.perf_counter() - start
+    after = memory_report(df)
+    return {
+        'rows': n_rows,
+        'before_mb': before['total_mb'],
+        'after_mb': after['total_mb'],
+        'ratio': before['total_mb'] / after['total_mb'],
+        'compact_seconds': seconds,
+        'columns': {col: {'before_mb': mb, 'after_mb': after['columns_mb'].get(col),
+                          'dtype': str(df[col].dtype) if col in df.columns else None}
+                    for col, mb in before['columns_mb'].items()}
+    }
+
+
+def run_benchmark(scales=(100_000, 1_000_000), output_path='logs/benchmarks/memory.json'):
+    results = []
+    for n_rows in scales:
+        print(f"Measuring the transaction table with {n_rows} rows...")
+        result = measure(n_rows)
+        results.append(result)
+        for col, sizes in result['columns'].items():
+            print(f"  {col:12s} {sizes['before_mb']:9.1f}MB -> {sizes['after_mb']:7.1f}MB  {sizes['dtype']}")
+        print(f"  {'total':12s} {result['before_mb']:9.1f}MB -> {result['after_mb']:7.1f}MB "
+              f"({result['ratio']:.1f}x smaller, {result['compact_seconds']:.2f}s)")
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"Results saved to {output_path}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Transaction table memory, object vs compact dtypes")
+    parser.add_argument('--rows', type=lambda s: int(float(s)), nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--output', default='logs/benchmarks/memory.json')
+    args = parser.parse_args()
+    run_benchmark(args.rows, args.output)
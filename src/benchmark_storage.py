@@ -0,0 +1,100 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Compare load time and peak RSS of the CSV and Parquet storage backends for
+# the cleaned-transactions table. Each load runs in a fresh interpreter so
+# peak RSS is not polluted by earlier measurements.
+
+FEATURE_COLUMNS = ['InvoiceNo', 'StockCode', 'Quantity', 'InvoiceDate', 'CustomerID', 'TotalPrice']
+
+
+def _peak_rss_mb():
+    # ru_maxrss is reported in KB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 ** 2) if sys.platform == 'darwin' else rss / 1024
+
+
+def _measure_load(path, projected):
+    import pandas as pd  # noqa: F401
+    from storage import load_table, CLEANED_TRANSACTIONS_SCHEMA
+
+    rss_before = _peak_rss_mb()
+    start = time.perf_counter()
+    df = load_table(path, columns=FEATURE_COLUMNS if projected else None,
+                    schema=CLEANED_TRANSACTIONS_SCHEMA)
+    duration = time.perf_counter() - start
+    return {
+        'rows': len(df),
+        'load_seconds': duration,
+        'peak_rss_mb': _peak_rss_mb(),
+        'peak_rss_delta_mb': _peak_rss_mb() - rss_before
+    }
+
+
+def _write_inputs(n_rows, directory):
+    from synthetic_data import generate_transactions
+    from storage import save_table, compact_transactions, CLEANED_TRANSACTIONS_SCHEMA
+
+    df = compact_transactions(generate_transactions(n_rows))
+    df['TotalPrice'] = df['Quantity'] * df['UnitPrice'].astype('float64').round(2)
+    df['Year'] = df['InvoiceDate'].dt.year
+    df['Month'] = df['InvoiceDate'].dt.month
+    df['DayOfWeek'] = df['InvoiceDate'].dt.dayofweek
+    df['Hour'] = df['InvoiceDate'].dt.hour
+
+    stem = os.path.join(directory, 'cleaned_transactions')
+    paths = {}
+    for fmt in ['csv', 'parquet']:
+        paths[fmt] = save_table(df, stem, fmt=fmt, schema=CLEANED_TRANSACTIONS_SCHEMA)
+    return paths
+
+
+def run_benchmark(n_rows=1_000_000, output_path='logs/benchmarks/storage.json'):
+    print(f"Benchmarking storage backends on {n_rows} rows...")
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = _write_inputs(n_rows, tmp)
+        for fmt, path in paths.items():
+            for projected in [False, True]:
+                out = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--child', path]
+                    + (['--projected'] if projected else []),
+                    check=True, capture_output=True, text=True
+                )
+                result = json.loads(out.stdout.strip().splitlines()[-1])
+                result.update({
+                    'format': fmt,
+                    'projected': projected,
+                    'file_mb': os.path.getsize(path) / (1024 ** 2)
+                })
+                results.append(result)
+                print(f"  {fmt:8s} projected={projected!s:5s} "
+                      f"load={result['load_seconds']:.3f}s "
+                      f"peak_rss={result['peak_rss_mb']:.0f}MB "
+                      f"file={result['file_mb']:.1f}MB")
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w') as f:
+        json.dump({'n_rows': n_rows, 'results': results}, f, indent=4)
+    print(f"Results saved to {output_path}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CSV vs Parquet load benchmark")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--output', default='logs/benchmarks/storage.json')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--projected', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_measure_load(args.child, args.projected)))
+    else:
+        run_benchmark(args.rows, args.output)
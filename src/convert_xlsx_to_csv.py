@@ -1,31 +1,248 @@
-import pandas as pd
+import argparse
+import csv
 import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from storage import DEFAULT_FORMAT, table_path
 
-def convert_excel_to_csv():
-    xlsx_path = 'data/raw/online_retail_II.xlsx'
-    csv_path = 'data/raw/online_retail.csv'
-    
-    if os.path.exists(csv_path):
-        print(f"{csv_path} already exists.")
-        return
-
-    if not os.path.exists(xlsx_path):
-        print(f"{xlsx_path} not found. Cannot convert.")
-        return
-
-    print(f"Reading {xlsx_path}...")
-    # Read the second sheet which corresponds to 2010-2011 (usually the target dataset)
-    # The dataset typically has "Year 2009-2010" and "Year 2010-2011"
+# The Online Retail II workbook holds one sheet per year. Every sheet is
+# streamed row by row (openpyxl in read-only mode, or calamine when
+# python-calamine is installed) and written straight to typed columnar batches,
+# so no sheet is ever held in memory as a DataFrame. Sheets are converted in
+# parallel and concatenated in workbook order, with a Sheet column recording
+# where each row came from.
+XLSX_PATH = 'data/raw/online_retail_II.xlsx'
+RAW_STEM = 'data/raw/online_retail'
+SHEETS = ['Year 2009-2010', 'Year 2010-2011']
+SHEET_COLUMN = 'Sheet'
+BATCH_ROWS = 100_000
+
+# Column types by raw header (both the Online Retail and Online Retail II names)
+COLUMN_TYPES = {
+    'Invoice': 'string', 'InvoiceNo': 'string',
+    'StockCode': 'string',
+    'Description': 'string',
+    'Quantity': 'int64',
+    'InvoiceDate': 'timestamp',
+    'Price': 'float64', 'UnitPrice': 'float64',
+    'Customer ID': 'float64', 'CustomerID': 'float64',
+    'Country': 'string'
+}
+
+
+def available_engine():
+    """'calamine' when python-calamine is installed, else 'openpyxl'"""
+    try:
+        import python_calamine  # noqa: F401
+        return 'calamine'
+    except ImportError:
+        return 'openpyxl'
+
+
+def _text(value):
+    if value is None:
+        return None
+    # Numeric codes (invoice numbers, stock codes) may come back as floats
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip() if isinstance(value, str) else str(value)
+
+
+def _int(value):
+    return None if value is None or value == '' else int(value)
+
+
+def _float(value):
+    return None if value is None or value == '' else float(value)
+
+
+def _timestamp(value):
+    if value is None or value == '' or isinstance(value, datetime):
+        return value or None
+    return datetime.fromisoformat(str(value))
+
+
+CONVERTERS = {'string': _text, 'int64': _int, 'float64': _float, 'timestamp': _timestamp}
+
+
+def iter_sheet_rows(path, sheet, engine=None):
+    """Yield the rows of one sheet as tuples of cell values, header first"""
+    engine = engine or available_engine()
+    if engine == 'calamine':
+        from python_calamine import CalamineWorkbook
+        rows = CalamineWorkbook.from_path(path).get_sheet_by_name(sheet)
+        rows = rows.iter_rows() if hasattr(rows, 'iter_rows') else rows.to_python()
+        for row in rows:
+            yield tuple(None if v == '' else v for v in row)
+    else:
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            yield from workbook[sheet].iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+
+def iter_sheet_batches(path, sheet, engine=None, batch_rows=BATCH_ROWS):
+    """
+    Yield the rows of one sheet as typed column batches.
+
+    Returns:
+        generator: (column names, list of converted column value lists) per batch
+    """
+    rows = iter_sheet_rows(path, sheet, engine)
+    header = [str(h).strip() for h in next(rows) if h is not None]
+    converters = [CONVERTERS[COLUMN_TYPES.get(h, 'string')] for h in header]
+    batch = []
+    for row in rows:
+        if row is None or all(v is None for v in row):
+            continue
+        batch.append(row)
+        if len(batch) == batch_rows:
+            yield header, _columns(batch, converters)
+            batch = []
+    if batch:
+        yield header, _columns(batch, converters)
+
+
+def _columns(batch, converters):
+    return [[convert(row[i]) if i < len(row) else None for row in batch]
+            for i, convert in enumerate(converters)]
+
+
+def _arrow_schema(header):
+    import pyarrow as pa
+    types = {'string': pa.string(), 'int64': pa.int64(), 'float64': pa.float64(),
+             'timestamp': pa.timestamp('ns')}
+    fields = [pa.field(h, types[COLUMN_TYPES.get(h, 'string')]) for h in header]
+    return pa.schema(fields + [pa.field(SHEET_COLUMN, pa.dictionary(pa.int32(), pa.string()))])
+
+
+def convert_sheet(xlsx_path, sheet, output_path, fmt=None, engine=None, batch_rows=BATCH_ROWS):
+    """
+    Convert one sheet to a Parquet or CSV file, one batch at a time.
+
+    Returns:
+        dict: sheet, rows, seconds and the path written
+    """
+    fmt = fmt or DEFAULT_FORMAT
+    start = time.perf_counter()
+    rows = 0
+    writer = None
     try:
-        df = pd.read_excel(xlsx_path, sheet_name="Year 2010-2011")
-    except ValueError:
-        print("Sheet 'Year 2010-2011' not found, trying default...")
-        df = pd.read_excel(xlsx_path)
+        for header, columns in iter_sheet_batches(xlsx_path, sheet, engine, batch_rows):
+            n = len(columns[0])
+            if fmt == 'parquet':
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                if writer is None:
+                    schema = _arrow_schema(header)
+                    writer = pq.ParquetWriter(output_path, schema)
+                arrays = [pa.array(values, type=field.type) for values, field in zip(columns, schema)]
+                arrays.append(pa.DictionaryArray.from_arrays(
+                    pa.array([0] * n, type=pa.int32()), pa.array([sheet])))
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            else:
+                if writer is None:
+                    writer = open(output_path, 'w', newline='', encoding='utf-8')
+                    out = csv.writer(writer)
+                    out.writerow(header + [SHEET_COLUMN])
+                out.writerows(zip(*columns, [sheet] * n))
+            rows += n
+    finally:
+        if writer is not None:
+            writer.close()
+    return {'sheet': sheet, 'rows': rows, 'seconds': time.perf_counter() - start, 'path': output_path}
+
+
+def _concat(parts, output_path, fmt):
+    """Concatenate per-sheet files in order, streaming row groups / bytes"""
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        writer = None
+        try:
+            for part in parts:
+                source = pq.ParquetFile(part)
+                writer = writer or pq.ParquetWriter(output_path, source.schema_arrow)
+                for i in range(source.num_row_groups):
+                    writer.write_table(source.read_row_group(i))
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with open(output_path, 'wb') as out:
+            for i, part in enumerate(parts):
+                with open(part, 'rb') as f:
+                    if i > 0:
+                        f.readline()  # header
+                    shutil.copyfileobj(f, out)
+
+
+def list_sheets(xlsx_path):
+    from openpyxl import load_workbook
+    workbook = load_workbook(xlsx_path, read_only=True)
+    try:
+        return workbook.sheetnames
+    finally:
+        workbook.close()
+
+
+def convert_workbook(xlsx_path=XLSX_PATH, output_stem=RAW_STEM, sheets=None, fmt=None,
+                     engine=None, workers=None, batch_rows=BATCH_ROWS):
+    """
+    Convert the sheets of the raw workbook into one typed table.
+
+    Args:
+        xlsx_path (str): Workbook to convert
+        output_stem (str): Output path without extension
+        sheets (list): Sheets to convert, in output order (default: SHEETS found in
+            the workbook, else every sheet)
+        fmt (str): 'parquet' or 'csv', defaults to STORAGE_FORMAT
+        engine (str): 'calamine' or 'openpyxl' (default: calamine if installed)
+        workers (int): Sheets converted at once (default: one per sheet)
+
+    Returns:
+        str: Path that was written
+    """
+    fmt = fmt or DEFAULT_FORMAT
+    engine = engine or available_engine()
+    if sheets is None:
+        found = list_sheets(xlsx_path)
+        sheets = [s for s in SHEETS if s in found] or found
+    output_path = table_path(output_stem, fmt)
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    part_dir = tempfile.mkdtemp(prefix='xlsx_parts_', dir=os.path.dirname(output_path) or '.')
+    parts = [os.path.join(part_dir, f'part-{i}{os.path.splitext(output_path)[1]}') for i in range(len(sheets))]
+
+    print(f"Converting {len(sheets)} sheet(s) of {xlsx_path} with {engine}...")
+    try:
+        with ProcessPoolExecutor(max_workers=workers or len(sheets)) as pool:
+            futures = [pool.submit(convert_sheet, xlsx_path, sheet, part, fmt, engine, batch_rows)
+                       for sheet, part in zip(sheets, parts)]
+            for future in futures:
+                result = future.result()
+                print(f"  {result['sheet']}: {result['rows']} rows in {result['seconds']:.1f}s")
+        _concat(parts, output_path, fmt)
+    finally:
+        shutil.rmtree(part_dir, ignore_errors=True)
+    print(f"Saved to {output_path}")
+    return output_path
 
-    print(f"Converting to {csv_path}...")
-    df.to_csv(csv_path, index=False)
-    print("Conversion complete.")
-    print(f"Rows: {len(df)}")
 
 if __name__ == "__main__":
-    convert_excel_to_csv()
+    parser = argparse.ArgumentParser(description="Convert the Online Retail II workbook to a typed table")
+    parser.add_argument('--input', default=XLSX_PATH)
+    parser.add_argument('--output', default=RAW_STEM, help="Output path without extension")
+    parser.add_argument('--sheets', nargs='+', help="Sheets to convert (default: both years)")
+    parser.add_argument('--format', choices=['parquet', 'csv'], default=None)
+    parser.add_argument('--engine', choices=['calamine', 'openpyxl'], default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"{args.input} not found. Cannot convert.")
+    else:
+        convert_workbook(args.input, args.output, args.sheets, args.format, args.engine, args.workers)
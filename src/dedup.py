@@ -0,0 +1,162 @@
+import os
+import pickle
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+# Row deduplication on 64-bit fingerprints. Every row is hashed once with the
+# vectorized pd.util.hash_pandas_object (categoricals hash their categories,
+# not every row's string). Rows whose fingerprint is unique cannot be
+# duplicates. Only the rows that share a fingerprint are compared on their
+# values, so a hash collision never drops a distinct row.
+
+
+def row_fingerprints(df, columns=None, portable=False):
+    """
+    64-bit fingerprint of every row.
+
+    Args:
+        df (pd.DataFrame): Rows to hash
+        columns (list): Columns that identify a row (default: all)
+        portable (bool): Hash numbers as float64, so a value gets the same
+            fingerprint whether a chunk stored it as int32, int64 or float
+
+    Returns:
+        np.ndarray: uint64 fingerprints
+    """
+    if columns is not None:
+        df = df[list(columns)]
+    if portable:
+        numeric = df.select_dtypes(include='number').columns
+        df = df.astype({c: 'float64' for c in numeric})
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def duplicated(df, columns=None, keep='first', verify=True, stats=None):
+    """
+    Boolean mask of duplicate rows, like df.duplicated(subset=columns, keep=keep).
+
+    Args:
+        verify (bool): Compare rows that share a fingerprint on their values
+            (exact). With verify=False the fingerprints are trusted; two
+            distinct rows are merged only on a 64-bit hash collision.
+        stats (dict): Filled with rows, candidates (rows sharing a fingerprint),
+            duplicates and collisions (fingerprint duplicates that are not
+            exact duplicates)
+
+    Returns:
+        np.ndarray: True for the rows to drop
+    """
+    fingerprints = pd.Series(row_fingerprints(df, columns))
+    approximate = fingerprints.duplicated(keep=keep).to_numpy()
+    mask = approximate
+    candidates = 0
+    if verify:
+        shared = fingerprints.duplicated(keep=False).to_numpy()
+        candidates = int(np.count_nonzero(shared))
+        mask = np.zeros(len(df), dtype=bool)
+        if candidates:
+            # Every copy of a duplicated row shares its fingerprint, so checking
+            # only these rows gives exactly df.duplicated()
+            subset = df.iloc[np.flatnonzero(shared)]
+            mask[shared] = subset.duplicated(subset=columns, keep=keep).to_numpy()
+    if stats is not None:
+        stats.update({
+            'rows': len(df),
+            'candidates': candidates,
+            'duplicates': int(np.count_nonzero(mask)),
+            'collisions': int(np.count_nonzero(approximate & ~mask))
+        })
+    return mask
+
+
+def drop_duplicates(df, columns=None, keep='first', verify=True, stats=None):
+    """df.drop_duplicates(subset=columns, keep=keep) on fingerprints"""
+    return df[~duplicated(df, columns, keep, verify, stats)]
+
+
+class PartitionSpill:
+    """
+    Hash-partition DataFrames to disk so every copy of a row lands in the same
+    partition, then read the partitions back one at a time.
+
+    Usage:
+        with PartitionSpill(n_partitions) as spill:
+            for chunk in chunks:
+                spill.add(chunk)
+            for part in spill.partitions():
+                ...
+    """
+
+    def __init__(self, n_partitions, directory=None, columns=None):
+        self.n_partitions = n_partitions
+        self.columns = columns
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.directory = tempfile.mkdtemp(prefix='dedup_spill_', dir=directory)
+
+    def _path(self, p):
+        return os.path.join(self.directory, f'part-{p}.pkl')
+
+    def add(self, df, partitions=None):
+        """
+        Append rows to their partitions.
+
+        Args:
+            partitions (np.ndarray): Partition of each row (default: from the
+                portable row fingerprint over `columns`)
+        """
+        if partitions is None:
+            partitions = row_fingerprints(df, self.columns, portable=True) % np.uint64(self.n_partitions)
+        for p, part in df.groupby(np.asarray(partitions, dtype=np.int64)):
+            with open(self._path(p), 'ab') as f:
+                pickle.dump(part, f)
+
+    def partitions(self):
+        """Yield each non-empty partition as one DataFrame, deleting it from disk"""
+        for p in range(self.n_partitions):
+            path = self._path(p)
+            if not os.path.exists(path):
+                continue
+            frames = []
+            with open(path, 'rb') as f:
+                while True:
+                    try:
+                        frames.append(pickle.load(f))
+                    except EOFError:
+                        break
+            os.remove(path)
+            yield pd.concat(frames, ignore_index=True)
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def drop_duplicates_external(chunks, n_partitions, columns=None, directory=None, stats=None):
+    """
+    Deduplicate a table larger than memory.
+
+    Chunks are spilled to `n_partitions` disk partitions by fingerprint, then
+    each partition is deduplicated in memory. Peak memory is one chunk or one
+    partition. Partitions come out in partition order, and within one
+    partition the first copy of a row is kept.
+
+    Yields:
+        pd.DataFrame: Deduplicated partitions
+    """
+    with PartitionSpill(n_partitions, directory, columns) as spill:
+        for chunk in chunks:
+            spill.add(chunk)
+        for part in spill.partitions():
+            part_stats = {}
+            yield drop_duplicates(part, columns, stats=part_stats)
+            if stats is not None:
+                for key, value in part_stats.items():
+                    stats[key] = stats.get(key, 0) + value
@@ -0,0 +1,264 @@
+import pandas as pd
+import numpy as np
+import importlib
+import json
+import logging
+import os
+from storage import load_table, save_table, CLEANED_TRANSACTIONS_SCHEMA
+
+feature_engineering = importlib.import_module('03_feature_engineering')
+FeatureEngineer = feature_engineering.FeatureEngineer
+TRANSACTION_COLUMNS = feature_engineering.TRANSACTION_COLUMNS
+INTERVAL_SEMANTICS = feature_engineering.INTERVAL_SEMANTICS
+
+# Per-customer aggregate state. Every column can be merged with the state of a
+# later batch without looking at earlier transactions again.
+STATE_DTYPES = {
+    'FirstPurchase': 'datetime64[ns]',
+    'LastPurchase': 'datetime64[ns]',
+    'LineCount': 'int64',
+    'InvoiceCount': 'int64',
+    'TotalSpent': 'float64',
+    'TotalItems': 'int64',
+    'MaxBasketSize': 'int64',
+    'UniqueProducts': 'int64',
+    'LastIntervalDate': 'datetime64[ns]',
+    'IntervalCount': 'int64',
+    'IntervalSum': 'int64',
+    'IntervalSumSq': 'int64',
+    'ObservedAfterCutoff': 'bool'
+}
+STATE_COLUMNS = list(STATE_DTYPES)
+DATE_COLUMNS = ['FirstPurchase', 'LastPurchase', 'LastIntervalDate']
+
+class FeatureStore:
+    """
+    Incremental, append-only customer feature store.
+
+    Folds batches of cleaned transactions into per-customer aggregate state and
+    derives the same customer_features as FeatureEngineer.run on the full history
+    (standard deviations and spend sums up to floating-point rounding).
+
+    Batches must be appended in time order per customer, and each invoice must
+    arrive in a single batch. interval_semantics is that of FeatureEngineer:
+    gaps between line items ('legacy') or between invoices ('invoice').
+    """
+
+    def __init__(self, store_dir='data/processed/feature_store', training_cutoff='2011-09-09',
+                 storage_format=None, interval_semantics='legacy'):
+        if interval_semantics not in INTERVAL_SEMANTICS:
+            raise ValueError(f"Unknown interval semantics '{interval_semantics}', "
+                             f"expected one of {INTERVAL_SEMANTICS}")
+        self.store_dir = store_dir
+        self.training_cutoff = pd.to_datetime(training_cutoff)
+        self.storage_format = storage_format
+        self.interval_semantics = interval_semantics
+        self.state = self._empty_state()
+        # Distinct (CustomerID, StockCode) pairs seen so far, for UniqueProducts
+        self.products = set()
+        self.batches_applied = 0
+
+    @staticmethod
+    def _empty_state(index=()):
+        state = pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in STATE_DTYPES.items()})
+        state = state.reindex(pd.Index(index, dtype='int64', name='CustomerID'))
+        # reindex fills with NaN; give empty rows neutral values in their own dtype
+        return state.fillna({col: 0 for col, dtype in STATE_DTYPES.items() if dtype == 'int64'}
+                            | {'TotalSpent': 0.0, 'ObservedAfterCutoff': False}).astype(STATE_DTYPES)
+
+    def load(self):
+        """Load persisted state, if any"""
+        meta_path = os.path.join(self.store_dir, 'meta.json')
+        if not os.path.exists(meta_path):
+            logging.info("Feature store is empty")
+            return self
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if pd.to_datetime(meta['training_cutoff']) != self.training_cutoff:
+            raise ValueError(
+                f"Feature store was built for cutoff {meta['training_cutoff']}, "
+                f"not {self.training_cutoff}; rebuild it"
+            )
+        if meta['interval_semantics'] != self.interval_semantics:
+            raise ValueError(
+                f"Feature store was built with {meta['interval_semantics']} intervals, "
+                f"not {self.interval_semantics}; rebuild it"
+            )
+        self.batches_applied = meta['batches_applied']
+        self.state = load_table(os.path.join(self.store_dir, 'customer_state'),
+                                fmt=self.storage_format, schema=STATE_DTYPES).set_index('CustomerID')
+        products = load_table(os.path.join(self.store_dir, 'customer_products'), fmt=self.storage_format)
+        self.products = set(zip(products['CustomerID'].tolist(), products['StockCode'].astype(str).tolist()))
+        logging.info(f"Loaded feature store state for {len(self.state)} customers")
+        return self
+
+    def save(self):
+        os.makedirs(self.store_dir, exist_ok=True)
+        save_table(self.state.reset_index(), os.path.join(self.store_dir, 'customer_state'),
+                   fmt=self.storage_format)
+        products = pd.DataFrame(sorted(self.products), columns=['CustomerID', 'StockCode'])
+        save_table(products.astype({'CustomerID': 'int64'}), os.path.join(self.store_dir, 'customer_products'),
+                   fmt=self.storage_format)
+        with open(os.path.join(self.store_dir, 'meta.json'), 'w') as f:
+            json.dump({
+                'training_cutoff': str(self.training_cutoff),
+                'interval_semantics': self.interval_semantics,
+                'batches_applied': self.batches_applied,
+                'customers': len(self.state)
+            }, f, indent=4)
+        return self
+
+    def update(self, transactions):
+        """
+        Fold a batch of cleaned transactions into the store.
+
+        Work is proportional to the batch: only the batch is grouped and sorted,
+        and only the state rows of customers in the batch are touched.
+        """
+        batch = transactions[TRANSACTION_COLUMNS]
+        train = batch[batch['InvoiceDate'] <= self.training_cutoff]
+        obs_ids = batch.loc[batch['InvoiceDate'] > self.training_cutoff, 'CustomerID'].unique()
+        logging.info(f"Folding batch: {len(train)} training rows, {len(obs_ids)} observed customers")
+
+        agg = train.groupby('CustomerID').agg(
+            FirstPurchase=('InvoiceDate', 'min'),
+            LastPurchase=('InvoiceDate', 'max'),
+            LineCount=('InvoiceDate', 'size'),
+            TotalSpent=('TotalPrice', 'sum'),
+            TotalItems=('Quantity', 'sum')
+        )
+        basket = train.groupby(['CustomerID', 'InvoiceNo'], observed=True)['Quantity'].sum()
+        agg['InvoiceCount'] = basket.groupby(level=0).size()
+        agg['MaxBasketSize'] = basket.groupby(level=0).max()
+
+        # Day gaps between consecutive purchases inside the batch: line items, or
+        # invoices dated by their first line
+        if self.interval_semantics == 'legacy':
+            dates = train[['CustomerID', 'InvoiceDate']]
+        else:
+            dates = train.groupby(['CustomerID', 'InvoiceNo'], observed=True)['InvoiceDate'].min()
+            dates = dates.droplevel('InvoiceNo').reset_index()
+        dates = dates.sort_values(['CustomerID', 'InvoiceDate'])
+        dates['Gap'] = dates.groupby('CustomerID')['InvoiceDate'].diff().dt.days
+        dates['GapSq'] = dates['Gap'] ** 2
+        agg = agg.join(dates.groupby('CustomerID').agg(
+            FirstIntervalDate=('InvoiceDate', 'min'),
+            LastIntervalDate=('InvoiceDate', 'max'),
+            IntervalCount=('Gap', 'count'),
+            IntervalSum=('Gap', 'sum'),
+            IntervalSumSq=('GapSq', 'sum')
+        ))
+
+        # Distinct (customer, product) pairs of the batch that are new to the store
+        pairs = train[['CustomerID', 'StockCode']].astype({'StockCode': str}).drop_duplicates()
+        keys = list(zip(pairs['CustomerID'].tolist(), pairs['StockCode'].tolist()))
+        is_new = np.fromiter((key not in self.products for key in keys), dtype=bool, count=len(keys))
+        self.products.update(keys)
+        agg['UniqueProducts'] = pairs.loc[is_new, 'CustomerID'].value_counts().reindex(agg.index, fill_value=0)
+
+        # Merge with the stored state of the same customers
+        prev = self.state.reindex(agg.index)
+        has_prev = prev['LineCount'].fillna(0).to_numpy() > 0
+        prev = prev.fillna({col: 0 for col in STATE_COLUMNS if col not in
+                            DATE_COLUMNS + ['ObservedAfterCutoff']})
+        late = has_prev & (agg['FirstPurchase'] < prev['LastPurchase']).to_numpy()
+        if late.any():
+            raise ValueError(
+                f"{late.sum()} customers have transactions older than their stored last purchase; "
+                "batches must be appended in time order"
+            )
+
+        # Gap from the stored last purchase to the first purchase of this batch
+        bridge = (agg['FirstIntervalDate'] - prev['LastIntervalDate']).dt.days.fillna(0)
+        merged = pd.DataFrame(index=agg.index)
+        merged['FirstPurchase'] = prev['FirstPurchase'].where(has_prev, agg['FirstPurchase'])
+        merged['LastPurchase'] = agg['LastPurchase']
+        merged['LastIntervalDate'] = agg['LastIntervalDate']
+        for col in ['LineCount', 'InvoiceCount', 'TotalSpent', 'TotalItems', 'UniqueProducts',
+                    'IntervalCount', 'IntervalSum', 'IntervalSumSq']:
+            merged[col] = prev[col] + agg[col]
+        merged['IntervalCount'] += has_prev
+        merged['IntervalSum'] += bridge
+        merged['IntervalSumSq'] += bridge ** 2
+        merged['MaxBasketSize'] = np.maximum(prev['MaxBasketSize'], agg['MaxBasketSize'])
+        merged['ObservedAfterCutoff'] = prev['ObservedAfterCutoff'].fillna(False)
+
+        # Customers that only show up after the cutoff get an empty state row
+        new_obs = pd.Index(obs_ids).difference(self.state.index).difference(merged.index)
+        merged = pd.concat([merged.astype(STATE_DTYPES), self._empty_state(new_obs)])
+
+        self._upsert(merged)
+        self.state.loc[self.state.index.intersection(obs_ids), 'ObservedAfterCutoff'] = True
+
+        self.batches_applied += 1
+        return self
+
+    def _upsert(self, rows):
+        rows.index.name = 'CustomerID'
+        existing = rows.index.isin(self.state.index)
+        if existing.any():
+            for col in STATE_COLUMNS:
+                self.state.loc[rows.index[existing], col] = rows.loc[existing, col].to_numpy()
+        if (~existing).any():
+            self.state = rows[~existing] if self.state.empty else pd.concat([self.state, rows[~existing]])
+
+    def customer_features(self):
+        """Derive the FeatureEngineer customer_features table from the stored state"""
+        state = self.state[self.state['LineCount'] > 0]
+        n = state['IntervalCount'].astype('float64')
+        interval_sum = state['IntervalSum'].astype('float64')
+        mean = (interval_sum / n).where(n > 0)
+        var = ((state['IntervalSumSq'].astype('float64') - interval_sum * mean) / (n - 1)).where(n > 1)
+
+        frequency = state['InvoiceCount'].astype('int64')
+        total_spent = state['TotalSpent'].astype('float64')
+        total_items = state['TotalItems'].astype('int64')
+
+        features = pd.DataFrame({
+            'CustomerID': state.index.astype('int64'),
+            'Churn': (~state['ObservedAfterCutoff'].astype(bool)).astype('int64').to_numpy(),
+            'Recency': (self.training_cutoff - pd.to_datetime(state['LastPurchase'])).dt.days.to_numpy(),
+            'Frequency': frequency.to_numpy(),
+            'TotalSpent': total_spent.to_numpy(),
+            'TotalItems': total_items.to_numpy(),
+            'UniqueProducts': state['UniqueProducts'].astype('int64').to_numpy(),
+            'AvgOrderValue': (total_spent / frequency).to_numpy(),
+            'AvgDaysBetweenPurchases': mean.to_numpy(),
+            'StdDaysBetweenPurchases': np.sqrt(var.clip(lower=0)).to_numpy(),
+            'AvgBasketSize': (total_items / frequency).to_numpy(),
+            'MaxBasketSize': state['MaxBasketSize'].astype('int64').to_numpy(),
+            'CustomerLifetimeDays': (self.training_cutoff - pd.to_datetime(state['FirstPurchase'])).dt.days.to_numpy()
+        })
+
+        # Segmentation and NaN handling are global, so reuse FeatureEngineer's
+        engineer = FeatureEngineer(training_cutoff=self.training_cutoff, storage_format=self.storage_format,
+                                   interval_semantics=self.interval_semantics)
+        engineer.customer_features = features.sort_values('CustomerID').reset_index(drop=True)
+        engineer.create_segmentation()
+        engineer.handle_missing()
+        return engineer
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Fold transaction batches into the customer feature store")
+    parser.add_argument('batches', nargs='*', help="Cleaned transaction batches (csv/parquet) in time order")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Discard the stored state and fold data/processed/cleaned_transactions")
+    parser.add_argument('--training-cutoff', default='2011-09-09')
+    parser.add_argument('--interval-semantics', choices=INTERVAL_SEMANTICS, default='legacy',
+                        help="Purchase gaps between line items (legacy) or between invoices")
+    args = parser.parse_args()
+
+    store = FeatureStore(training_cutoff=args.training_cutoff, interval_semantics=args.interval_semantics)
+    batches = args.batches
+    if args.rebuild:
+        batches = ['data/processed/cleaned_transactions'] + batches
+    else:
+        store.load()
+
+    for path in batches:
+        print(f"Folding {path}...")
+        store.update(load_table(path, columns=TRANSACTION_COLUMNS, schema=CLEANED_TRANSACTIONS_SCHEMA))
+    store.save()
+    store.customer_features().save_features()
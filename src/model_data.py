@@ -0,0 +1,64 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+MODEL_READY_DIR = 'data/processed/model_ready'
+SPLITS = ['train', 'val', 'test']
+
+# The model-ready splits are dense float arrays, so they are stored as raw .npy
+# files: loading is a page-cache mapping instead of float text parsing, and
+# worker processes that open the same file share one copy of the pages.
+
+
+def save_split(name, X, y, directory=MODEL_READY_DIR, dtype=np.float64):
+    """
+    Save one split as X_<name>.npy and y_<name>.npy.
+
+    Args:
+        name (str): Split name ('train', 'val', 'test')
+        X (array-like): Encoded feature matrix
+        y (array-like): Target vector
+        directory (str): Output directory
+        dtype: Feature dtype (float64 keeps the preprocessor output bit for bit)
+    """
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, f'X_{name}.npy'), np.ascontiguousarray(X, dtype=dtype))
+    np.save(os.path.join(directory, f'y_{name}.npy'), np.asarray(y, dtype=np.int64))
+
+
+def save_metadata(feature_names, shapes, directory=MODEL_READY_DIR):
+    with open(os.path.join(directory, 'meta.json'), 'w') as f:
+        json.dump({
+            'feature_names': list(feature_names),
+            'shapes': {name: list(shape) for name, shape in shapes.items()}
+        }, f, indent=4)
+
+
+def load_feature_names(directory=MODEL_READY_DIR):
+    with open(os.path.join(directory, 'meta.json')) as f:
+        return json.load(f)['feature_names']
+
+
+def load_split(name, directory=MODEL_READY_DIR, mmap=True):
+    """
+    Load one split.
+
+    Args:
+        name (str): Split name ('train', 'val', 'test')
+        directory (str): Model-ready directory
+        mmap (bool): Memory-map X read-only instead of reading it into memory
+
+    Returns:
+        tuple: (X, y) NumPy arrays. Falls back to the older CSV layout
+        when no .npy files exist.
+    """
+    x_path = os.path.join(directory, f'X_{name}.npy')
+    if os.path.exists(x_path):
+        X = np.load(x_path, mmap_mode='r' if mmap else None)
+        y = np.load(os.path.join(directory, f'y_{name}.npy'))
+        return X, y
+
+    X = pd.read_csv(os.path.join(directory, f'X_{name}.csv')).to_numpy(dtype=np.float64)
+    y = pd.read_csv(os.path.join(directory, f'y_{name}.csv')).values.ravel()
+    return X, y
@@ -0,0 +1,94 @@
+import json
+import os
+from functools import lru_cache
+import joblib
+
+MODELS_DIR = 'models'
+
+# Artifact layouts:
+#   - XGBoost models as the native UBJSON booster (.ubj), which is also
+#     stable across xgboost versions
+#   - everything else with an uncompressed joblib.dump (.pkl), whose numpy
+#     arrays load memory-mapped read-only instead of being read eagerly.
+#     This is not shared memory for every model: sklearn trees copy their
+#     node arrays on unpickling, so each process holds its own copy.
+# Aliases such as 'best_model' are small JSON pointers to a named artifact.
+ARTIFACT_EXTENSIONS = ['.ubj', '.pkl']
+
+
+def _is_xgboost(model):
+    try:
+        import xgboost as xgb
+    except ImportError:
+        return False
+    return isinstance(model, xgb.XGBModel)
+
+
+def artifact_path(name, model=None, directory=MODELS_DIR):
+    """Path `model` is saved to, or the existing artifact for `name` when model is None"""
+    if model is not None:
+        return os.path.join(directory, name + ('.ubj' if _is_xgboost(model) else '.pkl'))
+    for ext in ARTIFACT_EXTENSIONS:
+        path = os.path.join(directory, name + ext)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No artifact named '{name}' in {directory}")
+
+
+def save_model(model, name, directory=MODELS_DIR):
+    """
+    Save a fitted model or preprocessor under `name`.
+
+    Returns:
+        str: Path of the written artifact
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = artifact_path(name, model, directory)
+    if path.endswith('.ubj'):
+        model.save_model(path)
+    else:
+        joblib.dump(model, path, compress=0)
+
+    # Drop an artifact of the same name in the other layout so loads are unambiguous
+    for ext in ARTIFACT_EXTENSIONS:
+        stale = os.path.join(directory, name + ext)
+        if stale != path and os.path.exists(stale):
+            os.remove(stale)
+    return path
+
+
+def set_alias(alias, name, directory=MODELS_DIR):
+    """Point `alias` (e.g. 'best_model') at the artifact saved as `name`"""
+    with open(os.path.join(directory, alias + '.json'), 'w') as f:
+        json.dump({'model': name}, f)
+
+
+def resolve(name, directory=MODELS_DIR):
+    """Follow an alias pointer, if there is one, and return the artifact path"""
+    pointer = os.path.join(directory, name + '.json')
+    if os.path.exists(pointer):
+        with open(pointer) as f:
+            name = json.load(f)['model']
+    return artifact_path(name, directory=directory)
+
+
+@lru_cache(maxsize=16)
+def _load_artifact(path, mtime, mmap_mode):
+    if path.endswith('.ubj'):
+        import xgboost as xgb
+        model = xgb.XGBClassifier()
+        model.load_model(path)
+        return model
+    return joblib.load(path, mmap_mode=mmap_mode)
+
+
+def load_model(name, directory=MODELS_DIR, mmap_mode='r'):
+    """
+    Load an artifact by name or alias.
+
+    Loads are lazy and cached per process. An artifact is reloaded only when
+    its file changes on disk. Pass mmap_mode=None to read joblib arrays into
+    private memory instead of mapping them.
+    """
+    path = resolve(name, directory)
+    return _load_artifact(path, os.path.getmtime(path), mmap_mode)
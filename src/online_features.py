@@ -0,0 +1,217 @@
+import argparse
+import importlib
+import json
+import time
+import numpy as np
+import pandas as pd
+from storage import load_table, apply_schema, CUSTOMER_FEATURES_SCHEMA
+
+cleaning = importlib.import_module('02_data_cleaning')
+features = importlib.import_module('03_feature_engineering')
+
+FEATURE_INFO_PATH = 'data/processed/feature_info.json'
+CLEANING_STATS_PATH = 'data/processed/cleaning_statistics.json'
+
+# Raw transaction columns, under their workbook or cleaned names
+REQUIRED_COLUMNS = ['InvoiceNo', 'StockCode', 'Description', 'Quantity', 'InvoiceDate',
+                    'UnitPrice', 'CustomerID']
+
+# verify() tolerance for the aggregates: sums may add up in a different order
+AGGREGATE_TOLERANCE = 1e-6
+
+
+def _group_starts(keys):
+    """Start index of each run of equal values in sorted `keys`"""
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else keys[:0].astype(np.int64)
+
+
+class OnlineFeatureService:
+    """
+    Customer features computed at request time from raw transaction rows.
+
+    Rows go through the DataCleaner row filters, the Quantity bound and the
+    duplicate removal of the cleaning run, and the FeatureEngineer aggregates
+    are computed with NumPy for just the customers in the request, without
+    building the pipeline's intermediate tables. R/F/M scores use the quartile
+    edges and tie scores stored by the training run instead of refitting qcut
+    on the request, so a customer gets the features the model was trained on.
+    """
+
+    def __init__(self, feature_info_path=FEATURE_INFO_PATH, cleaning_stats_path=CLEANING_STATS_PATH):
+        with open(feature_info_path) as f:
+            feature_info = json.load(f)
+        with open(cleaning_stats_path) as f:
+            cleaning_stats = json.load(f)
+        if not feature_info.get('segment_edges'):
+            raise ValueError(f"{feature_info_path} has no segment edges; rerun feature engineering")
+        outliers = [s for s in cleaning_stats['steps_applied'] if s['step'] == 'remove_outliers']
+        if not outliers or 'upper_bound' not in outliers[-1]:
+            raise ValueError(f"{cleaning_stats_path} has no Quantity bound; rerun data cleaning")
+
+        self.training_cutoff = pd.to_datetime(feature_info['training_cutoff'])
+        self.interval_semantics = feature_info.get('interval_semantics', 'legacy')
+        self.segment_edges = feature_info['segment_edges']
+        self.segment_ties = feature_info.get('segment_ties') or {}
+        self.feature_columns = [c for c in feature_info['features'] if c not in ('CustomerID', 'Churn')]
+        self.quantity_upper_bound = outliers[-1]['upper_bound']
+
+    def segment(self, df):
+        """R/F/M scores, RFM_Score and CustomerSegment of feature rows, from the training quartiles"""
+        return features.apply_segment_edges(df, self.segment_edges, self.segment_ties)
+
+    def _valid_rows(self, transactions, as_of):
+        """
+        Columns of the rows that DataCleaner would keep and split_data would put
+        in the training window, as NumPy arrays under their cleaned names.
+        """
+        # Cleaned name -> column of `transactions`, without renaming a copy of the frame
+        names = {cleaning.RENAME_MAP.get(c.strip(), c.strip()): c for c in transactions.columns}
+        missing = [c for c in REQUIRED_COLUMNS if c not in names]
+        if missing:
+            raise ValueError(f"Transactions are missing columns: {missing}")
+        column = {name: transactions[names[name]] for name in REQUIRED_COLUMNS}
+
+        invoices = column['InvoiceNo'].astype(str).to_numpy()
+        quantity = column['Quantity'].to_numpy()
+        price = column['UnitPrice'].to_numpy(dtype='float64')
+        dates = pd.to_datetime(column['InvoiceDate']).to_numpy().astype('datetime64[ns]').view('int64')
+        # Row filters of DataCleaner.row_filter_predicates, the Quantity bound and
+        # the training window. Copies of a row get the same masks, so dropping
+        # duplicates before filtering keeps the same rows as after it.
+        keep = (column['CustomerID'].notna().to_numpy()
+                & ~np.char.startswith(invoices.astype('U'), 'C')
+                & (quantity > 0) & (price > 0)
+                & column['Description'].notna().to_numpy()
+                & (quantity <= self.quantity_upper_bound)
+                & (dates <= as_of.value)
+                & ~transactions.duplicated(subset=cleaning.dedup_columns(transactions)).to_numpy())
+
+        customers = column['CustomerID'].to_numpy()[keep].astype('int64')
+        order = np.argsort(customers, kind='stable')
+        return {
+            'CustomerID': customers[order],
+            'InvoiceNo': invoices[keep][order],
+            'StockCode': column['StockCode'].to_numpy()[keep][order],
+            'Quantity': quantity[keep][order].astype('int64'),
+            # TotalPrice of DataCleaner._derive_columns
+            'TotalPrice': quantity[keep][order] * price[keep][order],
+            'InvoiceDate': dates[keep][order]
+        }
+
+    def compute(self, transactions, as_of=None):
+        """
+        Feature rows for the customers in `transactions`.
+
+        Args:
+            transactions (pd.DataFrame): Raw transaction rows
+            as_of: Reference date for Recency and lifetime (default: the training
+                cutoff). Rows after it are ignored.
+
+        Returns:
+            pd.DataFrame: CustomerID and the model features, one row per customer
+                with at least one valid transaction, sorted by CustomerID
+        """
+        as_of = pd.Timestamp(as_of) if as_of is not None else self.training_cutoff
+        rows = self._valid_rows(transactions, as_of)
+        customers, dates = rows['CustomerID'], rows['InvoiceDate']
+        starts = _group_starts(customers)
+        row_customer = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(customers)]))
+
+        # Distinct (customer, invoice) baskets and (customer, product) pairs, in customer order
+        invoice_codes, invoice_values = pd.factorize(rows['InvoiceNo'])
+        baskets, basket_of_row = np.unique(row_customer * len(invoice_values) + invoice_codes,
+                                           return_inverse=True)
+        basket_quantity = np.bincount(basket_of_row, weights=rows['Quantity']).astype('int64')
+        basket_customer = baskets // max(len(invoice_values), 1)
+        product_codes, product_values = pd.factorize(rows['StockCode'])
+        products = np.unique(row_customer * len(product_values) + product_codes)
+
+        frequency = np.bincount(basket_customer, minlength=len(starts))
+        total_spent = np.add.reduceat(rows['TotalPrice'], starts)
+        total_items = np.add.reduceat(rows['Quantity'], starts)
+        intervals = features.purchase_intervals(customers, rows['InvoiceNo'], dates, self.interval_semantics)
+        df = {
+            'CustomerID': customers[starts],
+            'Recency': (as_of.value - np.maximum.reduceat(dates, starts)) // features.DAY_NS,
+            'Frequency': frequency,
+            'TotalSpent': total_spent,
+            'TotalItems': total_items,
+            'UniqueProducts': np.bincount(products // max(len(product_values), 1), minlength=len(starts)),
+            'AvgOrderValue': total_spent / frequency,
+            # Both frames are sorted by CustomerID
+            'AvgDaysBetweenPurchases': intervals['AvgDaysBetweenPurchases'].fillna(0).to_numpy(),
+            'StdDaysBetweenPurchases': intervals['StdDaysBetweenPurchases'].fillna(0).to_numpy(),
+            'AvgBasketSize': total_items / frequency,
+            'MaxBasketSize': np.maximum.reduceat(basket_quantity, _group_starts(basket_customer)),
+            'CustomerLifetimeDays': (as_of.value - np.minimum.reduceat(dates, starts)) // features.DAY_NS
+        }
+        # Scored as arrays: one DataFrame construction instead of a column insert per score
+        df = apply_schema(pd.DataFrame(self.segment(df)), CUSTOMER_FEATURES_SCHEMA)
+        return df[['CustomerID'] + self.feature_columns]
+
+
+def verify(service, raw, batch_features, n_customers=1000, seed=42):
+    """
+    Recompute features of a sample of customers from their raw rows and compare
+    them with the batch feature table.
+
+    Returns:
+        dict: max absolute difference of the aggregates, and the share of
+            customers whose scores and segment agree with the batch table
+
+    Raises:
+        AssertionError: If an aggregate differs by more than AGGREGATE_TOLERANCE
+            or a score or segment differs for any customer
+    """
+    raw = cleaning.DataCleaner._normalize_columns(raw)
+    customers = batch_features['CustomerID'].sample(min(n_customers, len(batch_features)), random_state=seed)
+    online = service.compute(raw[raw['CustomerID'].isin(customers)])
+    batch = batch_features.set_index('CustomerID').loc[online['CustomerID']].reset_index()
+
+    scores = ['R_Score', 'F_Score', 'M_Score', 'RFM_Score', 'CustomerSegment']
+    aggregates = [c for c in service.feature_columns if c not in scores]
+    result = {
+        'customers': len(online),
+        'max_aggregate_diff': float(np.abs(online[aggregates].to_numpy(dtype='float64') -
+                                           batch[aggregates].to_numpy(dtype='float64')).max()),
+        'score_agreement': {c: float((online[c].to_numpy() == batch[c].to_numpy()).mean()) for c in scores}
+    }
+    if result['max_aggregate_diff'] > AGGREGATE_TOLERANCE or min(result['score_agreement'].values()) < 1:
+        raise AssertionError(f"Online features differ from the batch table: {result}")
+    return result
+
+
+def time_compute(service, raw, batch_sizes=(1, 10, 100), repeats=20, seed=42):
+    """Latency of compute() for requests of `batch_size` customers"""
+    raw = cleaning.DataCleaner._normalize_columns(raw)
+    by_customer = raw.dropna(subset=['CustomerID']).groupby('CustomerID').indices
+    ids = np.array(list(by_customer))
+    rng = np.random.default_rng(seed)
+    results = []
+    for batch_size in batch_sizes:
+        requests = [raw.iloc[np.concatenate([by_customer[c] for c in rng.choice(ids, batch_size, replace=False)])]
+                    for _ in range(repeats)]
+        # Steady-state latency: the first call pays for pandas' lazy imports and caches
+        service.compute(requests[0])
+        start = time.perf_counter()
+        for request in requests:
+            service.compute(request)
+        seconds = (time.perf_counter() - start) / repeats
+        results.append({'customers': batch_size, 'ms_per_request': seconds * 1e3,
+                        'ms_per_customer': seconds * 1e3 / batch_size})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check online features against the batch feature table")
+    parser.add_argument('--raw', default='data/raw/online_retail', help="Raw transactions (csv/parquet or stem)")
+    parser.add_argument('--features', default='data/processed/customer_features')
+    parser.add_argument('--customers', type=int, default=1000)
+    args = parser.parse_args()
+
+    service = OnlineFeatureService()
+    raw = load_table(args.raw)
+    print(verify(service, raw, load_table(args.features), args.customers))
+    for result in time_compute(service, raw):
+        print(f"{result['customers']:4d} customers per request: {result['ms_per_request']:.1f}ms "
+              f"({result['ms_per_customer']:.2f}ms per customer)")
@@ -0,0 +1,143 @@
+import functools
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Every stage appends one JSON line to the trace: wall and CPU seconds, peak
+# RSS growth, rows in/out and the enclosing stage. Set PIPELINE_TRACE to a
+# different path, or to 'off' to disable tracing. Set PIPELINE_PROFILE to
+# 'cprofile' or 'pyinstrument' to also dump a profile per stage to logs/profiles.
+TRACE_PATH = os.environ.get('PIPELINE_TRACE', 'logs/pipeline_trace.jsonl')
+PROFILER = os.environ.get('PIPELINE_PROFILE', '').lower()
+PROFILE_DIR = 'logs/profiles'
+
+_profiling = {'active': False}
+
+
+class _ThreadState(threading.local):
+    # Stages nest per thread: concurrent requests in a threaded server must not
+    # see each other's stages as parents
+    def __init__(self):
+        self.stack = []
+
+
+_thread = _ThreadState()
+
+
+def _peak_rss_mb():
+    # ru_maxrss is reported in KB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 ** 2) if sys.platform == 'darwin' else rss / 1024
+
+
+def _start_profiler():
+    if PROFILER == 'cprofile':
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+    if PROFILER == 'pyinstrument' and not _profiling.get('unavailable'):
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("PIPELINE_PROFILE=pyinstrument needs `pip install pyinstrument`; not profiling",
+                  file=sys.stderr)
+            _profiling['unavailable'] = True
+            return None
+        profiler = Profiler()
+        profiler.start()
+        return profiler
+    return None
+
+
+def _dump_profile(profiler, name):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stem = os.path.join(PROFILE_DIR, f"{name}.{os.getpid()}")
+    if PROFILER == 'cprofile':
+        profiler.disable()
+        profiler.dump_stats(stem + '.prof')
+    else:
+        profiler.stop()
+        with open(stem + '.html', 'w') as f:
+            f.write(profiler.output_html())
+
+
+def write_trace(record):
+    if TRACE_PATH.lower() in ('', 'off', '0'):
+        return
+    os.makedirs(os.path.dirname(TRACE_PATH) or '.', exist_ok=True)
+    # One write per line in append mode, so worker processes can share the file
+    with open(TRACE_PATH, 'a') as f:
+        f.write(json.dumps(record, default=str) + '\n')
+
+
+@contextmanager
+def stage(name, rows_in=None, **fields):
+    """
+    Time a block and append its record to the trace.
+
+    Usage:
+        with stage('train.Random Forest', rows_in=len(X)) as record:
+            ...
+            record['rows_out'] = len(result)
+
+    Extra keyword arguments are stored in the record as they are.
+    """
+    stack = _thread.stack
+    record = {'stage': name, 'parent': stack[-1] if stack else None, 'pid': os.getpid(),
+              'rows_in': rows_in, 'rows_out': None, **fields}
+    # Only the outermost stage runs a profiler; profilers cannot nest
+    profiler = None if _profiling['active'] else _start_profiler()
+    _profiling['active'] = _profiling['active'] or profiler is not None
+    stack.append(name)
+    rss_before = _peak_rss_mb()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    record['started'] = time.time()
+    try:
+        yield record
+        record['status'] = 'ok'
+    except BaseException as e:
+        record['status'] = f'error: {type(e).__name__}'
+        raise
+    finally:
+        record['wall_seconds'] = time.perf_counter() - wall_start
+        record['cpu_seconds'] = time.process_time() - cpu_start
+        record['peak_rss_mb'] = _peak_rss_mb()
+        record['peak_rss_delta_mb'] = record['peak_rss_mb'] - rss_before
+        stack.pop()
+        if profiler is not None:
+            _dump_profile(profiler, name)
+            _profiling['active'] = False
+        write_trace(record)
+
+
+def traced(name=None, rows=None, memory=None):
+    """
+    Decorator form of `stage` for pipeline methods.
+
+    Args:
+        name (str): Stage name (default: the method's qualified name)
+        rows (callable): Called with the instance before and after the method
+            to fill rows_in and rows_out
+        memory (callable): Called with the instance after the method to fill
+            frame_mb, the in-memory size of the tables it holds
+    """
+    def decorator(func):
+        stage_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with stage(stage_name, rows_in=rows(self) if rows else None) as record:
+                result = func(self, *args, **kwargs)
+                if rows:
+                    record['rows_out'] = rows(self)
+                if memory:
+                    record['frame_mb'] = memory(self)
+            return result
+        return wrapper
+    return decorator
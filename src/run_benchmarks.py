@@ -0,0 +1,176 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from synthetic_data import write_transactions
+from storage import DEFAULT_FORMAT, table_path
+
+# End-to-end benchmark suite: for each scale, generate a raw synthetic
+# Online Retail file, run every pipeline stage as its own process in a scratch
+# directory and record wall time, peak RSS and throughput. Results are saved as
+# JSON so a later run can be compared against them for regressions.
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(SRC_DIR, '..', 'app')
+DEFAULT_SCALES = [10_000, 100_000, 1_000_000]
+
+
+def build_stages(n_rows, cores=None, streaming_above=5_000_000):
+    """(stage name, command) pairs, run in order from the scratch directory"""
+    features = table_path('data/processed/customer_features', DEFAULT_FORMAT)
+    cleaning = [os.path.join(SRC_DIR, '02_data_cleaning.py')]
+    if n_rows > streaming_above:
+        # Larger inputs are cleaned in bounded memory
+        cleaning += ['--chunksize', '1000000']
+    return [
+        ('cleaning', cleaning),
+        ('features', [os.path.join(SRC_DIR, '03_feature_engineering.py')]),
+        ('preparation', [os.path.join(SRC_DIR, '04_model_preparation.py')]),
+        ('training', [os.path.join(SRC_DIR, 'run_models.py')] + (['--cores', str(cores)] if cores else [])),
+        ('scoring', [os.path.join(APP_DIR, 'bulk_scoring.py'), features, 'data/predictions/scored.parquet'])
+    ]
+
+
+def _run(command, cwd, env):
+    """Run one stage; returns (seconds, peak RSS MB of that process)"""
+    start = time.perf_counter()
+    with open(os.path.join(cwd, 'logs', 'benchmark_stage.log'), 'a') as log:
+        process = subprocess.Popen([sys.executable] + command, cwd=cwd, env=env,
+                                   stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(process.pid, 0)
+    seconds = time.perf_counter() - start
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} failed with exit code {process.returncode}; "
+                           f"see {os.path.join(cwd, 'logs', 'benchmark_stage.log')}")
+    # ru_maxrss is reported in KB on Linux and bytes on macOS
+    rss = usage.ru_maxrss / (1024 ** 2) if sys.platform == 'darwin' else usage.ru_maxrss / 1024
+    return seconds, rss
+
+
+def run_scale(n_rows, cores=None, keep=False, seed=42):
+    """Generate one dataset and time every stage on it"""
+    workdir = tempfile.mkdtemp(prefix=f'churn_bench_{n_rows}_')
+    os.makedirs(os.path.join(workdir, 'logs'), exist_ok=True)
+    env = {**os.environ, 'PIPELINE_TRACE': os.path.join(workdir, 'logs', 'pipeline_trace.jsonl')}
+    results = []
+    try:
+        start = time.perf_counter()
+        raw_path = write_transactions(os.path.join(workdir, 'data', 'raw', 'online_retail.csv'),
+                                      n_rows, seed=seed)
+        print(f"  generated {n_rows} rows in {time.perf_counter() - start:.1f}s "
+              f"({os.path.getsize(raw_path) / 1024 ** 2:.0f}MB)")
+
+        for stage, command in build_stages(n_rows, cores):
+            seconds, rss = _run(command, workdir, env)
+            results.append({
+                'rows': n_rows,
+                'stage': stage,
+                'seconds': seconds,
+                'peak_rss_mb': rss,
+                'rows_per_sec': n_rows / seconds
+            })
+            print(f"  {stage:12s} {seconds:8.2f}s  peak RSS {rss:7.0f}MB")
+
+        # Per-step breakdown from the pipeline trace (see profiling.py)
+        trace_path = env['PIPELINE_TRACE']
+        steps = []
+        if os.path.exists(trace_path):
+            with open(trace_path) as f:
+                steps = [json.loads(line) for line in f if line.strip()]
+        return results, [{'rows': n_rows, 'stage': s['stage'], 'seconds': s['wall_seconds'],
+                          'cpu_seconds': s['cpu_seconds'], 'peak_rss_delta_mb': s['peak_rss_delta_mb']}
+                         for s in steps]
+    finally:
+        if keep:
+            print(f"  kept {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(current, baseline, tolerance=0.2, min_seconds=0.5):
+    """
+    Compare stage timings with a baseline run.
+
+    A stage regresses when it is more than `tolerance` slower than in the
+    baseline. Stages shorter than `min_seconds` in both runs are skipped as noise.
+
+    Returns:
+        list: Regressed (rows, stage, baseline seconds, current seconds)
+    """
+    base = {(r['rows'], r['stage']): r['seconds'] for r in baseline['results']}
+    regressions = []
+    print(f"\n{'rows':>10s} {'stage':12s} {'baseline':>9s} {'current':>9s} {'change':>8s}")
+    for r in current['results']:
+        key = (r['rows'], r['stage'])
+        if key not in base:
+            continue
+        before, after = base[key], r['seconds']
+        change = after / before - 1 if before > 0 else 0.0
+        flag = ''
+        if max(before, after) >= min_seconds and change > tolerance:
+            regressions.append((r['rows'], r['stage'], before, after))
+            flag = '  REGRESSION'
+        print(f"{r['rows']:>10d} {r['stage']:12s} {before:9.2f} {after:9.2f} {change:+8.1%}{flag}")
+    return regressions
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=SRC_DIR, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_suite(scales=DEFAULT_SCALES, cores=None, keep=False, seed=42):
+    results, steps = [], []
+    for n_rows in scales:
+        print(f"Scale {n_rows} rows:")
+        scale_results, scale_steps = run_scale(n_rows, cores, keep, seed)
+        results += scale_results
+        steps += scale_steps
+    return {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'storage_format': DEFAULT_FORMAT,
+        'seed': seed,
+        'scales': list(scales),
+        'results': results,
+        'steps': steps
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmarks on synthetic data")
+    parser.add_argument('--scales', type=lambda s: int(float(s)), nargs='+', default=DEFAULT_SCALES,
+                        help="Raw row counts to benchmark, e.g. 1e4 1e5 1e6 1e7")
+    parser.add_argument('--cores', type=int, default=None, help="Core budget for model training")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='logs/benchmarks/suite.json')
+    parser.add_argument('--baseline', help="Earlier suite JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Flag stages this much slower than the baseline (0.2 = 20%%)")
+    parser.add_argument('--keep', action='store_true', help="Keep the scratch directories")
+    args = parser.parse_args()
+
+    suite = run_suite(args.scales, args.cores, args.keep, args.seed)
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(suite, f, indent=4)
+    print(f"Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(suite, json.load(f), args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} stage(s) regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
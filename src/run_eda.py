@@ -4,16 +4,17 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import os
 from scipy import stats
+from storage import load_table, table_exists, CUSTOMER_FEATURES_SCHEMA
 
 def run_eda():
     print("Running EDA...")
     
     # Check data
-    if not os.path.exists('data/processed/customer_features.csv'):
+    if not table_exists('data/processed/customer_features'):
         print("Feature data not found!")
         return
         
-    df = pd.read_csv('data/processed/customer_features.csv')
+    df = load_table('data/processed/customer_features', schema=CUSTOMER_FEATURES_SCHEMA)
     os.makedirs('visualizations/eda', exist_ok=True)
     
     # 1. Churn Distribution
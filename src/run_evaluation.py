@@ -1,38 +1,43 @@
 import pandas as pd
-import joblib
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.metrics import *
 import os
 import json
+from model_data import load_split
+from model_registry import load_model
+from streaming_metrics import BinnedMetrics
+from profiling import stage
 
-def evaluate_model():
+def evaluate_model(chunksize=100_000, n_bins=10000):
+    """
+    Score the test split chunk by chunk with a single predict_proba pass and
+    accumulate metrics and curves in constant memory (see BinnedMetrics).
+    """
     print("Evaluating best model...")
     os.makedirs('visualizations/evaluation', exist_ok=True)
     
-    # Load
-    X_test = pd.read_csv('data/processed/model_ready/X_test.csv')
-    y_test = pd.read_csv('data/processed/model_ready/y_test.csv').values.ravel()
-    model = joblib.load('models/best_model.pkl')
+    # Load (X_test is memory-mapped, so chunks are read on demand)
+    X_test, y_test = load_split('test')
+    model = load_model('best_model')
     
     # Predict
-    y_pred = model.predict(X_test)
-    y_prob = model.predict_proba(X_test)[:, 1]
+    tracker = BinnedMetrics(n_bins=n_bins)
+    with stage('evaluate.predict', rows_in=len(y_test)) as record:
+        for start in range(0, len(y_test), chunksize):
+            end = start + chunksize
+            tracker.update(y_test[start:end], model.predict_proba(X_test[start:end])[:, 1])
+        record['rows_out'] = len(y_test)
     
     # Metrics
-    metrics = {
-        'test_accuracy': accuracy_score(y_test, y_pred),
-        'test_precision': precision_score(y_test, y_pred),
-        'test_recall': recall_score(y_test, y_pred),
-        'test_f1': f1_score(y_test, y_pred),
-        'test_roc_auc': roc_auc_score(y_test, y_prob)
-    }
+    metrics = tracker.metrics()
     
     print("Test Metrics:")
     print(json.dumps(metrics, indent=4))
+    with open('models/test_metrics.json', 'w') as f:
+        json.dump(metrics, f, indent=4)
     
     # ROC Curve
-    fpr, tpr, _ = roc_curve(y_test, y_prob)
+    fpr, tpr, _ = tracker.roc_curve()
     plt.figure()
     plt.plot(fpr, tpr, label='ROC curve (AUC = %0.2f)' % metrics['test_roc_auc'])
     plt.plot([0, 1], [0, 1], 'k--')
@@ -44,7 +49,7 @@ def evaluate_model():
     plt.close()
     
     # Confusion Matrix
-    cm = confusion_matrix(y_test, y_pred)
+    cm = tracker.confusion_matrix()
     plt.figure()
     sns.heatmap(cm, annot=True, fmt='d', cmap='Blues')
     plt.title('Confusion Matrix')
@@ -54,7 +59,7 @@ def evaluate_model():
     plt.close()
     
     # Precision-Recall Curve (Extra)
-    precision, recall, _ = precision_recall_curve(y_test, y_prob)
+    precision, recall, _ = tracker.precision_recall_curve()
     plt.figure()
     plt.plot(recall, precision, marker='.')
     plt.xlabel('Recall')
@@ -64,4 +69,9 @@ def evaluate_model():
     plt.close()
 
 if __name__ == "__main__":
-    evaluate_model()
+    import argparse
+    parser = argparse.ArgumentParser(description="Evaluate the best model on the test split")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="Rows scored per predict_proba call")
+    parser.add_argument('--bins', type=int, default=10000, help="Probability bins for the ROC/PR curves")
+    args = parser.parse_args()
+    evaluate_model(args.chunksize, args.bins)
@@ -1,91 +1,155 @@
 import pandas as pd
 import numpy as np
 import time
-import joblib
 import json
 import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from threadpoolctl import threadpool_limits
 from sklearn.linear_model import LogisticRegression
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.neural_network import MLPClassifier
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
 import xgboost as xgb
+from model_data import load_split, MODEL_READY_DIR
+from model_registry import save_model, set_alias
+from profiling import stage
 
-def train_and_evaluate():
+MODEL_NAMES = ['Logistic Regression', 'Decision Tree', 'Random Forest',
+               'Gradient Boosting', 'XGBoost', 'Neural Network']
+
+# Models that can use more than one thread for a single fit
+MULTITHREADED = {'Random Forest', 'XGBoost'}
+
+def build_model(name, n_threads=1, params=None):
+    """
+    Return an unfitted estimator, using up to `n_threads` threads where the estimator supports it.
+    `params` override the default hyperparameters (see tune_models.py).
+    """
+    params = params or {}
+    if name == 'Logistic Regression':
+        return LogisticRegression(**{'random_state': 42, 'max_iter': 1000, **params})
+    if name == 'Decision Tree':
+        return DecisionTreeClassifier(**{'max_depth': 5, 'random_state': 42, **params})
+    if name == 'Random Forest':
+        return RandomForestClassifier(**{'n_estimators': 100, 'max_depth': 10, 'random_state': 42,
+                                         'n_jobs': n_threads, **params})
+    if name == 'Gradient Boosting':
+        return GradientBoostingClassifier(**{'random_state': 42, **params})
+    if name == 'XGBoost':
+        return xgb.XGBClassifier(**{'random_state': 42, 'use_label_encoder': False, 'eval_metric': 'logloss',
+                                    'n_jobs': n_threads, **params})
+    if name == 'Neural Network':
+        return MLPClassifier(**{'hidden_layer_sizes': (64, 32), 'max_iter': 500, 'random_state': 42, **params})
+    raise ValueError(f"Unknown model: {name}")
+
+def plan_core_budget(names, n_cores):
+    """
+    Split `n_cores` between concurrent fits and per-fit threads.
+
+    Every model gets its own worker (up to the core count) and one core;
+    the cores left over go to the models that can use threads.
+
+    Returns:
+        tuple: (n_workers, {model name: n_threads})
+    """
+    n_workers = max(1, min(len(names), n_cores))
+    threads = {name: 1 for name in names}
+    threaded = [name for name in names if name in MULTITHREADED]
+    spare = n_cores - n_workers
+    for i, name in enumerate(threaded):
+        threads[name] += spare // len(threaded) + (1 if i < spare % len(threaded) else 0)
+    return n_workers, threads
+
+_data = {}
+
+def _init_worker(directory):
+    # Workers memory-map the same files, so the splits are shared through the page cache
+    X_train, y_train = load_split('train', directory)
+    X_val, y_val = load_split('val', directory)
+    _data.update(X_train=X_train, y_train=y_train, X_val=X_val, y_val=y_val)
+
+def _fit_one(name, n_threads):
+    """Fit, score and save one model; runs in a worker process"""
+    model = build_model(name, n_threads)
+    X_train, y_train, X_val, y_val = _data['X_train'], _data['y_train'], _data['X_val'], _data['y_val']
+
+    # Cap BLAS/OpenMP threads so concurrent fits do not oversubscribe the box
+    with threadpool_limits(limits=n_threads):
+        with stage(f'train.{name}', rows_in=len(y_train), threads=n_threads):
+            start_time = time.time()
+            model.fit(X_train, y_train)
+            duration = time.time() - start_time
+
+        with stage(f'validate.{name}', rows_in=len(y_val)):
+            y_pred = model.predict(X_val)
+            y_prob = model.predict_proba(X_val)[:, 1]
+
+    metrics = {
+        'Model': name,
+        'Accuracy': accuracy_score(y_val, y_pred),
+        'Precision': precision_score(y_val, y_pred),
+        'Recall': recall_score(y_val, y_pred),
+        'F1-Score': f1_score(y_val, y_pred),
+        'ROC-AUC': roc_auc_score(y_val, y_prob),
+        'Training_Time': duration
+    }
+
+    save_model(model, name.lower().replace(' ', '_'))
+    return metrics
+
+def train_and_evaluate(n_cores=None, data_dir=MODEL_READY_DIR):
     print("Training models...")
     os.makedirs('models', exist_ok=True)
-    
-    # Load Data
-    X_train = pd.read_csv('data/processed/model_ready/X_train.csv')
-    y_train = pd.read_csv('data/processed/model_ready/y_train.csv').values.ravel()
-    X_val = pd.read_csv('data/processed/model_ready/X_val.csv')
-    y_val = pd.read_csv('data/processed/model_ready/y_val.csv').values.ravel()
-    
-    # Define Models
-    models = {
-        'Logistic Regression': LogisticRegression(random_state=42, max_iter=1000),
-        'Decision Tree': DecisionTreeClassifier(max_depth=5, random_state=42),
-        'Random Forest': RandomForestClassifier(n_estimators=100, max_depth=10, random_state=42),
-        'Gradient Boosting': GradientBoostingClassifier(random_state=42),
-        'XGBoost': xgb.XGBClassifier(random_state=42, use_label_encoder=False, eval_metric='logloss'),
-        'Neural Network': MLPClassifier(hidden_layer_sizes=(64, 32), max_iter=500, random_state=42)
-    }
-    
-    comparison_data = []
+
+    n_cores = n_cores or os.cpu_count() or 1
+    n_workers, threads = plan_core_budget(MODEL_NAMES, n_cores)
+    print(f"Core budget: {n_cores} cores, {n_workers} concurrent fits, threads per model {threads}")
+
+    comparison_path = 'models/model_comparison.csv'
+    if os.path.exists(comparison_path):
+        os.remove(comparison_path)
+
+    comparison_data = {}
+    wall_start = time.time()
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                             initargs=(data_dir,)) as pool:
+        futures = {pool.submit(_fit_one, name, threads[name]): name for name in MODEL_NAMES}
+        for future in as_completed(futures):
+            metrics = future.result()
+            comparison_data[metrics['Model']] = metrics
+            print(f"  {metrics['Model']}: AUC {metrics['ROC-AUC']:.4f} "
+                  f"({metrics['Training_Time']:.1f}s, {threads[metrics['Model']]} threads)")
+
+            # Append each result as it lands so partial runs still leave a comparison
+            pd.DataFrame([metrics]).to_csv(comparison_path, mode='a', index=False,
+                                           header=len(comparison_data) == 1)
+    print(f"All models trained in {time.time() - wall_start:.1f}s wall time")
+
+    # Track Best, in definition order so ties resolve as before
     best_model_name = ""
     best_auc = 0
-    
-    for name, model in models.items():
-        print(f"Training {name}...")
-        start_time = time.time()
-        
-        # Train
-        model.fit(X_train, y_train)
-        
-        duration = time.time() - start_time
-        
-        # Predict
-        y_pred = model.predict(X_val)
-        y_prob = model.predict_proba(X_val)[:, 1]
-        
-        # Metrics
-        metrics = {
-            'Model': name,
-            'Accuracy': accuracy_score(y_val, y_pred),
-            'Precision': precision_score(y_val, y_pred),
-            'Recall': recall_score(y_val, y_pred),
-            'F1-Score': f1_score(y_val, y_pred),
-            'ROC-AUC': roc_auc_score(y_val, y_prob),
-            'Training_Time': duration
-        }
-        
-        comparison_data.append(metrics)
-        print(f"  AUC: {metrics['ROC-AUC']:.4f}")
-        
-        # Save Model
-        filename = name.lower().replace(' ', '_') + '.pkl'
-        joblib.dump(model, f'models/{filename}')
-        
-        # Track Best
-        if metrics['ROC-AUC'] > best_auc:
-            best_auc = metrics['ROC-AUC']
+    for name in MODEL_NAMES:
+        if comparison_data[name]['ROC-AUC'] > best_auc:
+            best_auc = comparison_data[name]['ROC-AUC']
             best_model_name = name
-            
-    # Save Comparison
-    comparison_df = pd.DataFrame(comparison_data)
-    comparison_df.to_csv('models/model_comparison.csv', index=False)
+
+    # Rewrite the comparison in MODEL_NAMES order, whatever order the fits finished in
+    comparison_df = pd.DataFrame([comparison_data[name] for name in MODEL_NAMES])
+    comparison_df.to_csv(comparison_path, index=False)
     print("\nModel Comparison:")
     print(comparison_df.sort_values('ROC-AUC', ascending=False))
-    
-    # Save Best Model as 'best_model.pkl'
-    best_model_file = best_model_name.lower().replace(' ', '_') + '.pkl'
-    # Copy file logic manually or just re-save
+
     print(f"\nBest Model: {best_model_name} (AUC: {best_auc:.4f})")
-    
-    # We load the best model and save it as 'best_model.pkl' specifically
-    best_model = joblib.load(f'models/{best_model_file}')
-    joblib.dump(best_model, 'models/best_model.pkl')
-    print("Saved models/best_model.pkl")
+
+    # 'best_model' is an alias to the saved artifact rather than a second copy
+    set_alias('best_model', best_model_name.lower().replace(' ', '_'))
+    print("Saved models/best_model.json")
 
 if __name__ == "__main__":
-    train_and_evaluate()
+    parser = argparse.ArgumentParser(description="Train and compare the model zoo")
+    parser.add_argument('--cores', type=int, default=None,
+                        help="Core budget shared by concurrent fits (default: all cores)")
+    args = parser.parse_args()
+    train_and_evaluate(args.cores)
@@ -0,0 +1,282 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import time
+from storage import DEFAULT_FORMAT, resolve_table, table_exists, table_path
+
+# Setup logging
+os.makedirs('logs', exist_ok=True)
+logging.basicConfig(
+    filename='logs/pipeline.log',
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+RAW_STEM = 'data/raw/online_retail'
+MODEL_FILES = ['logistic_regression', 'decision_tree', 'random_forest',
+               'gradient_boosting', 'xgboost', 'neural_network']
+
+
+def build_stages(training_cutoff='2011-09-09', iqr_multiplier=1.5, storage_format=None,
+                 interval_semantics='legacy'):
+    """
+    The pipeline as a list of stages.
+
+    Each stage names its script, every src module it imports, the files it reads
+    and writes, and the parameters that change its outputs. Together these
+    make up the stage's cache key.
+    """
+    fmt = storage_format or DEFAULT_FORMAT
+    # Raw data converted from the workbook (see convert_xlsx_to_csv), or an existing CSV
+    raw = resolve_table(RAW_STEM)[0] if table_exists(RAW_STEM) else table_path(RAW_STEM)
+    cleaned = table_path('data/processed/cleaned_transactions', fmt)
+    features = table_path('data/processed/customer_features', fmt)
+    model_ready = [f'data/processed/model_ready/{x}_{split}.npy'
+                   for split in ['train', 'val', 'test'] for x in 'Xy']
+    # XGBoost is saved in its native format, everything else with joblib (see model_registry)
+    model_artifacts = [f'models/{name}.ubj' if name == 'xgboost' else f'models/{name}.pkl'
+                       for name in MODEL_FILES]
+    return [
+        {
+            'name': 'data_cleaning',
+            'script': '02_data_cleaning.py',
+            'args': ['--input', raw, '--iqr-multiplier', str(iqr_multiplier)],
+            'code': ['02_data_cleaning.py', 'storage.py', 'dedup.py', 'profiling.py'],
+            'params': {'iqr_multiplier': iqr_multiplier, 'storage_format': fmt},
+            'inputs': [raw],
+            'outputs': [cleaned, 'data/processed/cleaning_statistics.json']
+        },
+        {
+            'name': 'feature_engineering',
+            'script': '03_feature_engineering.py',
+            'args': ['--training-cutoff', str(training_cutoff), '--interval-semantics', interval_semantics],
+            'code': ['03_feature_engineering.py', 'storage.py', 'profiling.py'],
+            'params': {'training_cutoff': str(training_cutoff), 'interval_semantics': interval_semantics,
+                       'storage_format': fmt},
+            'inputs': [cleaned],
+            'outputs': [features, 'data/processed/feature_info.json']
+        },
+        {
+            'name': 'model_preparation',
+            'script': '04_model_preparation.py',
+            'args': [],
+            'code': ['04_model_preparation.py', 'storage.py', 'model_data.py', 'model_registry.py'],
+            'params': {},
+            'inputs': [features],
+            'outputs': model_ready + ['data/processed/model_ready/meta.json',
+                                      'data/processed/feature_names.json', 'models/preprocessor.pkl']
+        },
+        {
+            'name': 'train_models',
+            'script': 'run_models.py',
+            'args': [],
+            'code': ['run_models.py', 'model_data.py', 'model_registry.py', 'profiling.py'],
+            'params': {},
+            'inputs': model_ready,
+            'outputs': model_artifacts + ['models/model_comparison.csv', 'models/best_model.json']
+        },
+        {
+            'name': 'evaluation',
+            'script': 'run_evaluation.py',
+            'args': [],
+            'code': ['run_evaluation.py', 'model_data.py', 'model_registry.py', 'streaming_metrics.py',
+                     'profiling.py'],
+            'params': {},
+            'inputs': ['data/processed/model_ready/X_test.npy', 'data/processed/model_ready/y_test.npy',
+                       'models/best_model.json'] + model_artifacts,
+            'outputs': ['models/test_metrics.json',
+                        'visualizations/evaluation/roc_curve.png',
+                        'visualizations/evaluation/confusion_matrix.png',
+                        'visualizations/evaluation/precision_recall_curve.png']
+        }
+    ]
+
+
+class StageCache:
+    """
+    Content-addressed store of stage outputs under `cache_dir/<key>/`.
+
+    File hashes are memoized by (path, size, mtime) so unchanged inputs are
+    not re-read. Entries are evicted least-recently-used first once the
+    cache grows past `budget_mb`.
+    """
+
+    def __init__(self, cache_dir='.cache/stages', budget_mb=2048):
+        self.cache_dir = cache_dir
+        self.budget_bytes = budget_mb * 1024 ** 2
+        self.index_path = os.path.join(cache_dir, 'file_hashes.json')
+        os.makedirs(cache_dir, exist_ok=True)
+        self.file_hashes = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.file_hashes = json.load(f)
+
+    def file_hash(self, path):
+        stat = os.stat(path)
+        cached = self.file_hashes.get(path)
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return cached['sha256']
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        self.file_hashes[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                  'sha256': digest.hexdigest()}
+        return digest.hexdigest()
+
+    def save_index(self):
+        with open(self.index_path, 'w') as f:
+            json.dump(self.file_hashes, f)
+
+    def stage_key(self, stage):
+        """sha256 over the stage's code, parameters and input contents"""
+        missing = [path for path in stage['inputs'] if not os.path.exists(path)]
+        if missing:
+            raise FileNotFoundError(f"Stage '{stage['name']}' is missing inputs: {missing}")
+        manifest = {
+            'stage': stage['name'],
+            'code': {name: self.file_hash(os.path.join(SRC_DIR, name)) for name in stage['code']},
+            'params': stage['params'],
+            'inputs': {path: self.file_hash(path) for path in stage['inputs']}
+        }
+        return hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def _read_manifest(self, key):
+        path = os.path.join(self._entry_dir(key), 'manifest.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_manifest(self, key, manifest):
+        with open(os.path.join(self._entry_dir(key), 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=4)
+
+    def restore(self, key):
+        """
+        Put the cached outputs of `key` in place.
+
+        Returns:
+            bool: False on a cache miss
+        """
+        manifest = self._read_manifest(key)
+        if manifest is None:
+            return False
+        for path, sha in manifest['outputs'].items():
+            # Leave outputs that already hold the cached content untouched
+            if os.path.exists(path) and self.file_hash(path) == sha:
+                continue
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            shutil.copy2(os.path.join(self._entry_dir(key), sha), path)
+        manifest['last_used'] = time.time()
+        self._write_manifest(key, manifest)
+        return True
+
+    def store(self, key, stage):
+        entry = self._entry_dir(key)
+        os.makedirs(entry, exist_ok=True)
+        outputs = {}
+        total_bytes = 0
+        for path in stage['outputs']:
+            sha = self.file_hash(path)
+            blob = os.path.join(entry, sha)
+            if not os.path.exists(blob):
+                shutil.copy2(path, blob)
+            outputs[path] = sha
+            total_bytes += os.path.getsize(path)
+        self._write_manifest(key, {
+            'stage': stage['name'],
+            'params': stage['params'],
+            'outputs': outputs,
+            'bytes': total_bytes,
+            'created': time.time(),
+            'last_used': time.time()
+        })
+
+    def evict(self, keep=()):
+        """Drop least-recently-used entries until the cache fits its budget"""
+        entries = []
+        for key in os.listdir(self.cache_dir):
+            manifest = self._read_manifest(key) if os.path.isdir(self._entry_dir(key)) else None
+            if manifest is not None:
+                entries.append((manifest['last_used'], manifest['bytes'], key))
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total <= self.budget_bytes:
+                break
+            if key in keep:
+                continue
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total -= size
+            logging.info(f"Evicted cache entry {key[:12]} ({size / 1024 ** 2:.1f}MB)")
+        return total
+
+
+def run_pipeline(stages, cache=None, force=()):
+    """
+    Run the stages in order, reusing cached outputs of stages whose key is unchanged.
+
+    Args:
+        stages (list): Stage definitions from build_stages
+        cache (StageCache): Stage cache, or None to run every stage
+        force (iterable): Names of stages to run even on a cache hit
+    """
+    if not table_exists(RAW_STEM):
+        print(f"{RAW_STEM} not found, running data acquisition...")
+        subprocess.run([sys.executable, os.path.join(SRC_DIR, '01_data_acquisition.py')], check=True)
+
+    used_keys = []
+    summary = []
+    for stage in stages:
+        start = time.time()
+        key = cache.stage_key(stage) if cache else None
+        if key and stage['name'] not in force and cache.restore(key):
+            status = 'cached'
+        else:
+            print(f"Running {stage['name']}...")
+            subprocess.run([sys.executable, os.path.join(SRC_DIR, stage['script'])] + stage['args'],
+                           check=True)
+            if cache:
+                cache.store(key, stage)
+            status = 'ran'
+        if cache:
+            used_keys.append(key)
+            cache.save_index()
+        duration = time.time() - start
+        logging.info(f"{stage['name']}: {status} in {duration:.1f}s (key {key and key[:12]})")
+        print(f"  {stage['name']:20s} {status:6s} {duration:.1f}s")
+        summary.append({'stage': stage['name'], 'status': status, 'seconds': duration, 'key': key})
+
+    if cache:
+        total = cache.evict(keep=used_keys)
+        print(f"Stage cache: {total / 1024 ** 2:.1f}MB of {cache.budget_bytes / 1024 ** 2:.0f}MB")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the churn pipeline, skipping unchanged stages")
+    parser.add_argument('--training-cutoff', default='2011-09-09')
+    parser.add_argument('--iqr-multiplier', type=float, default=1.5)
+    parser.add_argument('--interval-semantics', choices=['legacy', 'invoice'], default='legacy',
+                        help="Purchase gaps between line items (legacy) or between invoices")
+    parser.add_argument('--force', nargs='+', default=[], help="Stages to rerun even when cached")
+    parser.add_argument('--no-cache', action='store_true', help="Run every stage")
+    parser.add_argument('--cache-dir', default='.cache/stages')
+    parser.add_argument('--cache-budget-mb', type=int, default=2048,
+                        help="Evict least-recently-used stage outputs beyond this size")
+    args = parser.parse_args()
+
+    stages = build_stages(args.training_cutoff, args.iqr_multiplier,
+                          interval_semantics=args.interval_semantics)
+    cache = None if args.no_cache else StageCache(args.cache_dir, args.cache_budget_mb)
+    run_pipeline(stages, cache, force=set(args.force))
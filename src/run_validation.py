@@ -2,22 +2,22 @@ import pandas as pd
 import numpy as np
 import json
 import os
+from storage import load_table, table_exists, CLEANED_TRANSACTIONS_SCHEMA
 
 def validate_data():
     print("Running data validation...")
-    if not os.path.exists('data/processed/cleaned_transactions.csv'):
+    if not table_exists('data/processed/cleaned_transactions'):
         print("Cleaned data not found!")
         return
 
-    df_clean = pd.read_csv('data/processed/cleaned_transactions.csv')
-    df_clean['InvoiceDate'] = pd.to_datetime(df_clean['InvoiceDate'])
+    df_clean = load_table('data/processed/cleaned_transactions', schema=CLEANED_TRANSACTIONS_SCHEMA)
     
     # Assertions
     try:
         assert df_clean.isnull().sum().sum() == 0, "Missing values found!"
         assert (df_clean['Quantity'] > 0).all(), "Negative quantities found!"
         assert (df_clean['UnitPrice'] > 0).all(), "Invalid prices found!"
-        assert df_clean['CustomerID'].dtype == 'int64', "CustomerID not integer!"
+        assert pd.api.types.is_integer_dtype(df_clean['CustomerID']), "CustomerID not integer!"
         print("All validation checks passed!")
     except AssertionError as e:
         print(f"Validation FAILED: {e}")
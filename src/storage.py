@@ -0,0 +1,329 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Backend used for the tables handed from one pipeline stage to the next.
+# 'parquet' needs pyarrow; 'csv' keeps the original text format.
+STORAGE_FORMATS = {
+    'csv': '.csv',
+    'parquet': '.parquet'
+}
+
+
+def _default_format():
+    fmt = os.environ.get('STORAGE_FORMAT')
+    if fmt:
+        return fmt
+    try:
+        import pyarrow  # noqa: F401
+        return 'parquet'
+    except ImportError:
+        return 'csv'
+
+
+DEFAULT_FORMAT = _default_format()
+
+# Typed schemas for the stage outputs. Applied after CSV reads (which lose
+# dtypes) and before Parquet writes (which keep them). InvoiceNo and UnitPrice
+# are left to compact_transactions, whose choice depends on the values.
+CLEANED_TRANSACTIONS_SCHEMA = {
+    'IsCancelled': 'bool',
+    'StockCode': 'category',
+    'Description': 'category',
+    'Quantity': 'int32',
+    'InvoiceDate': 'datetime64[ns]',
+    'CustomerID': 'int32',
+    'Country': 'category',
+    'TotalPrice': 'float64',
+    'Year': 'int16',
+    'Month': 'int8',
+    'DayOfWeek': 'int8',
+    'Hour': 'int8'
+}
+
+# Text columns of the transaction table stored as categorical codes
+CATEGORICAL_COLUMNS = ['StockCode', 'Description', 'Country', 'Sheet']
+
+# Integer aggregates are int64 whatever the transaction dtypes (int32 Quantity
+# sums stay int32), so both backends hand model preparation the same columns
+CUSTOMER_FEATURES_SCHEMA = {
+    'CustomerID': 'int64',
+    'Churn': 'int64',
+    'Recency': 'int64',
+    'Frequency': 'int64',
+    'TotalItems': 'int64',
+    'UniqueProducts': 'int64',
+    'MaxBasketSize': 'int64',
+    'CustomerLifetimeDays': 'int64',
+    'R_Score': 'int64',
+    'F_Score': 'int64',
+    'M_Score': 'int64',
+    'RFM_Score': 'int64',
+    'CustomerSegment': 'category'
+}
+
+
+def _fits(values, dtype):
+    info = np.iinfo(dtype)
+    return len(values) == 0 or (values.min() >= info.min and values.max() <= info.max)
+
+
+def compact_transactions(df):
+    """
+    Convert a transaction table to its compact in-memory representation.
+
+    - text columns become categoricals
+    - InvoiceNo is split into IsCancelled (the 'C' prefix) and an int32 invoice
+      number; if some invoice is not 'C' + digits it stays a categorical
+    - CustomerID becomes int32, or float32 while it still has missing values
+      (exact for IDs below 2**24)
+    - Quantity becomes int32, calendar fields int16/int8
+    - UnitPrice becomes float32 when every price is whole cents and survives
+      the round trip; use unit_price() to get the exact float64 prices back
+
+    Columns that are already compact are left alone, so the conversion can be
+    applied after every load. Returns the same DataFrame.
+    """
+    if 'InvoiceNo' in df.columns and not pd.api.types.is_integer_dtype(df['InvoiceNo']):
+        invoice = df['InvoiceNo'].astype(str)
+        cancelled = invoice.str.startswith('C')
+        number = invoice.str.removeprefix('C')
+        if 'IsCancelled' not in df.columns:
+            df['IsCancelled'] = cancelled.to_numpy()
+        if number.str.fullmatch(r'\d{1,9}').all():
+            df['InvoiceNo'] = number.astype('int64').astype('int32')
+        else:
+            df['InvoiceNo'] = invoice.astype('category')
+    elif 'InvoiceNo' in df.columns:
+        if 'IsCancelled' not in df.columns:
+            df['IsCancelled'] = False
+        if _fits(df['InvoiceNo'], np.int32):
+            df['InvoiceNo'] = df['InvoiceNo'].astype('int32')
+
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+
+    if 'CustomerID' in df.columns:
+        ids = df['CustomerID']
+        if ids.isna().any():
+            if ids.max() < 2 ** 24 and ids.dtype != 'float32':
+                df['CustomerID'] = ids.astype('float32')
+        elif ids.dtype != 'int32' and _fits(ids, np.int32):
+            df['CustomerID'] = ids.astype('int32')
+
+    if 'Quantity' in df.columns and df['Quantity'].dtype != 'int32' and _fits(df['Quantity'], np.int32):
+        df['Quantity'] = df['Quantity'].astype('int32')
+
+    if 'UnitPrice' in df.columns and df['UnitPrice'].dtype == 'float64':
+        price = df['UnitPrice'].to_numpy()
+        price32 = price.astype(np.float32)
+        if np.array_equal(np.round(price32.astype(np.float64), 2), price, equal_nan=True):
+            df['UnitPrice'] = price32
+
+    for col, dtype in [('Year', 'int16'), ('Month', 'int8'), ('DayOfWeek', 'int8'), ('Hour', 'int8')]:
+        if col in df.columns and df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def unit_price(df):
+    """UnitPrice as exact float64 (compact_transactions may store it as float32 cents)"""
+    price = df['UnitPrice']
+    return price.astype('float64').round(2) if price.dtype == 'float32' else price
+
+
+def memory_report(df):
+    """In-memory size of each column in MB, and the total"""
+    usage = df.memory_usage(deep=True, index=False) / 1024 ** 2
+    return {'total_mb': float(usage.sum()), 'columns_mb': {col: float(mb) for col, mb in usage.items()}}
+
+
+def _check_format(fmt):
+    if fmt not in STORAGE_FORMATS:
+        raise ValueError(f"Unknown storage format '{fmt}', expected one of {list(STORAGE_FORMATS)}")
+    return fmt
+
+
+def table_path(stem, fmt=None):
+    """Return the file path for a table stem in the given format"""
+    fmt = _check_format(fmt or DEFAULT_FORMAT)
+    root, ext = os.path.splitext(stem)
+    if ext in STORAGE_FORMATS.values():
+        stem = root
+    return stem + STORAGE_FORMATS[fmt]
+
+
+def resolve_table(path, fmt=None):
+    """
+    Find the stored file for a table.
+
+    `path` may be a full file name or an extension-less stem. For a stem the
+    preferred format is tried first, then any other format found on disk.
+
+    Returns:
+        tuple: (file path, format)
+    """
+    root, ext = os.path.splitext(path)
+    for name, suffix in STORAGE_FORMATS.items():
+        if ext == suffix:
+            return path, name
+
+    preferred = _check_format(fmt or DEFAULT_FORMAT)
+    candidates = [preferred] + [f for f in STORAGE_FORMATS if f != preferred]
+    for name in candidates:
+        candidate = path + STORAGE_FORMATS[name]
+        if os.path.exists(candidate):
+            return candidate, name
+    raise FileNotFoundError(f"No stored table found for {path}")
+
+
+def table_exists(path, fmt=None):
+    try:
+        resolve_table(path, fmt)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def apply_schema(df, schema):
+    """Cast the columns of `df` that appear in `schema` to their declared dtype"""
+    if not schema:
+        return df
+    for col, dtype in schema.items():
+        if col not in df.columns or str(df[col].dtype) == dtype:
+            continue
+        if dtype == 'str':
+            if not pd.api.types.is_string_dtype(df[col]):
+                df[col] = df[col].astype(str)
+        elif dtype.startswith('datetime64'):
+            df[col] = pd.to_datetime(df[col])
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def save_table(df, path, fmt=None, schema=None):
+    """
+    Save a DataFrame with the selected storage backend.
+
+    Args:
+        df (pd.DataFrame): Table to save
+        path (str): File name or extension-less stem
+        fmt (str): 'csv' or 'parquet', defaults to STORAGE_FORMAT
+        schema (dict): Optional column -> dtype mapping applied before writing
+
+    Returns:
+        str: Path that was written
+    """
+    fmt = _check_format(fmt or DEFAULT_FORMAT)
+    output_path = table_path(path, fmt)
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+
+    if fmt == 'parquet':
+        df = apply_schema(df.copy(), schema) if schema else df
+        df.to_parquet(output_path, index=False, engine='pyarrow')
+    else:
+        df.to_csv(output_path, index=False)
+    return output_path
+
+
+def load_table(path, columns=None, schema=None, fmt=None):
+    """
+    Load a table saved with `save_table`.
+
+    Args:
+        path (str): File name or extension-less stem
+        columns (list): Optional column projection; only these are read
+        schema (dict): Optional column -> dtype mapping applied after reading
+        fmt (str): Preferred format when `path` is a stem
+
+    Returns:
+        pd.DataFrame: Loaded table
+    """
+    file_path, fmt = resolve_table(path, fmt)
+    columns = list(columns) if columns is not None else None
+
+    if fmt == 'parquet':
+        df = pd.read_parquet(file_path, columns=columns, engine='pyarrow')
+    else:
+        dtypes = {}
+        parse_dates = []
+        for col, dtype in (schema or {}).items():
+            if columns is not None and col not in columns:
+                continue
+            if dtype.startswith('datetime64'):
+                parse_dates.append(col)
+            else:
+                dtypes[col] = str if dtype == 'str' else dtype
+        df = pd.read_csv(file_path, usecols=columns, dtype=dtypes or None,
+                         parse_dates=parse_dates or None)
+    return apply_schema(df, schema)
+
+
+class TableWriter:
+    """
+    Append DataFrames to one table file chunk by chunk, so large outputs never
+    have to be held in memory at once.
+
+    Usage:
+        with TableWriter('data/processed/cleaned_transactions') as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+
+    Parquet chunks are cast to the types of the first one, so columns whose
+    inferred dtype can change between chunks (e.g. int64 in one CSV chunk and
+    float64 in the next) should be declared in `schema`.
+    """
+
+    def __init__(self, path, fmt=None, schema=None):
+        self.fmt = _check_format(fmt or DEFAULT_FORMAT)
+        self.path = table_path(path, self.fmt)
+        self.schema = schema
+        self.rows_written = 0
+        self._header_written = False
+        self._writer = None
+        self._arrow_schema = None
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def write(self, df):
+        if self.schema:
+            df = apply_schema(df.copy(), self.schema)
+        if self.fmt == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                # Categoricals from different chunks may have different index
+                # widths; pin them to int32 so every chunk shares one schema.
+                # A column with no values in the first chunk has Arrow type null,
+                # which nothing casts to; undeclared, it can only be text
+                fields = [
+                    pa.field(f.name, pa.dictionary(pa.int32(), f.type.value_type))
+                    if pa.types.is_dictionary(f.type)
+                    else pa.field(f.name, pa.string()) if pa.types.is_null(f.type)
+                    else f
+                    for f in table.schema
+                ]
+                self._arrow_schema = pa.schema(fields, metadata=table.schema.metadata)
+                self._writer = pq.ParquetWriter(self.path, self._arrow_schema)
+            self._writer.write_table(table.cast(self._arrow_schema))
+        else:
+            df.to_csv(self.path, mode='a', header=not self._header_written, index=False)
+            self._header_written = True
+        self.rows_written += len(df)
+        return self
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,104 @@
+import numpy as np
+
+
+class BinnedMetrics:
+    """
+    Constant-memory binary classification metrics over chunks of predictions.
+
+    Scores are counted into `n_bins` equal-width probability bins per class,
+    so ROC and precision-recall curves are evaluated at the bin edges and
+    memory does not grow with the number of rows. Confusion counts at
+    `threshold` are kept exactly, so accuracy, precision, recall and F1 match
+    the full-array sklearn metrics.
+
+    ROC-AUC from the binned curve treats the positive/negative pairs that
+    share a bin as ties (half credit). Only those pairs can be ordered
+    differently by the exact scores, so the error is at most
+    0.5 * sum_b pos_b * neg_b / (P * N) over bins holding more than one
+    distinct score; see auc_error_bound.
+    """
+
+    def __init__(self, n_bins=10000, threshold=0.5):
+        self.n_bins = n_bins
+        self.threshold = threshold
+        self.pos = np.zeros(n_bins, dtype=np.int64)
+        self.neg = np.zeros(n_bins, dtype=np.int64)
+        # Score range per bin; a bin whose scores are all equal holds exact ties
+        self.low = np.full(n_bins, np.inf)
+        self.high = np.full(n_bins, -np.inf)
+        self.tp = self.fp = self.tn = self.fn = 0
+
+    def update(self, y_true, y_prob):
+        y_true = np.asarray(y_true).astype(bool)
+        y_prob = np.asarray(y_prob, dtype=np.float64)
+        bins = np.minimum((y_prob * self.n_bins).astype(np.int64), self.n_bins - 1)
+        self.pos += np.bincount(bins[y_true], minlength=self.n_bins)
+        self.neg += np.bincount(bins[~y_true], minlength=self.n_bins)
+        np.minimum.at(self.low, bins, y_prob)
+        np.maximum.at(self.high, bins, y_prob)
+
+        # Same rule as predict() on a binary classifier: class 1 when p > threshold
+        y_pred = y_prob > self.threshold
+        self.tp += int(np.count_nonzero(y_pred & y_true))
+        self.fp += int(np.count_nonzero(y_pred & ~y_true))
+        self.tn += int(np.count_nonzero(~y_pred & ~y_true))
+        self.fn += int(np.count_nonzero(~y_pred & y_true))
+        return self
+
+    def _cumulative(self):
+        # Counts scoring at or above each bin's lower edge, from the top bin down
+        tps = np.concatenate([[0], np.cumsum(self.pos[::-1])])
+        fps = np.concatenate([[0], np.cumsum(self.neg[::-1])])
+        thresholds = np.concatenate([[np.inf], np.arange(self.n_bins - 1, -1, -1) / self.n_bins])
+        return tps, fps, thresholds
+
+    def roc_curve(self):
+        """
+        Returns:
+            tuple: (fpr, tpr, thresholds) at the bin edges, like sklearn.metrics.roc_curve
+        """
+        tps, fps, thresholds = self._cumulative()
+        return fps / max(fps[-1], 1), tps / max(tps[-1], 1), thresholds
+
+    def precision_recall_curve(self):
+        """
+        Returns:
+            tuple: (precision, recall, thresholds) at the bin edges, highest threshold first
+        """
+        tps, fps, thresholds = self._cumulative()
+        predicted = tps + fps
+        keep = predicted > 0
+        precision = tps[keep] / predicted[keep]
+        recall = tps[keep] / max(tps[-1], 1)
+        return precision, recall, thresholds[keep]
+
+    def roc_auc(self):
+        fpr, tpr, _ = self.roc_curve()
+        return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+
+    def auc_error_bound(self):
+        """Largest possible |binned ROC-AUC - exact ROC-AUC|"""
+        pairs = int(self.pos.sum()) * int(self.neg.sum())
+        if pairs == 0:
+            return 0.0
+        mixed = self.low < self.high
+        return float(0.5 * np.dot(self.pos[mixed].astype(np.float64), self.neg[mixed]) / pairs)
+
+    def confusion_matrix(self):
+        """[[tn, fp], [fn, tp]], like sklearn.metrics.confusion_matrix"""
+        return np.array([[self.tn, self.fp], [self.fn, self.tp]])
+
+    def metrics(self, prefix='test_'):
+        total = self.tp + self.fp + self.tn + self.fn
+        precision = self.tp / (self.tp + self.fp) if self.tp + self.fp else 0.0
+        recall = self.tp / (self.tp + self.fn) if self.tp + self.fn else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        return {
+            f'{prefix}accuracy': (self.tp + self.tn) / total if total else 0.0,
+            f'{prefix}precision': precision,
+            f'{prefix}recall': recall,
+            f'{prefix}f1': f1,
+            f'{prefix}roc_auc': self.roc_auc(),
+            f'{prefix}roc_auc_error_bound': self.auc_error_bound(),
+            f'{prefix}rows': total
+        }
@@ -0,0 +1,156 @@
+import os
+import pandas as pd
+import numpy as np
+
+COUNTRIES = ['United Kingdom', 'Germany', 'France', 'EIRE', 'Spain', 'Netherlands',
+             'Belgium', 'Switzerland', 'Portugal', 'Australia']
+
+# Data-quality profile of the UCI Online Retail extract, for raw (uncleaned)
+# benchmark inputs: about a quarter of the invoices have no CustomerID, ~2%
+# are cancellations, and customer and product activity is heavy-tailed.
+RAW_PROFILE = {
+    'skew': 0.7,
+    'cancel_rate': 0.02,
+    'missing_customer_rate': 0.25,
+    'missing_description_rate': 0.003,
+    'zero_price_rate': 0.005,
+    'duplicate_rate': 0.01
+}
+
+
+def _popularity(n, skew, rng):
+    """Zipf-like selection probabilities over n items in random rank order"""
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return rng.permutation(weights / weights.sum())
+
+
+def generate_transactions(n_rows, n_customers=None, n_products=4000, lines_per_invoice=20,
+                          start='2010-12-01', end='2011-12-09', seed=42, skew=0.0,
+                          cancel_rate=0.0, missing_customer_rate=0.0, missing_description_rate=0.0,
+                          zero_price_rate=0.0, duplicate_rate=0.0, first_invoice=536365, chunk=None):
+    """
+    Generate synthetic line items in the Online Retail schema.
+
+    With the default rates the data is already clean; pass RAW_PROFILE
+    (or generate_raw_transactions) for data with the defects DataCleaner removes.
+
+    Args:
+        n_rows (int): Number of line items
+        n_customers (int): Number of distinct customers (default n_rows // 100)
+        n_products (int): Number of distinct stock codes
+        lines_per_invoice (int): Average number of line items per invoice
+        start, end (str): Invoice date range
+        seed (int): Random seed of the customer and product catalog
+        skew (float): Zipf exponent of customer and product popularity (0 = uniform)
+        cancel_rate (float): Share of invoices that are cancellations ('C' prefix, negative quantity)
+        missing_customer_rate (float): Share of invoices without a CustomerID
+        missing_description_rate (float): Share of lines without a Description
+        zero_price_rate (float): Share of lines with UnitPrice 0
+        duplicate_rate (float): Share of lines that repeat the previous line exactly
+        first_invoice (int): Number of the first invoice
+        chunk (int): Index of this chunk when a file is generated in pieces
+            (see write_transactions); rows differ per chunk, the catalog does not
+
+    Returns:
+        pd.DataFrame: InvoiceNo, StockCode, Description, Quantity, InvoiceDate,
+            UnitPrice, CustomerID, Country
+    """
+    n_customers = n_customers or max(1, n_rows // 100)
+    # The catalog (prices, countries, popularity) depends on the seed only, so
+    # every chunk of one file shares it
+    catalog = np.random.default_rng(seed)
+    product_price = np.round(catalog.lognormal(1.0, 0.8, n_products) + 0.01, 2)
+    customer_country = catalog.choice(len(COUNTRIES), n_customers,
+                                      p=[0.82] + [0.02] * (len(COUNTRIES) - 1))
+    rng = catalog if chunk is None else np.random.default_rng([seed, chunk])
+
+    # Line items are grouped into invoices, each invoice belongs to one
+    # customer and has a single timestamp
+    n_invoices = max(1, n_rows // lines_per_invoice)
+    invoice_of_row = np.sort(rng.integers(0, n_invoices, n_rows))
+    if skew > 0:
+        invoice_customer = rng.choice(n_customers, n_invoices, p=_popularity(n_customers, skew, catalog))
+        product = rng.choice(n_products, n_rows, p=_popularity(n_products, skew, catalog))
+    else:
+        invoice_customer = rng.integers(0, n_customers, n_invoices)
+        product = rng.integers(0, n_products, n_rows)
+
+    start_ts = pd.Timestamp(start).value // 10**9
+    end_ts = pd.Timestamp(end).value // 10**9
+    invoice_time = np.sort(rng.integers(start_ts, end_ts, n_invoices))
+
+    customer = invoice_customer[invoice_of_row]
+    invoice_no = pd.Series(first_invoice + invoice_of_row).astype(str)
+    quantity = rng.geometric(0.15, n_rows)
+    unit_price = product_price[product]
+    customer_id = (12346 + customer).astype('int64')
+    description = 'PRODUCT ' + pd.Series(product).astype(str)
+
+    if cancel_rate > 0:
+        cancelled = (rng.random(n_invoices) < cancel_rate)[invoice_of_row]
+        invoice_no = invoice_no.where(~cancelled, 'C' + invoice_no)
+        quantity = np.where(cancelled, -quantity, quantity)
+    if missing_customer_rate > 0:
+        missing = (rng.random(n_invoices) < missing_customer_rate)[invoice_of_row]
+        customer_id = np.where(missing, np.nan, customer_id)
+    if missing_description_rate > 0:
+        description = description.mask(rng.random(n_rows) < missing_description_rate)
+    if zero_price_rate > 0:
+        unit_price = np.where(rng.random(n_rows) < zero_price_rate, 0.0, unit_price)
+
+    df = pd.DataFrame({
+        'InvoiceNo': invoice_no,
+        'StockCode': pd.Series(product + 10000).astype(str),
+        'Description': description,
+        'Quantity': quantity,
+        'InvoiceDate': pd.to_datetime(invoice_time[invoice_of_row], unit='s'),
+        'UnitPrice': unit_price,
+        'CustomerID': customer_id,
+        'Country': np.array(COUNTRIES)[customer_country[customer]]
+    })
+
+    if duplicate_rate > 0:
+        # Repeat the previous line, so duplicates sit inside their invoice
+        source = np.arange(n_rows)
+        repeat = np.flatnonzero(rng.random(n_rows - 1) < duplicate_rate) + 1
+        source[repeat] = repeat - 1
+        df = df.iloc[source].reset_index(drop=True)
+    return df
+
+
+def generate_raw_transactions(n_rows, **kwargs):
+    """generate_transactions with the defects of the raw Online Retail data (RAW_PROFILE)"""
+    return generate_transactions(n_rows, **{**RAW_PROFILE, **kwargs})
+
+
+def write_transactions(path, n_rows, chunk_rows=1_000_000, raw=True, start='2010-12-01',
+                       end='2011-12-09', seed=42, **kwargs):
+    """
+    Write n_rows synthetic transactions to a CSV file in bounded memory.
+
+    The date range is split evenly over chunks of `chunk_rows` rows, so the file
+    stays in time order, and invoice numbers continue from chunk to chunk. All
+    chunks draw from the same customer and product catalog. Suitable for 1e4
+    up to 1e8 rows.
+
+    Returns:
+        str: path
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    kwargs = {**RAW_PROFILE, **kwargs} if raw else kwargs
+    kwargs.setdefault('n_customers', max(1, n_rows // 100))
+    lines_per_invoice = kwargs.pop('lines_per_invoice', 20)
+
+    n_chunks = max(1, -(-n_rows // chunk_rows))
+    edges = pd.date_range(start, end, periods=n_chunks + 1)
+    first_invoice = 536365
+    written = 0
+    for i in range(n_chunks):
+        rows = min(chunk_rows, n_rows - written)
+        df = generate_transactions(rows, lines_per_invoice=lines_per_invoice, start=edges[i],
+                                   end=edges[i + 1], seed=seed, first_invoice=first_invoice,
+                                   chunk=i if n_chunks > 1 else None, **kwargs)
+        df.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        first_invoice += max(1, rows // lines_per_invoice)
+        written += rows
+    return path
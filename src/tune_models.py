@@ -0,0 +1,369 @@
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import pandas as pd
+from sklearn.metrics import roc_auc_score
+from threadpoolctl import threadpool_limits
+from model_data import load_split, MODEL_READY_DIR
+from model_registry import save_model, set_alias
+from run_models import MODEL_NAMES, build_model
+
+# Setup logging
+os.makedirs('logs', exist_ok=True)
+logging.basicConfig(
+    filename='logs/tuning.log',
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+# Search spaces per model. Each parameter is one of
+#   ('int', low, high[, 'log'])   ('float', low, high[, 'log'])   ('choice', [values])
+SEARCH_SPACES = {
+    'Logistic Regression': {
+        'C': ('float', 1e-3, 1e2, 'log')
+    },
+    'Decision Tree': {
+        'max_depth': ('int', 2, 16),
+        'min_samples_leaf': ('int', 1, 100, 'log')
+    },
+    'Random Forest': {
+        'n_estimators': ('int', 50, 500, 'log'),
+        'max_depth': ('choice', [4, 6, 8, 10, 14, None]),
+        'min_samples_leaf': ('int', 1, 50, 'log'),
+        'max_features': ('choice', ['sqrt', 'log2', 0.5])
+    },
+    'Gradient Boosting': {
+        'n_estimators': ('int', 50, 400, 'log'),
+        'learning_rate': ('float', 0.01, 0.3, 'log'),
+        'max_depth': ('int', 2, 6),
+        'subsample': ('float', 0.5, 1.0)
+    },
+    'XGBoost': {
+        'n_estimators': ('int', 50, 600, 'log'),
+        'learning_rate': ('float', 0.01, 0.3, 'log'),
+        'max_depth': ('int', 2, 10),
+        'subsample': ('float', 0.5, 1.0),
+        'colsample_bytree': ('float', 0.5, 1.0),
+        'min_child_weight': ('float', 0.5, 20, 'log')
+    },
+    'Neural Network': {
+        'hidden_layer_sizes': ('choice', [[32], [64], [64, 32], [128, 64]]),
+        'alpha': ('float', 1e-6, 1e-1, 'log'),
+        'learning_rate_init': ('float', 1e-4, 1e-2, 'log')
+    }
+}
+
+
+def sample_params(space, rng):
+    """Draw one configuration from a search space"""
+    params = {}
+    for name, spec in space.items():
+        kind = spec[0]
+        if kind == 'choice':
+            params[name] = spec[1][rng.integers(len(spec[1]))]
+        else:
+            low, high = spec[1], spec[2]
+            log = len(spec) > 3 and spec[3] == 'log'
+            value = math.exp(rng.uniform(math.log(low), math.log(high))) if log else rng.uniform(low, high)
+            params[name] = int(round(value)) if kind == 'int' else float(value)
+    return params
+
+
+def trial_id(model, params, resource):
+    key = json.dumps({'model': model, 'params': params, 'resource': resource}, sort_keys=True)
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+class TrialLog:
+    """Append-only JSONL record of finished trials, used to resume an interrupted search"""
+
+    def __init__(self, path='logs/tuning/trials.jsonl'):
+        self.path = path
+        self.trials = {}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        trial = json.loads(line)
+                        self.trials[trial['trial_id']] = trial
+
+    def __contains__(self, tid):
+        return tid in self.trials
+
+    def get(self, tid):
+        return self.trials[tid]
+
+    def append(self, trial):
+        self.trials[trial['trial_id']] = trial
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(trial) + '\n')
+
+
+_data = {}
+
+def _init_worker(directory, seed):
+    X_train, y_train = load_split('train', directory)
+    X_val, y_val = load_split('val', directory)
+    # One fixed shuffle, so a trial on a fraction of the rows is reproducible
+    order = np.random.default_rng(seed).permutation(len(y_train))
+    _data.update(X_train=X_train, y_train=y_train, X_val=X_val, y_val=y_val, order=order)
+
+
+def _run_trial(model, params, resource, tid):
+    """Fit `model` with `params` on a `resource` fraction of the training rows; runs in a worker"""
+    n_rows = max(2, int(round(resource * len(_data['order']))))
+    rows = np.sort(_data['order'][:n_rows])
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    # Trials run side by side, so each one keeps to a single thread
+    with threadpool_limits(limits=1):
+        estimator = build_model(model, n_threads=1, params=params)
+        estimator.fit(_data['X_train'][rows], _data['y_train'][rows])
+        y_prob = estimator.predict_proba(_data['X_val'])[:, 1]
+    return {
+        'trial_id': tid,
+        'model': model,
+        'params': params,
+        'resource': resource,
+        'n_rows': n_rows,
+        'auc': roc_auc_score(_data['y_val'], y_prob),
+        'seconds': time.perf_counter() - wall_start,
+        'cpu_seconds': time.process_time() - cpu_start
+    }
+
+
+class Budget:
+    """Wall-clock and CPU-second limits shared by every bracket"""
+
+    def __init__(self, wall_seconds=None, cpu_seconds=None):
+        self.start = time.perf_counter()
+        self.wall_seconds = wall_seconds
+        self.cpu_seconds = cpu_seconds
+        self.cpu_used = 0.0
+
+    def remaining(self):
+        if self.wall_seconds is None:
+            return None
+        return self.wall_seconds - (time.perf_counter() - self.start)
+
+    def exhausted(self):
+        remaining = self.remaining()
+        return ((remaining is not None and remaining <= 0)
+                or (self.cpu_seconds is not None and self.cpu_used >= self.cpu_seconds))
+
+
+class HyperbandTuner:
+    """
+    Hyperband over the model zoo.
+
+    The resource is the fraction of training rows a trial is fitted on. Each
+    bracket starts n random configurations (of any model) at a small fraction,
+    keeps the best 1/eta by validation ROC-AUC and refits those on eta times
+    more rows, until the survivors are fitted on the full training set.
+    Brackets trade off many cheap configurations against few well-trained
+    ones. Trials of one rung run in parallel in a process pool; finished
+    trials are appended to the trial log and reused when a run is resumed.
+    """
+
+    def __init__(self, models=None, eta=3, min_resource=1 / 27, workers=None, seed=42,
+                 log_path='logs/tuning/trials.jsonl', data_dir=MODEL_READY_DIR):
+        self.models = models or MODEL_NAMES
+        self.eta = eta
+        self.s_max = int(math.floor(math.log(1 / min_resource, eta) + 1e-9))
+        self.workers = workers or os.cpu_count() or 1
+        self.seed = seed
+        self.log = TrialLog(log_path)
+        self.data_dir = data_dir
+
+    def _sample(self, n, rng):
+        configs = []
+        for _ in range(n):
+            model = self.models[rng.integers(len(self.models))]
+            configs.append((model, sample_params(SEARCH_SPACES[model], rng)))
+        return configs
+
+    def _stop_pool(self):
+        # A running call cannot be cancelled, and shutdown(wait=False) still lets
+        # workers finish the calls already handed to them, so terminate them
+        processes = list((self._pool._processes or {}).values())
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                   initargs=(self.data_dir, self.seed))
+
+    def _failed_trial(self, model, params, resource, tid, error):
+        return {
+            'trial_id': tid,
+            'model': model,
+            'params': params,
+            'resource': resource,
+            'status': 'failed',
+            'error': f"{type(error).__name__}: {error}",
+            'auc': float('-inf'),
+            'seconds': 0.0,
+            'cpu_seconds': 0.0
+        }
+
+    def _run_rung(self, configs, resource, budget):
+        """
+        Evaluate configs at `resource`, reusing logged trials; returns the finished trials.
+
+        A trial that raises is recorded as failed with AUC -inf, so it ranks last
+        and the search goes on. Failures inside the trial are logged and reused on
+        resume; a crashed worker (e.g. out of memory) is not logged, so the trial
+        is retried on resume, and the pool is replaced for the next rung.
+        """
+        resource = round(resource, 6)
+        results = []
+        futures = {}
+        for model, params in configs:
+            tid = trial_id(model, params, resource)
+            if tid in self.log:
+                results.append(self.log.get(tid))
+            else:
+                future = self._pool.submit(_run_trial, model, params, resource, tid)
+                futures[future] = (model, params, tid)
+
+        broken = False
+        while futures:
+            if budget.exhausted():
+                for future in futures:
+                    future.cancel()
+                break
+            done, _ = wait(futures, timeout=budget.remaining(), return_when=FIRST_COMPLETED)
+            for future in done:
+                model, params, tid = futures.pop(future)
+                try:
+                    trial = future.result()
+                except BrokenProcessPool as e:
+                    broken = True
+                    results.append(self._failed_trial(model, params, resource, tid, e))
+                    logging.error(f"{model} @ {resource:.3f}: worker crashed {params}")
+                    continue
+                except Exception as e:
+                    trial = self._failed_trial(model, params, resource, tid, e)
+                    self.log.append(trial)
+                    results.append(trial)
+                    logging.error(f"{model} @ {resource:.3f}: {trial['error']} {params}")
+                    continue
+                budget.cpu_used += trial['cpu_seconds']
+                self.log.append(trial)
+                results.append(trial)
+                logging.info(f"{trial['model']} @ {resource:.3f}: AUC {trial['auc']:.4f} "
+                             f"({trial['seconds']:.1f}s) {trial['params']}")
+        if broken:
+            self._stop_pool()
+            self._pool = self._new_pool()
+        return results
+
+    def run(self, budget, iterations=1):
+        """
+        Run Hyperband iterations until done or the budget is spent.
+
+        When the budget runs out, queued trials are cancelled and the workers
+        terminated, so trials still running are abandoned rather than awaited.
+
+        Returns:
+            list: Every trial evaluated or reused in this run
+        """
+        trials = []
+        self._pool = self._new_pool()
+        try:
+            for iteration in range(iterations):
+                for s in range(self.s_max, -1, -1):
+                    # Configurations are drawn from a seed per bracket, so a resumed
+                    # run proposes the same configurations and finds them in the log
+                    rng = np.random.default_rng([self.seed, iteration, s])
+                    n = int(math.ceil((self.s_max + 1) / (s + 1) * self.eta ** s))
+                    configs = self._sample(n, rng)
+                    print(f"Bracket {iteration}.{s}: {n} configurations from {self.eta ** -s:.3f} of the rows")
+                    for i in range(s + 1):
+                        resource = self.eta ** (i - s)
+                        rung = self._run_rung(configs, resource, budget)
+                        trials += rung
+                        if budget.exhausted():
+                            print("Budget exhausted")
+                            return trials
+                        keep = max(1, len(configs) // self.eta)
+                        rung.sort(key=lambda t: t['auc'], reverse=True)
+                        configs = [(t['model'], t['params']) for t in rung[:keep]]
+        finally:
+            # Waiting on trials still running would spend time past the budget
+            if budget.exhausted():
+                self._stop_pool()
+            else:
+                self._pool.shutdown()
+        return trials
+
+
+def best_trial(trials):
+    """Best trial fitted on the full training set, else the best at the largest resource (None if all failed)"""
+    trials = [t for t in trials if t.get('status') != 'failed']
+    if not trials:
+        return None
+    top = max(t['resource'] for t in trials)
+    return max((t for t in trials if t['resource'] == top), key=lambda t: t['auc'])
+
+
+def promote(trial, data_dir=MODEL_READY_DIR, comparison_path='models/model_comparison.csv'):
+    """
+    Refit the tuned configuration on the full training set and save it as
+    tuned_<model>. The best_model alias moves to it when it beats the
+    validation ROC-AUC of the current best model.
+    """
+    X_train, y_train = load_split('train', data_dir)
+    model = build_model(trial['model'], n_threads=os.cpu_count() or 1, params=trial['params'])
+    model.fit(X_train, y_train)
+    name = 'tuned_' + trial['model'].lower().replace(' ', '_')
+    path = save_model(model, name)
+    print(f"Saved {path}")
+
+    current_auc = 0
+    if os.path.exists(comparison_path):
+        current_auc = pd.read_csv(comparison_path)['ROC-AUC'].max()
+    if trial['auc'] > current_auc:
+        set_alias('best_model', name)
+        print(f"best_model -> {name} (AUC {trial['auc']:.4f} > {current_auc:.4f})")
+    else:
+        print(f"Kept current best model (AUC {current_auc:.4f} >= {trial['auc']:.4f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hyperband search over the model zoo")
+    parser.add_argument('--models', nargs='+', choices=MODEL_NAMES, default=MODEL_NAMES)
+    parser.add_argument('--time-budget', type=float, default=None, help="Wall-clock budget in seconds")
+    parser.add_argument('--cpu-budget', type=float, default=None, help="Budget in trial CPU-seconds")
+    parser.add_argument('--iterations', type=int, default=1, help="Hyperband iterations to run")
+    parser.add_argument('--eta', type=int, default=3, help="Keep the best 1/eta of each rung")
+    parser.add_argument('--min-resource', type=float, default=1 / 27,
+                        help="Smallest fraction of training rows a trial is fitted on")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--log', default='logs/tuning/trials.jsonl', help="Trial log to resume from")
+    parser.add_argument('--promote', action='store_true',
+                        help="Refit the best configuration and make it best_model if it beats the current one")
+    args = parser.parse_args()
+
+    tuner = HyperbandTuner(args.models, args.eta, args.min_resource, args.workers, args.seed, args.log)
+    budget = Budget(args.time_budget, args.cpu_budget)
+    trials = tuner.run(budget, args.iterations)
+    best = best_trial(trials)
+    if best is None:
+        print("No trials finished within the budget")
+    else:
+        print(f"\nBest: {best['model']} AUC {best['auc']:.4f} on {best['n_rows']} rows")
+        print(f"Params: {best['params']}")
+        with open(os.path.join(os.path.dirname(args.log), 'best.json'), 'w') as f:
+            json.dump(best, f, indent=4)
+        if args.promote:
+            promote(best)
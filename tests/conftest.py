@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Pipeline modules import each other as top-level modules, as when run from src/ or app/
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'app'))
@@ -0,0 +1,32 @@
+import importlib
+import pytest
+from storage import load_table, CUSTOMER_FEATURES_SCHEMA
+from synthetic_data import write_transactions
+
+pytest.importorskip('pyarrow')
+cleaning = importlib.import_module('02_data_cleaning')
+features = importlib.import_module('03_feature_engineering')
+preparation = importlib.import_module('04_model_preparation')
+
+
+def _model_features(fmt):
+    cleaning.DataCleaner(input_path='data/raw/online_retail.csv', storage_format=fmt).run_pipeline()
+    features.FeatureEngineer(storage_format=fmt).run()
+    df = load_table('data/processed/customer_features', schema=CUSTOMER_FEATURES_SCHEMA, fmt=fmt)
+    return preparation.feature_types(df.drop(columns=['CustomerID', 'Churn']))
+
+
+def test_storage_backends_give_the_same_model_features(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'data' / 'raw').mkdir(parents=True)
+    write_transactions('data/raw/online_retail.csv', 20_000, seed=7)
+
+    parquet = _model_features('parquet')
+    csv = _model_features('csv')
+
+    assert parquet == csv
+    numeric, categorical = parquet
+    assert categorical == ['CustomerSegment']
+    # Every other feature reaches the scaler; none is dropped by the ColumnTransformer
+    assert {'TotalItems', 'MaxBasketSize'} <= set(numeric)
+    assert len(numeric) == 15
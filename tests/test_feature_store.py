@@ -0,0 +1,63 @@
+import importlib
+import pandas as pd
+import pytest
+from storage import load_table, CLEANED_TRANSACTIONS_SCHEMA
+from synthetic_data import write_transactions
+from feature_store import FeatureStore, TRANSACTION_COLUMNS
+
+cleaning = importlib.import_module('02_data_cleaning')
+features = importlib.import_module('03_feature_engineering')
+
+
+@pytest.fixture(scope='module')
+def transactions(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('store')
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(directory)
+        (directory / 'data' / 'raw').mkdir(parents=True)
+        write_transactions('data/raw/online_retail.csv', 20_000, seed=11)
+        cleaning.DataCleaner(input_path='data/raw/online_retail.csv', storage_format='csv').run_pipeline()
+        return load_table('data/processed/cleaned_transactions', columns=TRANSACTION_COLUMNS,
+                          schema=CLEANED_TRANSACTIONS_SCHEMA, fmt='csv')
+
+
+def _batch_features(transactions, semantics):
+    engineer = features.FeatureEngineer(interval_semantics=semantics)
+    engineer.transactions = transactions
+    engineer.observation_end = transactions['InvoiceDate'].max()
+    (engineer.split_data()
+        .create_target()
+        .create_rfm_features()
+        .create_behavioral_features()
+        .create_temporal_features()
+        .create_segmentation()
+        .handle_missing())
+    return engineer.customer_features
+
+
+@pytest.mark.parametrize('semantics', features.INTERVAL_SEMANTICS)
+def test_batches_fold_into_the_full_history_features(transactions, semantics, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # Cut on dates, so batches are in time order and every invoice falls in one batch
+    edges = transactions['InvoiceDate'].quantile([0.25, 0.5, 0.75]).dt.floor('D')
+    batch_ids = edges.searchsorted(transactions['InvoiceDate'], side='right')
+
+    store = FeatureStore(store_dir='store', storage_format='csv', interval_semantics=semantics)
+    for i in range(len(edges) + 1):
+        store.update(transactions[batch_ids == i])
+        if i == 1:
+            # Persisted state resumes where the in-memory store stopped
+            store.save()
+            store = FeatureStore(store_dir='store', storage_format='csv', interval_semantics=semantics).load()
+
+    expected = _batch_features(transactions, semantics)
+    actual = store.customer_features().customer_features
+    pd.testing.assert_frame_equal(actual[expected.columns], expected, check_dtype=False)
+
+
+def test_store_rejects_other_interval_semantics(tmp_path):
+    FeatureStore(store_dir=str(tmp_path), storage_format='csv').save()
+    with pytest.raises(ValueError, match='legacy intervals'):
+        FeatureStore(store_dir=str(tmp_path), storage_format='csv', interval_semantics='invoice').load()
+    with pytest.raises(ValueError, match='Unknown interval semantics'):
+        FeatureStore(interval_semantics='basket')
@@ -0,0 +1,26 @@
+import importlib
+import pytest
+from storage import load_table
+from synthetic_data import write_transactions
+from online_features import OnlineFeatureService, verify
+
+cleaning = importlib.import_module('02_data_cleaning')
+features = importlib.import_module('03_feature_engineering')
+
+
+@pytest.mark.parametrize('semantics', features.INTERVAL_SEMANTICS)
+def test_online_features_match_the_batch_table(semantics, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'data' / 'raw').mkdir(parents=True)
+    write_transactions('data/raw/online_retail.csv', 20_000, seed=5)
+    cleaning.DataCleaner(input_path='data/raw/online_retail.csv', storage_format='csv').run_pipeline()
+    engineer = features.FeatureEngineer(storage_format='csv', interval_semantics=semantics)
+    engineer.run()
+    # Few purchases per customer, so Frequency has ties across quartiles
+    assert engineer.segment_ties.get('Frequency')
+
+    service = OnlineFeatureService()
+    # Every customer: verify() raises if any score or segment differs
+    result = verify(service, load_table('data/raw/online_retail.csv'), engineer.customer_features,
+                    n_customers=len(engineer.customer_features))
+    assert result['customers'] == len(engineer.customer_features)
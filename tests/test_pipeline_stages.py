@@ -0,0 +1,37 @@
+import ast
+import os
+import run_pipeline
+
+SRC_DIR = run_pipeline.SRC_DIR
+
+
+def _local_imports(filename):
+    """src modules a file imports, directly or through importlib.import_module"""
+    with open(os.path.join(SRC_DIR, filename)) as f:
+        tree = ast.parse(f.read())
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            names.add(node.module)
+        elif (isinstance(node, ast.Call) and getattr(node.func, 'attr', None) == 'import_module'
+              and node.args and isinstance(node.args[0], ast.Constant)):
+            names.add(node.args[0].value)
+    return {f'{name}.py' for name in names if os.path.exists(os.path.join(SRC_DIR, f'{name}.py'))}
+
+
+def _imported_closure(script):
+    seen, todo = set(), [script]
+    while todo:
+        filename = todo.pop()
+        if filename not in seen:
+            seen.add(filename)
+            todo.extend(_local_imports(filename))
+    return seen
+
+
+def test_stage_cache_keys_cover_every_imported_module():
+    for stage in run_pipeline.build_stages():
+        missing = _imported_closure(stage['script']) - set(stage['code'])
+        assert not missing, f"{stage['name']} cache key misses {sorted(missing)}"
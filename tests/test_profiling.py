@@ -0,0 +1,25 @@
+import json
+import threading
+import profiling
+
+
+def test_concurrent_stages_record_their_own_thread_as_parent(tmp_path, monkeypatch):
+    trace = tmp_path / 'trace.jsonl'
+    monkeypatch.setattr(profiling, 'TRACE_PATH', str(trace))
+    # Both threads are inside their outer stage before either opens an inner one
+    barrier = threading.Barrier(2)
+
+    def request(name):
+        with profiling.stage(name):
+            barrier.wait()
+            with profiling.stage(name + '.inner'):
+                barrier.wait()
+
+    threads = [threading.Thread(target=request, args=(name,)) for name in ('a', 'b')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    parents = {r['stage']: r['parent'] for r in map(json.loads, trace.read_text().splitlines())}
+    assert parents == {'a': None, 'b': None, 'a.inner': 'a', 'b.inner': 'b'}
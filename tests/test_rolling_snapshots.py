@@ -0,0 +1,50 @@
+import importlib
+import pandas as pd
+import pytest
+from storage import load_table, CLEANED_TRANSACTIONS_SCHEMA
+from synthetic_data import write_transactions
+
+cleaning = importlib.import_module('02_data_cleaning')
+features = importlib.import_module('03_feature_engineering')
+
+CUTOFFS = ['2011-06-01', '2011-09-09']
+
+
+@pytest.fixture(scope='module')
+def transactions(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('rolling')
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(directory)
+        (directory / 'data' / 'raw').mkdir(parents=True)
+        write_transactions('data/raw/online_retail.csv', 20_000, seed=5)
+        cleaning.DataCleaner(input_path='data/raw/online_retail.csv', storage_format='csv').run_pipeline()
+        return load_table('data/processed/cleaned_transactions', columns=features.TRANSACTION_COLUMNS,
+                          schema=CLEANED_TRANSACTIONS_SCHEMA, fmt='csv')
+
+
+def _single_cutoff(transactions, cutoff, semantics):
+    engineer = features.FeatureEngineer(training_cutoff=cutoff, interval_semantics=semantics)
+    engineer.transactions = transactions
+    engineer.observation_end = transactions['InvoiceDate'].max()
+    (engineer.split_data()
+        .create_target()
+        .create_rfm_features()
+        .create_behavioral_features()
+        .create_temporal_features()
+        .create_segmentation()
+        .handle_missing())
+    return engineer.customer_features
+
+
+@pytest.mark.parametrize('semantics', features.INTERVAL_SEMANTICS)
+def test_snapshots_match_single_cutoff_runs(transactions, semantics, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    engineer = features.FeatureEngineer(interval_semantics=semantics)
+    engineer.transactions = transactions
+    rolling = engineer.create_rolling_snapshots(CUTOFFS).customer_features
+
+    for cutoff in CUTOFFS:
+        expected = _single_cutoff(transactions, cutoff, semantics)
+        snapshot = rolling[rolling['Cutoff'] == pd.Timestamp(cutoff)].drop(columns='Cutoff')
+        pd.testing.assert_frame_equal(snapshot.reset_index(drop=True)[expected.columns], expected,
+                                      check_dtype=False)
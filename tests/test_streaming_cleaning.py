@@ -0,0 +1,29 @@
+import importlib
+import json
+import pandas as pd
+from storage import load_table
+from synthetic_data import write_transactions
+
+cleaning = importlib.import_module('02_data_cleaning')
+
+
+def test_streaming_writes_an_empty_table_when_every_row_is_filtered(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'data' / 'raw').mkdir(parents=True)
+    write_transactions('data/raw/online_retail.csv', 2000, seed=3)
+    raw = pd.read_csv('data/raw/online_retail.csv')
+    raw['CustomerID'] = None
+    raw.to_csv('data/raw/online_retail.csv', index=False)
+
+    columns = {}
+    for mode, kwargs in [('memory', {}), ('streaming', {'chunksize': 500})]:
+        cleaning.DataCleaner(input_path='data/raw/online_retail.csv', storage_format='csv',
+                             **kwargs).run_pipeline()
+        cleaned = load_table('data/processed/cleaned_transactions', fmt='csv')
+        with open('data/processed/cleaning_statistics.json') as f:
+            stats = json.load(f)
+        outliers = [s for s in stats['steps_applied'] if s['step'] == 'remove_outliers'][-1]
+        assert len(cleaned) == 0
+        assert pd.isna(outliers['upper_bound'])
+        columns[mode] = list(cleaned.columns)
+    assert columns['streaming'] == columns['memory']
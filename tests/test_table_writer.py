@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from storage import TableWriter
+from bulk_scoring import score_file
+
+
+def test_csv_empty_first_chunk_writes_one_header(tmp_path):
+    with TableWriter(str(tmp_path / 'out'), fmt='csv') as writer:
+        writer.write(pd.DataFrame({'a': pd.Series(dtype='int64')}))
+        writer.write(pd.DataFrame({'a': [1, 2]}))
+        writer.write(pd.DataFrame({'a': [3]}))
+    assert (tmp_path / 'out.csv').read_text().splitlines() == ['a', '1', '2', '3']
+
+
+def test_parquet_pins_all_null_first_chunk_as_text(tmp_path):
+    pytest.importorskip('pyarrow')
+    with TableWriter(str(tmp_path / 'out'), fmt='parquet') as writer:
+        writer.write(pd.DataFrame({'segment': [None, None]}))
+        writer.write(pd.DataFrame({'segment': ['Champions', None]}))
+    segment = pd.read_parquet(tmp_path / 'out.parquet')['segment']
+    assert segment.isna().tolist() == [True, True, False, True]
+    assert segment[2] == 'Champions'
+
+
+def test_scoring_csv_chunks_with_mixed_dtypes_to_parquet(tmp_path):
+    pytest.importorskip('pyarrow')
+    rng = np.random.default_rng(0)
+    train = pd.DataFrame({'Recency': rng.integers(0, 300, 200).astype(float),
+                          'TotalSpent': rng.gamma(2, 100, 200),
+                          'CustomerSegment': rng.choice(['Champions', 'At Risk'], 200)})
+    preprocessor = ColumnTransformer([('num', StandardScaler(), ['Recency', 'TotalSpent']),
+                                      ('cat', OneHotEncoder(handle_unknown='ignore'), ['CustomerSegment'])])
+    model = LogisticRegression().fit(preprocessor.fit_transform(train), rng.integers(0, 2, 200))
+
+    # Chunks of 2 rows: the first reads as int64, the next as float64
+    (tmp_path / 'in.csv').write_text('Recency,TotalSpent,CustomerSegment\n'
+                                     '10,100,Champions\n'
+                                     '20,200,At Risk\n'
+                                     '30,150.5,At Risk\n'
+                                     '40,99.9,Champions\n'
+                                     '50,12,At Risk\n')
+    stats = score_file(str(tmp_path / 'in.csv'), str(tmp_path / 'out.parquet'), model, preprocessor,
+                       chunksize=2)
+
+    scored = pd.read_parquet(tmp_path / 'out.parquet')
+    assert stats['rows'] == len(scored) == 5
+    assert scored['Recency'].dtype == 'float64'
+    assert scored['TotalSpent'].tolist() == [100, 200, 150.5, 99.9, 12]